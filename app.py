@@ -6,14 +6,29 @@ sys.dont_write_bytecode = True
 Main application module for the AI Forecasting Application.
 
 This is the entry point for the Shiny application that connects the UI and server components.
+The REST API is mounted under /api in the same ASGI application.
 """
 
 # ===== IMPORTS =====
 from shiny import App
+from starlette.applications import Starlette
+from starlette.routing import Mount
 from ui_scripts.ui_main import app_ui
 from server import server_function
+from server_scripts.api import api_app
+from server_scripts.assets import dist_app
+from server_scripts.server_forecast import preload_models
 import os
+import threading
 
 # ===== APP CREATION =====
-# Create and run the app
-app = App(app_ui, server_function, static_assets=os.path.join(os.path.dirname(__file__), "www")) 
\ No newline at end of file
+# Create the Shiny app and serve it next to the REST API
+shiny_app = App(app_ui, server_function, static_assets=os.path.join(os.path.dirname(__file__), "www"))
+# Fingerprinted assets are served with immutable cache headers
+app = Starlette(routes=[
+    Mount("/api", app=api_app),
+    Mount("/dist", app=dist_app()),
+    Mount("/", app=shiny_app),
+])
+# Fits stored by earlier runs are loaded in the background, most used first
+threading.Thread(target=preload_models, name="model-preload", daemon=True).start()
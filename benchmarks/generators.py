@@ -0,0 +1,56 @@
+"""
+Seeded synthetic data generators for the benchmark suite.
+Series combine a trend, weekly and yearly seasonality and noise so that the
+models and plots do realistic work at every size.
+"""
+import io
+import numpy as np
+import pandas as pd
+
+DEFAULT_SEED = 42
+
+def synthetic_series(n_rows, freq=None, seed=DEFAULT_SEED, start="2000-01-01"):
+    """
+    Series with trend, seasonality and noise.
+
+    Args:
+        n_rows (int): Number of observations
+        freq (str): Pandas frequency of the timestamps; daily up to 50,000 rows, else
+            per minute so the timestamps stay within the supported date range
+        seed (int): Random seed
+
+    Returns:
+        pandas.DataFrame: Columns ``Date`` and ``Value``
+    """
+    freq = freq or ("D" if n_rows <= 50000 else "min")
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_rows, dtype=float)
+    values = (100 + 0.01 * t
+              + 10 * np.sin(2 * np.pi * t / 7)
+              + 20 * np.sin(2 * np.pi * t / 365.25)
+              + rng.normal(0, 5, n_rows))
+    return pd.DataFrame({
+        'Date': pd.date_range(start, periods=n_rows, freq=freq),
+        'Value': values,
+    })
+
+def synthetic_frame(n_rows, n_numeric=4, seed=DEFAULT_SEED):
+    """Series from ``synthetic_series`` plus ``n_numeric - 1`` extra numeric columns and a category column."""
+    rng = np.random.default_rng(seed)
+    df = synthetic_series(n_rows, seed=seed)
+    for i in range(1, n_numeric):
+        df[f'x{i}'] = rng.normal(i * 10, i, n_rows)
+    df['region'] = rng.choice(['north', 'south', 'east', 'west'], n_rows)
+    return df
+
+def synthetic_csv(n_rows, seed=DEFAULT_SEED):
+    """CSV bytes of ``synthetic_frame`` as a user would upload them."""
+    buffer = io.StringIO()
+    synthetic_frame(n_rows, seed=seed).to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+def actual_predicted(n_rows, seed=DEFAULT_SEED):
+    """Pair of actual and predicted arrays for metric benchmarks."""
+    rng = np.random.default_rng(seed)
+    actual = synthetic_series(n_rows, seed=seed)['Value'].to_numpy()
+    return actual, actual + rng.normal(0, 3, n_rows)
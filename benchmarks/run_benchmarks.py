@@ -0,0 +1,236 @@
+"""
+Benchmark suite for the AI Forecasting Application.
+Times ingestion, summary statistics, metrics, model fitting and plot rendering
+on seeded synthetic data, stores the results as JSON and compares them with a
+saved baseline.
+
+Usage:
+    python -m benchmarks.run_benchmarks                      # default sizes 1e3..1e7
+    python -m benchmarks.run_benchmarks --sizes 1e3,1e4 --cases parse,stats
+    python -m benchmarks.run_benchmarks --save-baseline      # record a new baseline
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Persisted fits and the cross-process cache live in a scratch directory, so
+# neither earlier runs nor the app's own store turn timed fits into cache hits
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="forecast-bench-")
+os.environ["FORECAST_MODEL_STORE"] = os.path.join(_SCRATCH_DIR, "models")
+os.environ["FORECAST_SHARED_CACHE_PATH"] = os.path.join(_SCRATCH_DIR, "shared_cache.sqlite3")
+atexit.register(shutil.rmtree, _SCRATCH_DIR, ignore_errors=True)
+
+from benchmarks.generators import synthetic_series, synthetic_frame, synthetic_csv, actual_predicted
+from server_scripts import conformal, model_store, server_forecast
+from server_scripts.global_helpers import calculate_metrics, compute_metrics
+from server_scripts.helpers.functions import getmode, lstm_forecast, automl_forecast, arfima_forecast
+from server_scripts.outliers import flag_outliers
+from server_scripts.schema import normalize_frame
+from server_scripts.server_data import read_uploaded_file, compute_summary_stats, build_data_viz, build_stats_viz
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SIZES = "1e3,1e4,1e5,1e6,1e7"
+DEFAULT_REPEATS = 3
+# A case is a regression when its median time grows by more than this fraction
+DEFAULT_THRESHOLD = 0.25
+FORECAST_HORIZON = 30
+
+# ===== CASES =====
+def _reset_model_caches():
+    """Forget fitted models, warm starts and cached residuals so every repeat measures a cold fit."""
+    server_forecast._fitted_models.clear()
+    server_forecast._prophet_params.clear()
+    server_forecast._arima_state.clear()
+    conformal._residual_cache.clear()
+    shutil.rmtree(model_store.MODEL_STORE_DIR, ignore_errors=True)
+
+def _setup_parse(n):
+    handle, path = tempfile.mkstemp(suffix=".csv")
+    with os.fdopen(handle, "wb") as f:
+        f.write(synthetic_csv(n))
+    return path
+
+def _setup_forecast(n):
+    _reset_model_caches()
+    return synthetic_series(n)
+
+def _setup_folds(n):
+    """Actual and predicted values laid out (horizon x fold), with each fold's history as ``insample``."""
+    folds = max(1, n // FORECAST_HORIZON)
+    actual, predicted = actual_predicted(folds * FORECAST_HORIZON)
+    insample = synthetic_series(folds * FORECAST_HORIZON, seed=7)['Value'].to_numpy()
+    shape = (folds, FORECAST_HORIZON)
+    return actual.reshape(shape).T, predicted.reshape(shape).T, insample.reshape(shape).T
+
+def _forecast_result(n):
+    series = synthetic_series(n + FORECAST_HORIZON)
+    actual, forecast = series.iloc[:n], series.iloc[n:]
+    values = forecast['Value'].to_numpy()
+    return {
+        'model_type': 'auto_arima', 'target_var': 'Value', 'horizon': FORECAST_HORIZON,
+        'label': 'ARIMA', 'x_actual': actual['Date'], 'y_actual': actual['Value'],
+        'x_forecast': forecast['Date'], 'y_forecast': values,
+        'x_band': forecast['Date'], 'lower': values - 10, 'upper': values + 10,
+    }
+
+def _plot(build):
+    def run(state):
+        plt.close(build(state))
+    return run
+
+# name -> (largest size worth running, setup(n) -> state, run(state))
+CASES = {
+    'parse': (10**7, _setup_parse, read_uploaded_file),
+    'normalize': (10**7, synthetic_frame, normalize_frame),
+    'stats': (10**7, synthetic_frame, compute_summary_stats),
+    'metrics': (10**7, actual_predicted, lambda pair: calculate_metrics(*pair)),
+    'metrics_folds': (10**7, _setup_folds,
+                      lambda folds: compute_metrics(folds[0], folds[1], insample=folds[2], axis=0)),
+    'hampel': (10**7, synthetic_frame, flag_outliers),
+    'arima': (10**5, _setup_forecast,
+              lambda ts: server_forecast.run_arima_forecast(ts, 'Date', 'Value', FORECAST_HORIZON)),
+    'prophet': (10**4, _setup_forecast,
+                lambda ts: server_forecast.run_prophet_forecast(ts, 'Date', 'Value', FORECAST_HORIZON)),
+    'prophet_fast': (10**5, _setup_forecast,
+                     lambda ts: server_forecast.run_prophet_forecast(
+                         ts, 'Date', 'Value', FORECAST_HORIZON, fast_mode=True, interval_method="analytic")),
+    'getmode': (10**6, lambda n: np.round(actual_predicted(n)[0]), getmode),
+    'lstm_forecast': (10**5, lambda n: actual_predicted(n)[0], lambda v: lstm_forecast(v, FORECAST_HORIZON)),
+    'automl_forecast': (10**5, lambda n: actual_predicted(n)[0], lambda v: automl_forecast(v, FORECAST_HORIZON)),
+    'arfima_forecast': (10**4, lambda n: actual_predicted(n)[0], lambda v: arfima_forecast(v, FORECAST_HORIZON)),
+    'plot_data_viz': (10**6, synthetic_series, _plot(build_data_viz)),
+    'plot_boxplot': (10**6, synthetic_frame, _plot(lambda df: build_stats_viz(df, "Boxplot"))),
+    'plot_violin': (10**5, synthetic_frame, _plot(lambda df: build_stats_viz(df, "Violin Plot"))),
+    'plot_histogram': (10**5, synthetic_frame, _plot(lambda df: build_stats_viz(df, "Histogram"))),
+    'plot_forecast': (10**6, _forecast_result, _plot(server_forecast.plot_forecast)),
+}
+
+def time_case(name, n, repeats):
+    """Run one case ``repeats`` times on fresh setup state; return the timings in seconds."""
+    _, setup, run = CASES[name]
+    timings = []
+    for _ in range(repeats):
+        state = setup(n)
+        start = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start)
+        if name == 'parse':
+            os.remove(state)
+    return timings
+
+# ===== RESULTS =====
+def environment():
+    """Metadata describing where the results were measured."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Compare median timings with a baseline.
+
+    Returns:
+        list: (case, size, baseline median, current median, ratio, regressed) per shared entry
+    """
+    previous = {(r['case'], r['size']): r['median_s'] for r in baseline['results']}
+    rows = []
+    for r in results:
+        before = previous.get((r['case'], r['size']))
+        if before is None or before <= 0:
+            continue
+        ratio = r['median_s'] / before
+        rows.append((r['case'], r['size'], before, r['median_s'], ratio, ratio > 1 + threshold))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated row counts")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated case names")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed fractional slowdown before a case counts as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(s)) for s in args.sizes.split(",")]
+    cases = [c.strip() for c in args.cases.split(",")]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+
+    results = []
+    for name in cases:
+        for n in sizes:
+            if n > CASES[name][0]:
+                continue
+            timings = time_case(name, n, args.repeats)
+            results.append({
+                'case': name, 'size': n, 'repeats': args.repeats,
+                'min_s': min(timings), 'median_s': statistics.median(timings),
+            })
+            print(f"{name:<16} {n:>10,d}  median {results[-1]['median_s']:.4f}s  min {results[-1]['min_s']:.4f}s",
+                  flush=True)
+
+    report = {'metadata': environment(), 'results': results}
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --save-baseline to record one)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold)
+    regressions = [row for row in rows if row[5]]
+    for case, n, before, after, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{case:<16} {n:>10,d}  {before:.4f}s -> {after:.4f}s  x{ratio:.2f} {flag}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
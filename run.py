@@ -6,12 +6,17 @@ sys.dont_write_bytecode = True
 Run script for the AI Forecasting Application.
 
 This is the entry point script that launches the application.
-Execute this file to start the PyShiny server and application.
+Execute this file to start the PyShiny server, application and REST API under uvicorn.
 """
 
 # ===== IMPORTS =====
+import os
+import logging
+import uvicorn
 from app import app
 
 # ===== APPLICATION RUNNER =====
 if __name__ == "__main__":
-    app.run() 
\ No newline at end of file
+    # INFO emits one structured JSON line per instrumented operation
+    logging.basicConfig(level=os.environ.get("FORECAST_LOG_LEVEL", "WARNING").upper())
+    uvicorn.run(app, host=os.environ.get("HOST", "127.0.0.1"), port=int(os.environ.get("PORT", "8000")))
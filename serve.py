@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+import sys
+# Prevent writing .pyc files during runs
+sys.dont_write_bytecode = True
+"""
+Multi-worker run script for the AI Forecasting Application.
+
+Starts several server processes behind a sticky proxy so concurrent sessions
+use more than one CPU. The worker count is sized from the available CPUs and
+memory unless FORECAST_SERVE_WORKERS or --workers is given.
+"""
+
+# ===== IMPORTS =====
+import os
+import logging
+import argparse
+from server_scripts.serving import default_worker_count, serve
+
+# ===== APPLICATION RUNNER =====
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the app with several worker processes")
+    parser.add_argument("--host", default=os.environ.get("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=None, help="Number of server processes (default: auto)")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.environ.get("FORECAST_LOG_LEVEL", "WARNING").upper())
+    serve(args.host, args.port, args.workers or default_worker_count())
@@ -0,0 +1,376 @@
+"""
+Headless REST API for the AI Forecasting Application.
+Serves forecasts and metrics as JSON or Arrow next to the Shiny UI, using the
+same model code and caches. Work is dispatched to the shared thread pool.
+"""
+import asyncio
+import io
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+from server_scripts.conformal import MIN_TRAIN_SIZE
+from server_scripts.datasets import get_dataset
+from server_scripts.global_helpers import dataset_fingerprint
+from server_scripts.schema import frame_schema
+from server_scripts.out_of_core import lazy_dataset
+from server_scripts.outliers import winsorize_outliers
+from server_scripts.preprocessing import (
+    AGGREGATION_CHOICES, GRAIN_CHOICES, IMPUTATION_CHOICES, fill_gaps, infer_frequency, resample_series
+)
+from server_scripts.server_forecast import fit_forecast_model, predict_forecast, refresh_models
+from server_scripts.workers import get_executor
+from server_scripts.job_queue import get_job_queue, register_handler
+from server_scripts.instrumentation import PROMETHEUS_CONTENT_TYPE, instrumented, render_metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MODEL_TYPES = ["auto_arima", "prophet", "ensemble"]
+INTERVAL_METHODS = ["sampling", "analytic"]
+MAX_UNCERTAINTY_SAMPLES = 1000
+MAX_HORIZON = 1000
+MAX_BATCH_SIZE = 256
+REFRESH_MODEL_TYPES = ["auto_arima", "prophet"]
+MAX_REFRESH_SERIES = 1000
+
+class RequestError(ValueError):
+    """Invalid forecast request, reported to the client as HTTP 400."""
+
+class DatasetNotFound(RequestError):
+    """Unknown or malformed dataset reference, reported to the client as HTTP 404."""
+
+class ModelFitError(Exception):
+    """Valid request whose model could not be fitted, reported to the client as HTTP 422."""
+
+def _check_length(ts_data):
+    if len(ts_data) < MIN_TRAIN_SIZE:
+        raise RequestError(f"Series needs at least {MIN_TRAIN_SIZE} observations, got {len(ts_data)}")
+    return ts_data
+
+# ===== REQUEST HANDLING =====
+def _series_from_payload(payload):
+    """Return (ts_data, time_var, target_var, cache_key) for an inline series or a dataset reference."""
+    if "series" in payload:
+        series = payload["series"]
+        values = series.get("values")
+        if not values:
+            raise RequestError("series.values must be a non-empty list")
+        timestamps = series.get("timestamps")
+        if timestamps is None:
+            times = np.arange(len(values))
+        else:
+            if len(timestamps) != len(values):
+                raise RequestError("series.timestamps and series.values must have the same length")
+            times = pd.to_datetime(pd.Series(timestamps), errors='coerce')
+            if times.isna().any():
+                raise RequestError("series.timestamps contains unparseable values")
+        ts_data = pd.DataFrame({'time': times, 'value': pd.to_numeric(pd.Series(values), errors='coerce')})
+        return _check_length(ts_data.dropna()), 'time', 'value', None
+    if "dataset" in payload:
+        try:
+            df = get_dataset(payload["dataset"])
+        except KeyError as e:
+            raise DatasetNotFound(e.args[0])
+        schema = frame_schema(df)
+        time_var = payload.get("time_var", schema['time_var'])
+        target_var = payload.get("target_var", schema['target_var'])
+        for col in (time_var, target_var):
+            if col not in df.columns:
+                raise RequestError(f"Column not found in dataset: {col}")
+        cache_key = df.attrs.get('dataset_key') or dataset_fingerprint(df)
+        lazy = lazy_dataset(df)
+        if lazy is not None:
+            ts_data = lazy.series(time_var, target_var, grain=payload.get("grain", "raw"),
+                                  how=payload.get("aggregation", "mean"))
+            return _check_length(ts_data), time_var, target_var, cache_key
+        ts_data = df[[time_var, target_var]]
+        if time_var != schema['time_var'] or not schema['sorted']:
+            ts_data = ts_data.sort_values(by=time_var)
+        return _check_length(ts_data), time_var, target_var, cache_key
+    raise RequestError("Request needs either 'series' or 'dataset'")
+
+def _horizon(payload):
+    try:
+        horizon = int(payload.get("horizon", 12))
+    except (TypeError, ValueError):
+        raise RequestError("horizon must be an integer")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise RequestError(f"horizon must be between 1 and {MAX_HORIZON}")
+    return horizon
+
+def _fit_options(payload, horizon):
+    """Validated keyword arguments of ``fit_forecast_model`` taken from a request, with the API's defaults."""
+    try:
+        uncertainty_samples = int(payload.get("uncertainty_samples", 200))
+    except (TypeError, ValueError):
+        raise RequestError("uncertainty_samples must be an integer")
+    if not 0 <= uncertainty_samples <= MAX_UNCERTAINTY_SAMPLES:
+        raise RequestError(f"uncertainty_samples must be between 0 and {MAX_UNCERTAINTY_SAMPLES}")
+    interval_method = payload.get("interval_method", "analytic")
+    if interval_method not in INTERVAL_METHODS:
+        raise RequestError(f"interval_method must be one of {INTERVAL_METHODS}")
+    return dict(
+        fast_mode=bool(payload.get("fast_mode", True)),
+        uncertainty_samples=uncertainty_samples,
+        interval_method=interval_method,
+        members=payload.get("members"),
+        max_horizon=horizon
+    )
+
+@instrumented("api_forecast")
+def run_forecast_request(payload):
+    """
+    Fit and forecast one request through the same path as the UI.
+
+    Args:
+        payload (dict): Request fields: ``series`` ({timestamps, values}) or ``dataset``
+            (fingerprint or bundled name, with optional ``time_var``/``target_var``),
+            plus ``model``, ``horizon``, ``grain``, ``aggregation``, ``impute``, ``winsorize`` and model options
+
+    Returns:
+        dict: The forecast result from ``predict_forecast``
+
+    Prophet runs in fast mode with analytic intervals unless ``fast_mode`` is false.
+    """
+    if not isinstance(payload, dict):
+        raise RequestError("Each request must be a JSON object")
+    model_type = payload.get("model", "auto_arima")
+    if model_type not in MODEL_TYPES:
+        raise RequestError(f"model must be one of {MODEL_TYPES}")
+    horizon = _horizon(payload)
+    options = _fit_options(payload, horizon)
+    impute = payload.get("impute", "none")
+    if impute not in IMPUTATION_CHOICES:
+        raise RequestError(f"impute must be one of {list(IMPUTATION_CHOICES)}")
+    grain, how = payload.get("grain", "raw"), payload.get("aggregation", "mean")
+    if grain not in GRAIN_CHOICES:
+        raise RequestError(f"grain must be one of {list(GRAIN_CHOICES)}")
+    if how not in AGGREGATION_CHOICES:
+        raise RequestError(f"aggregation must be one of {list(AGGREGATION_CHOICES)}")
+    ts_data, time_var, target_var, cache_key = _series_from_payload(payload)
+    ts_data = resample_series(ts_data, time_var, target_var, grain=grain, how=how, cache_key=cache_key)
+    if impute != "none":
+        if grain != "raw":
+            freq = grain
+        elif pd.api.types.is_datetime64_any_dtype(ts_data[time_var]):
+            freq = infer_frequency(ts_data[time_var])
+        else:
+            freq = None
+        ts_data = fill_gaps(
+            ts_data, time_var, freq=freq, method=impute,
+            cache_key=(cache_key, grain, how) if cache_key is not None else None
+        )
+    if payload.get("winsorize"):
+        ts_data, _ = winsorize_outliers(ts_data, [target_var])
+    # Resampling to a coarser grain can leave too few periods to fit
+    _check_length(ts_data)
+    try:
+        fitted = fit_forecast_model(ts_data, time_var, target_var, model_type, **options)
+        return predict_forecast(fitted, horizon)
+    except Exception as e:
+        raise ModelFitError(f"{model_type} could not be fitted to this series: {e}") from e
+
+def _refresh_series(payload):
+    """Validate a refresh request; return (model_type, horizon, fit options, {name: ts_data with time and value columns})."""
+    if not isinstance(payload, dict):
+        raise RequestError("Request must be a JSON object")
+    model_type = payload.get("model", "auto_arima")
+    if model_type not in REFRESH_MODEL_TYPES:
+        raise RequestError(f"model must be one of {REFRESH_MODEL_TYPES}")
+    horizon = _horizon(payload)
+    options = _fit_options(payload, horizon)
+    series = payload.get("series")
+    if not isinstance(series, dict) or not series:
+        raise RequestError("series must be a non-empty object of name: {timestamps, values}")
+    if len(series) > MAX_REFRESH_SERIES:
+        raise RequestError(f"At most {MAX_REFRESH_SERIES} series per refresh")
+    frames = {}
+    for name, values in series.items():
+        if not isinstance(values, dict):
+            raise RequestError(f"series.{name} must be an object with timestamps and values")
+        try:
+            frames[name] = _series_from_payload({'series': values})[0]
+        except RequestError as e:
+            raise RequestError(f"{name}: {e}")
+    return model_type, horizon, options, frames
+
+def run_refresh_request(payload):
+    """
+    Bring the cached fits of many series up to date and forecast each of them.
+
+    Fits are made with the same options as ``/forecast`` would use for the same
+    fields, so a later forecast request for a refreshed series is served from
+    its cached fit. Series that only gained rows since their last refresh are
+    updated incrementally (see ``refresh_models``) instead of being refit.
+
+    Returns:
+        dict: The model type and, per series name, its forecast as ``/forecast`` returns it
+    """
+    model_type, horizon, options, frames = _refresh_series(payload)
+    try:
+        fitted = refresh_models(frames, 'time', 'value', model_type, **options)
+        forecasts = {name: _to_json(predict_forecast(fit, horizon)) for name, fit in fitted.items()}
+    except Exception as e:
+        raise ModelFitError(f"{model_type} could not be fitted to every series: {e}") from e
+    return {'model': model_type, 'series': forecasts}
+
+def forecast_frame(result):
+    """Forecast rows of a result as a DataFrame (timestamp, value, lower, upper)."""
+    horizon = len(result['y_forecast'])
+    lower = upper = np.full(horizon, np.nan)
+    if result['x_band'] is not None:
+        lower = np.asarray(result['lower'], dtype=float)[-horizon:]
+        upper = np.asarray(result['upper'], dtype=float)[-horizon:]
+    return pd.DataFrame({
+        'timestamp': np.asarray(result['x_forecast']),
+        'value': np.asarray(result['y_forecast'], dtype=float),
+        'lower': lower,
+        'upper': upper,
+    })
+
+def _to_json(result):
+    frame = forecast_frame(result)
+    timestamps = frame['timestamp']
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = timestamps.dt.strftime('%Y-%m-%dT%H:%M:%S')
+    frame = frame.assign(timestamp=timestamps).astype(object)
+    frame = frame.where(pd.notna(frame), None)
+    return {
+        'model': result['model_type'],
+        'target_var': result['target_var'],
+        'horizon': result['horizon'],
+        'forecast': frame.to_dict(orient='list'),
+        'metrics': result['metrics'].to_dict(orient='records'),
+    }
+
+def _to_arrow(result):
+    table = pa.Table.from_pandas(forecast_frame(result), preserve_index=False)
+    metrics = result['metrics'].to_json(orient='records')
+    table = table.replace_schema_metadata({'model': result['model_type'], 'metrics': metrics})
+    sink = io.BytesIO()
+    with pa_ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def _payload_from_arrow(body, params):
+    """Build a request payload from an Arrow IPC stream body (time, value columns) and query parameters."""
+    table = pa_ipc.open_stream(io.BytesIO(body)).read_all()
+    if table.num_columns < 1:
+        raise RequestError("Arrow body must contain at least a value column")
+    frame = table.to_pandas()
+    if table.num_columns == 1:
+        series = {'values': frame.iloc[:, 0].tolist()}
+    else:
+        series = {'timestamps': frame.iloc[:, 0].astype(str).tolist(), 'values': frame.iloc[:, 1].tolist()}
+    payload = dict(params)
+    payload['series'] = series
+    if 'members' in payload:
+        payload['members'] = payload['members'].split(',')
+    if 'fast_mode' in payload:
+        payload['fast_mode'] = payload['fast_mode'].lower() in ('1', 'true', 'yes')
+    return payload
+
+async def _dispatch(payload):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor("thread"), run_forecast_request, payload)
+
+def _wants_arrow(request):
+    return ARROW_AVAILABLE and ARROW_MEDIA_TYPE in request.headers.get("accept", "")
+
+# ===== ENDPOINTS =====
+async def health(request):
+    return JSONResponse({'status': 'ok'})
+
+async def models(request):
+    return JSONResponse({'models': MODEL_TYPES, 'arrow': ARROW_AVAILABLE})
+
+async def metrics(request):
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+async def forecast(request):
+    try:
+        if request.headers.get("content-type", "").startswith(ARROW_MEDIA_TYPE):
+            if not ARROW_AVAILABLE:
+                return JSONResponse({'error': 'pyarrow is not installed'}, status_code=415)
+            payload = _payload_from_arrow(await request.body(), request.query_params)
+        else:
+            payload = await request.json()
+        result = await _dispatch(payload)
+    except DatasetNotFound as e:
+        return JSONResponse({'error': str(e)}, status_code=404)
+    except ModelFitError as e:
+        return JSONResponse({'error': str(e)}, status_code=422)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    if _wants_arrow(request):
+        return Response(_to_arrow(result), media_type=ARROW_MEDIA_TYPE)
+    return JSONResponse(_to_json(result))
+
+async def forecast_batch(request):
+    try:
+        body = await request.json()
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    requests = body.get('requests') if isinstance(body, dict) else None
+    if not isinstance(requests, list) or not requests:
+        return JSONResponse({'error': "Body must be {'requests': [...]}"}, status_code=400)
+    if len(requests) > MAX_BATCH_SIZE:
+        return JSONResponse({'error': f"At most {MAX_BATCH_SIZE} requests per batch"}, status_code=400)
+    outcomes = await asyncio.gather(*(_dispatch(p) for p in requests), return_exceptions=True)
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            results.append({'error': str(outcome)})
+        else:
+            results.append(_to_json(outcome))
+    return JSONResponse({'results': results})
+
+def _job_owner(request):
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "api")
+
+async def submit_job(request):
+    try:
+        payload = await request.json()
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    job_id = get_job_queue().submit("api_forecast", payload, owner=_job_owner(request))
+    return JSONResponse({'id': job_id}, status_code=202)
+
+async def refresh(request):
+    try:
+        payload = await request.json()
+        _refresh_series(payload)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    job_id = get_job_queue().submit("refresh_models", payload, owner=_job_owner(request))
+    return JSONResponse({'id': job_id}, status_code=202)
+
+async def job_status(request):
+    queue = get_job_queue()
+    status = queue.status(request.path_params['job_id'])
+    if status is None:
+        return JSONResponse({'error': 'Unknown job'}, status_code=404)
+    if status['status'] == 'done':
+        status['result'] = queue.result(status['id'])
+    return JSONResponse(status)
+
+register_handler("api_forecast", lambda payload: _to_json(run_forecast_request(payload)))
+register_handler("refresh_models", run_refresh_request)
+
+api_app = Starlette(routes=[
+    Route("/health", health, methods=["GET"]),
+    Route("/models", models, methods=["GET"]),
+    Route("/metrics", metrics, methods=["GET"]),
+    Route("/forecast", forecast, methods=["POST"]),
+    Route("/forecast/batch", forecast_batch, methods=["POST"]),
+    Route("/jobs", submit_job, methods=["POST"]),
+    Route("/refresh", refresh, methods=["POST"]),
+    Route("/jobs/{job_id}", job_status, methods=["GET"]),
+])
@@ -0,0 +1,199 @@
+"""
+Static asset pipeline for the AI Forecasting Application.
+Third-party assets are vendored into www/vendor so the app works offline. The
+app's own and vendored assets are copied to www/dist under content-hashed
+names, precompressed (gzip, and brotli when available) and served with
+long-lived immutable cache headers. The head tags look names up in the manifest.
+
+Usage:
+    python -m server_scripts.assets --vendor    # download vendored assets, then build
+    python -m server_scripts.assets             # rebuild www/dist
+"""
+import os
+import io
+import gzip
+import json
+import shutil
+import hashlib
+import zipfile
+import mimetypes
+import argparse
+import urllib.request
+from server_scripts.global_helpers import APP_DIR
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+WWW_DIR = os.path.join(APP_DIR, "www")
+DIST_DIR = os.path.join(WWW_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+# URL prefix the dist directory is mounted under (see app.py)
+DIST_URL = "dist"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+FONT_AWESOME_VERSION = "6.4.0"
+FONT_AWESOME_DIR = f"vendor/fontawesome-{FONT_AWESOME_VERSION}"
+FONT_AWESOME_ZIP = (f"https://use.fontawesome.com/releases/v{FONT_AWESOME_VERSION}/"
+                    f"fontawesome-free-{FONT_AWESOME_VERSION}-web.zip")
+FONT_AWESOME_CSS = f"{FONT_AWESOME_DIR}/css/all.min.css"
+# Used only when the stylesheet has not been vendored yet
+FONT_AWESOME_CDN = f"https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}/css/all.min.css"
+
+# Files referenced from the page, relative to www/; they get fingerprinted names
+ENTRY_ASSETS = ["custom.css", "custom.js", "charts.js", FONT_AWESOME_CSS]
+# Files referenced by relative URL from an entry asset keep their names and
+# directory layout (the version in their path changes when they do)
+COPIED_ASSET_DIRS = [f"{FONT_AWESOME_DIR}/webfonts"]
+COMPRESSIBLE = (".css", ".js", ".svg", ".ttf", ".json")
+
+# ===== VENDORING =====
+def vendor_font_awesome():
+    """Download the Font Awesome web release and keep its stylesheet and fonts under www/vendor."""
+    with urllib.request.urlopen(FONT_AWESOME_ZIP, timeout=60) as response:
+        archive = zipfile.ZipFile(io.BytesIO(response.read()))
+    target = os.path.join(WWW_DIR, FONT_AWESOME_DIR)
+    prefix = f"fontawesome-free-{FONT_AWESOME_VERSION}-web/"
+    for name in archive.namelist():
+        relative = name[len(prefix):]
+        if not (relative == "css/all.min.css" or relative.startswith("webfonts/")) or name.endswith("/"):
+            continue
+        path = os.path.join(target, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(archive.read(name))
+
+# ===== BUILD =====
+def _fingerprinted_name(relative, content):
+    stem, ext = os.path.splitext(relative)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+def _write_compressed(path, content):
+    """Write ``content`` to ``path`` plus ``.gz`` and ``.br`` siblings for text assets."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    if not path.endswith(COMPRESSIBLE):
+        return
+    with open(f"{path}.gz", "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if BROTLI_AVAILABLE:
+        with open(f"{path}.br", "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+
+def _source_files():
+    files = [name for name in ENTRY_ASSETS if os.path.exists(os.path.join(WWW_DIR, name))]
+    for directory in COPIED_ASSET_DIRS:
+        root = os.path.join(WWW_DIR, directory)
+        if os.path.isdir(root):
+            for name in sorted(os.listdir(root)):
+                files.append(f"{directory}/{name}")
+    return files
+
+def build_assets():
+    """
+    Rebuild www/dist from the current sources and write the manifest.
+
+    Returns:
+        dict: Logical asset name -> URL path under DIST_URL
+    """
+    manifest = {}
+    staging = f"{DIST_DIR}.{os.getpid()}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    for relative in _source_files():
+        with open(os.path.join(WWW_DIR, relative), "rb") as f:
+            content = f.read()
+        built = _fingerprinted_name(relative, content) if relative in ENTRY_ASSETS else relative
+        _write_compressed(os.path.join(staging, built), content)
+        manifest[relative] = built
+    os.makedirs(staging, exist_ok=True)
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    # Old names stay servable until the swap, so open pages keep working
+    previous = f"{DIST_DIR}.{os.getpid()}.old"
+    if os.path.isdir(DIST_DIR):
+        os.replace(DIST_DIR, previous)
+    os.replace(staging, DIST_DIR)
+    shutil.rmtree(previous, ignore_errors=True)
+    return manifest
+
+def _is_stale():
+    if not os.path.exists(MANIFEST_PATH):
+        return True
+    built_at = os.path.getmtime(MANIFEST_PATH)
+    return any(os.path.getmtime(os.path.join(WWW_DIR, name)) > built_at for name in _source_files())
+
+def load_manifest():
+    """The asset manifest, rebuilt first when a source asset changed since the last build."""
+    try:
+        if _is_stale():
+            return build_assets()
+    except OSError:
+        # Read-only deployment, or another worker swapping in the same build
+        pass
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def asset_url(name, manifest=None, fallback=None):
+    """
+    URL of a static asset for the page head.
+
+    Args:
+        name (str): Path relative to www/
+        manifest (dict): Output of ``load_manifest``
+        fallback (str): URL used when the asset is neither built nor present in www/
+
+    Returns:
+        str: The fingerprinted URL, the plain URL or ``fallback``
+    """
+    manifest = load_manifest() if manifest is None else manifest
+    if name in manifest:
+        return f"{DIST_URL}/{manifest[name]}"
+    if fallback is not None and not os.path.exists(os.path.join(WWW_DIR, name)):
+        return fallback
+    return name
+
+# ===== SERVING =====
+def _accepted_encodings(request):
+    header = request.headers.get("accept-encoding", "")
+    return {part.split(";")[0].strip() for part in header.split(",")}
+
+async def serve_asset(request):
+    """Serve a built asset with immutable caching, preferring a precompressed variant."""
+    from starlette.responses import FileResponse, PlainTextResponse
+    relative = request.path_params["path"]
+    path = os.path.realpath(os.path.join(DIST_DIR, relative))
+    if not path.startswith(os.path.realpath(DIST_DIR) + os.sep) or not os.path.isfile(path):
+        return PlainTextResponse("Not Found", status_code=404)
+    headers = {"Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    encodings = _accepted_encodings(request)
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in encodings and os.path.isfile(f"{path}{suffix}"):
+            headers["Content-Encoding"] = encoding
+            return FileResponse(f"{path}{suffix}", headers=headers, media_type=_media_type(path))
+    return FileResponse(path, headers=headers, media_type=_media_type(path))
+
+def _media_type(path):
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+def dist_app():
+    """ASGI app serving www/dist; mount it under ``/dist``."""
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+    return Starlette(routes=[Route("/{path:path}", serve_asset, methods=["GET", "HEAD"])])
+
+# ===== COMMAND LINE =====
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vendor, fingerprint and precompress static assets")
+    parser.add_argument("--vendor", action="store_true", help="Download third-party assets into www/vendor first")
+    args = parser.parse_args()
+    if args.vendor:
+        vendor_font_awesome()
+    manifest = build_assets()
+    print(f"Built {len(manifest)} assets into {DIST_DIR}"
+          f"{'' if BROTLI_AVAILABLE else ' (install brotli for .br variants)'}")
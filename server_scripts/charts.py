@@ -0,0 +1,181 @@
+"""
+Payloads for the client-side (canvas) charts of the AI Forecasting Application.
+Series are downsampled on the server and sent once as base64-encoded typed
+arrays; the browser (www/charts.js) draws them and handles zoom, pan and hover
+without further round-trips.
+"""
+import base64
+import numpy as np
+import pandas as pd
+from server_scripts.schema import frame_schema
+
+# Points sent per line; longer series are downsampled with LTTB
+MAX_CHART_POINTS = 4000
+# Above this many points per output point, a min/max pass runs before LTTB
+MINMAX_PREREDUCTION = 8
+CHART_MESSAGE = "chart-data"
+
+# ===== DOWNSAMPLING =====
+def minmax_downsample(x, y, n_buckets):
+    """
+    Keep the minimum and maximum of ``y`` in each of ``n_buckets`` equal-count
+    buckets, in their original order, so peaks and troughs survive.
+
+    Returns:
+        numpy.ndarray: Indices of the kept points, sorted
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    filled = np.where(np.isnan(y), -np.inf, y)
+    idx_max = starts + np.array([np.argmax(filled[a:b]) for a, b in zip(starts, edges[1:])])
+    filled = np.where(np.isnan(y), np.inf, y)
+    idx_min = starts + np.array([np.argmin(filled[a:b]) for a, b in zip(starts, edges[1:])])
+    return np.unique(np.concatenate([[0], idx_min, idx_max, [n - 1]]))
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are kept; from every bucket in between the point
+    forming the largest triangle with the previously kept point and the mean of
+    the next bucket is kept, which preserves the visual shape of the line.
+
+    Args:
+        x (numpy.ndarray): Increasing x values (float)
+        y (numpy.ndarray): y values (float, no NaN)
+        n_out (int): Number of points to keep (at least 3)
+
+    Returns:
+        numpy.ndarray: Indices of the kept points, sorted
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[previous] - next_x) * (by - y[previous]) - (x[previous] - bx) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(area))
+        kept[i + 1] = previous
+    return kept
+
+def downsample(x, y, max_points=MAX_CHART_POINTS):
+    """
+    Indices of at most ``max_points`` points representing the line ``(x, y)``.
+
+    Missing values are dropped first. Very long series get a min/max pass
+    before LTTB, which keeps the cost linear in the input length.
+    """
+    valid = np.flatnonzero(~np.isnan(y) & ~np.isnan(x))
+    if len(valid) <= max_points:
+        return valid
+    vx, vy = x[valid], y[valid]
+    if len(valid) > MINMAX_PREREDUCTION * max_points:
+        reduced = minmax_downsample(vx, vy, MINMAX_PREREDUCTION * max_points // 2)
+        valid, vx, vy = valid[reduced], vx[reduced], vy[reduced]
+    return valid[lttb(vx, vy, max_points)]
+
+# ===== ENCODING =====
+def axis_values(values):
+    """
+    Numeric x values and the axis kind of a time or numeric column.
+
+    Datetimes become milliseconds since the epoch (as JavaScript ``Date`` expects).
+
+    Returns:
+        tuple: (numpy.ndarray of float64, "time" or "linear")
+    """
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if pd.api.types.is_datetime64_any_dtype(values):
+        ms = values.to_numpy(dtype='datetime64[ms]').astype(np.int64).astype(np.float64)
+        ms[values.isna().to_numpy()] = np.nan
+        return ms, "time"
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64), "linear"
+
+def encode_array(values, dtype=np.float64):
+    """Base64 of the little-endian bytes of an array, decoded as a typed array by the browser."""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<')).tobytes()).decode('ascii')
+
+def line_series(name, x, y, color, max_points=MAX_CHART_POINTS, dash=False, markers=False):
+    """One downsampled line (or markers only): x as float64 and y as float32 typed arrays."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    kept = downsample(x, y, max_points)
+    return {
+        'name': name, 'color': color, 'dash': dash, 'markers': markers, 'n': int(len(kept)), 'total': int(len(y)),
+        'x': encode_array(x[kept]), 'y': encode_array(y[kept], np.float32),
+    }
+
+def band_series(name, x, lower, upper, color):
+    """A shaded interval between ``lower`` and ``upper``."""
+    x = np.asarray(x, dtype=np.float64)
+    lower = np.asarray(lower, dtype=np.float64)
+    upper = np.asarray(upper, dtype=np.float64)
+    valid = ~(np.isnan(x) | np.isnan(lower) | np.isnan(upper))
+    return {
+        'name': name, 'color': color, 'n': int(valid.sum()),
+        'x': encode_array(x[valid]), 'lower': encode_array(lower[valid], np.float32),
+        'upper': encode_array(upper[valid], np.float32),
+    }
+
+def chart_payload(chart_id, title, x_label, y_label, x_kind, lines, bands=(), message=None):
+    """Message for the ``chart-data`` handler of www/charts.js."""
+    return {
+        'id': chart_id, 'title': title, 'xLabel': x_label, 'yLabel': y_label, 'xKind': x_kind,
+        'lines': list(lines), 'bands': list(bands), 'message': message,
+    }
+
+def empty_chart(chart_id, message):
+    """Payload that clears a chart and shows a message instead."""
+    return chart_payload(chart_id, "", "", "", "linear", [], message=message)
+
+# ===== CHARTS =====
+def data_chart(chart_id, df, outliers=None):
+    """``build_data_viz`` as a client-side chart: the target over time with a linear trend."""
+    schema = frame_schema(df)
+    target_col = schema['target_var']
+    if target_col not in schema['numeric_cols']:
+        return empty_chart(chart_id, "No numeric columns found for visualization")
+    if schema['time_kind'] != "other":
+        x, x_kind = axis_values(df[schema['time_var']])
+        x_label = schema['time_var']
+    else:
+        x, x_kind = np.arange(len(df), dtype=np.float64), "linear"
+        x_label = 'Index'
+    y = df[target_col].to_numpy(dtype=np.float64)
+    lines = [line_series(target_col, x, y, "#1f77b4")]
+    valid = ~np.isnan(y)
+    if valid.sum() >= 2:
+        # The trend is fitted against the row position, like the matplotlib version
+        position = np.arange(len(y), dtype=np.float64)
+        slope, intercept = np.polyfit(position[valid], y[valid], 1)
+        ends = np.array([0, len(y) - 1])
+        lines.append(line_series('Trend', x[ends], slope * ends + intercept, "#d62728", dash=True))
+    if outliers is not None and outliers.any():
+        lines.append(line_series(f'Outliers ({int(outliers.sum())})', x[outliers], y[outliers], "#d62728",
+                                 markers=True))
+    return chart_payload(chart_id, f'Time Series Plot of {target_col}', x_label, target_col, x_kind, lines)
+
+def forecast_chart(chart_id, result, interval_label):
+    """``plot_forecast`` as a client-side chart: actuals, forecast and interval band."""
+    x_actual, x_kind = axis_values(result['x_actual'])
+    x_forecast, _ = axis_values(result['x_forecast'])
+    lines = [
+        line_series('Actual', x_actual, result['y_actual'], "#1f77b4"),
+        line_series('Forecast', x_forecast, result['y_forecast'], "#d62728"),
+    ]
+    bands = []
+    if result['x_band'] is not None and not np.all(np.isnan(result['lower'])):
+        x_band, _ = axis_values(result['x_band'])
+        bands.append(band_series(interval_label, x_band, result['lower'], result['upper'], "#d62728"))
+    title = f"{result['label']} Forecast for {result['target_var']} (Next {result['horizon']} periods)"
+    return chart_payload(chart_id, title, 'Time', result['target_var'], x_kind, lines, bands)
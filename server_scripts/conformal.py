@@ -0,0 +1,119 @@
+"""
+Model-agnostic conformal prediction intervals.
+Out-of-sample residuals from rolling-origin backtests are computed once per
+model and dataset, cached, and turned into interval half-widths for any point forecast.
+"""
+import hashlib
+import numpy as np
+from server_scripts.global_helpers import LRUCache
+from server_scripts.workers import thread_map
+
+DEFAULT_COVERAGE = 0.95
+DEFAULT_WINDOWS = 20
+# Smallest training prefix used for a backtest window
+MIN_TRAIN_SIZE = 8
+
+# Absolute backtest residuals keyed by (model name, series key): {'horizon', 'residuals'}
+_residual_cache = LRUCache(maxsize=128, name="conformal_residuals", shared=True)
+
+def values_key(values):
+    """Content hash of a 1-D series, used as the dataset part of the cache key."""
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=float).tobytes()).hexdigest()
+
+def backtest_origins(n_obs, horizon, n_windows=DEFAULT_WINDOWS):
+    """Forecast origins for rolling-origin evaluation, latest last; empty if the series is too short."""
+    last = n_obs - horizon
+    first = max(MIN_TRAIN_SIZE, last - n_windows + 1)
+    if last < first:
+        return np.array([], dtype=int)
+    return np.arange(first, last + 1)
+
+def backtest_residuals(values, forecaster, horizon, n_windows=DEFAULT_WINDOWS, origins=None):
+    """
+    Out-of-sample forecast errors from a rolling-origin backtest.
+
+    Args:
+        values (array): Time series values
+        forecaster (callable): ``forecaster(train_values, horizon) -> array`` of point forecasts
+        horizon (int): Forecast horizon
+        n_windows (int): Number of forecast origins
+        origins (array): Explicit forecast origins, overriding ``n_windows``
+
+    Returns:
+        numpy.ndarray: Actual minus forecast, shape (n_origins, horizon)
+    """
+    values = np.asarray(values, dtype=float)
+    if origins is None:
+        origins = backtest_origins(len(values), horizon, n_windows)
+    if len(origins) == 0:
+        return np.empty((0, horizon))
+
+    def window(origin):
+        forecast = np.asarray(forecaster(values[:origin], horizon), dtype=float)[:horizon]
+        return values[origin:origin + horizon] - forecast
+
+    return np.vstack(thread_map(window, origins))
+
+def conformal_quantiles(abs_residuals, coverage=DEFAULT_COVERAGE):
+    """
+    Per-step interval half-widths from absolute residuals (n_windows x horizon).
+
+    Uses the finite-sample corrected level ceil((n + 1) * coverage) / n; steps with
+    too few windows for the requested coverage fall back to the largest residual.
+    """
+    n = np.sum(~np.isnan(abs_residuals), axis=0)
+    if abs_residuals.shape[0] == 0:
+        return np.full(abs_residuals.shape[1], np.nan)
+    level = np.minimum(np.ceil((n + 1) * coverage) / np.maximum(n, 1), 1.0)
+    sorted_res = np.sort(abs_residuals, axis=0)
+    index = np.clip(np.ceil(level * n).astype(int) - 1, 0, abs_residuals.shape[0] - 1)
+    return sorted_res[index, np.arange(abs_residuals.shape[1])]
+
+def cached_conformal_quantiles(model_name, series_key, horizon, coverage=DEFAULT_COVERAGE):
+    """Conformal half-widths from the cache only, or None if a backtest is still needed."""
+    cached = _residual_cache.get((model_name, series_key))
+    if cached is None or cached['horizon'] < horizon:
+        return None
+    return conformal_quantiles(cached['residuals'][:, :horizon], coverage)
+
+def get_conformal_quantiles(model_name, series_key, values, forecaster, horizon,
+                            coverage=DEFAULT_COVERAGE, n_windows=DEFAULT_WINDOWS):
+    """
+    Cached conformal half-widths for a model and series.
+
+    The backtest runs only when no residuals are cached for this model and series,
+    or when a longer horizon than the cached one is requested.
+    """
+    key = (model_name, series_key)
+    cached = _residual_cache.get(key)
+    if cached is None or cached['horizon'] < horizon:
+        residuals = np.abs(backtest_residuals(values, forecaster, horizon, n_windows))
+        cached = {'horizon': horizon, 'residuals': residuals}
+        _residual_cache.set(key, cached)
+    return conformal_quantiles(cached['residuals'][:, :horizon], coverage)
+
+def conformal_interval(point_forecast, half_widths):
+    """Return (lower, upper) bounds around a point forecast; steps beyond ``half_widths`` get NaN bounds."""
+    point_forecast = np.asarray(point_forecast, dtype=float)
+    half_widths = np.asarray(half_widths, dtype=float)[:len(point_forecast)]
+    if len(half_widths) < len(point_forecast):
+        half_widths = np.concatenate([half_widths, np.full(len(point_forecast) - len(half_widths), np.nan)])
+    return point_forecast - half_widths, point_forecast + half_widths
+
+def forecast_with_interval(values, forecaster, horizon, model_name, coverage=DEFAULT_COVERAGE):
+    """
+    Point forecast plus conformal interval for any ``forecaster(values, horizon)``.
+
+    Works with the backends in ``server_scripts.helpers.functions`` (``lstm_forecast``,
+    ``automl_forecast``, ``arfima_forecast``), which have no interval of their own.
+
+    Returns:
+        tuple: (point forecast, lower bound, upper bound)
+    """
+    values = np.asarray(values, dtype=float)
+    point = np.asarray(forecaster(values, horizon), dtype=float)
+    half_widths = get_conformal_quantiles(
+        model_name, values_key(values), values, forecaster, horizon, coverage
+    )
+    lower, upper = conformal_interval(point, half_widths)
+    return point, lower, upper
@@ -0,0 +1,320 @@
+"""
+Process-wide, content-addressed dataset store for the AI Forecasting Application.
+Uploaded files are keyed by the hash of their bytes, so identical uploads from
+different sessions are parsed once. Each dataset is written as an immutable Arrow
+file, memory-mapped back and shared by every session holding a handle to it, and
+derived artefacts (summary statistics, reports) are computed once per dataset.
+Datasets nobody holds are evicted from memory after an idle period; the Arrow
+file stays on disk so a later upload of the same content skips parsing.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import pandas as pd
+from server_scripts.global_helpers import APP_DIR, CACHE_DIR, dataset_fingerprint
+from server_scripts.instrumentation import record_cache, register_gauge_callback
+from server_scripts.schema import normalize_frame
+from server_scripts.storage import COMPACT_STORAGE, compact_frame
+from server_scripts.out_of_core import close_lazy, open_lazy, parquet_keys, use_out_of_core
+from server_scripts.shared_cache import shared_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Datasets shipped with the app, addressable by name
+BUNDLED_DATASETS = {
+    "demo": os.path.join(APP_DIR, "timeseries_demo.csv"),
+}
+STORE_DIR = os.path.join(CACHE_DIR, "datasets")
+# Seconds a dataset with no open handles stays in memory
+IDLE_EVICT_SECONDS = int(os.environ.get("FORECAST_DATASET_IDLE_SECONDS", "600"))
+# Arrow files kept on disk; the least recently used are deleted beyond this
+STORE_MAX_FILES = 256
+# Part of the Arrow file names; bump when stored frames change (2: exact float compaction)
+STORE_FORMAT = 2
+_ATTRS_METADATA_KEY = b"forecast_attrs"
+_HASH_CHUNK = 1 << 20
+# Dataset references are SHA-1 frame fingerprints or SHA-256 file digests
+_KEY_PATTERN = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+class _Entry:
+    """One stored dataset: its shared frame, open handle count and derived artefacts."""
+
+    def __init__(self, key):
+        self.key = key
+        self.frame = None
+        self.refs = 0
+        self.last_used = time.monotonic()
+        self.derived = {}
+        self.lock = threading.Lock()
+
+_entries = {}
+_bundled_keys = {}
+_lock = threading.Lock()
+# Sentinel for a miss in the shared cache (an artefact may itself be None)
+_MISSING = object()
+
+def content_key(path):
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def prepare_frame(df):
+    """Ingestion pipeline applied to every stored dataset: schema normalization and compaction."""
+    df = normalize_frame(df)
+    return compact_frame(df) if COMPACT_STORAGE else df
+
+# ===== ARROW PERSISTENCE =====
+def is_dataset_key(ref):
+    """Whether ``ref`` has the form of a stored dataset's key (a hex digest)."""
+    return isinstance(ref, str) and _KEY_PATTERN.fullmatch(ref) is not None
+
+def _arrow_path(key):
+    if not is_dataset_key(key):
+        raise ValueError(f"Invalid dataset key: {key!r}")
+    return os.path.join(STORE_DIR, f"{key}.v{STORE_FORMAT}.arrow")
+
+def _write_arrow(key, df):
+    """Write a frame as an uncompressed Arrow file (so it can be memory-mapped), attrs included."""
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_ATTRS_METADATA_KEY] = json.dumps(df.attrs, default=str).encode()
+    table = table.replace_schema_metadata(metadata)
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp_path = f"{_arrow_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa_ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, _arrow_path(key))
+    _prune_files()
+
+def _read_arrow(key):
+    """
+    Memory-map a stored Arrow file into a frame.
+
+    Numeric columns without missing values are zero-copy, read-only views of the
+    mapped file, so their pages are shared by every session and worker process.
+    """
+    path = _arrow_path(key)
+    table = pa_ipc.open_file(pa.memory_map(path, "r")).read_all()
+    df = table.to_pandas(split_blocks=True)
+    attrs = (table.schema.metadata or {}).get(_ATTRS_METADATA_KEY)
+    if attrs:
+        df.attrs = json.loads(attrs)
+    df.attrs['dataset_key'] = key
+    os.utime(path)
+    return df
+
+def _prune_files():
+    files = [os.path.join(STORE_DIR, name) for name in os.listdir(STORE_DIR) if name.endswith(".arrow")]
+    if len(files) <= STORE_MAX_FILES:
+        return
+    files.sort(key=os.path.getmtime)
+    for path in files[:len(files) - STORE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    _prune_out_of_core()
+
+def _prune_out_of_core():
+    """Delete the Parquet copies of out-of-core datasets that are neither loaded nor stored."""
+    try:
+        stored = {name.split(".")[0] for name in os.listdir(STORE_DIR) if name.endswith(".arrow")}
+    except OSError:
+        stored = set()
+    with _lock:
+        loaded = set(_entries)
+    for key in parquet_keys():
+        if key not in stored and key not in loaded:
+            close_lazy(key, remove_file=True)
+
+# ===== STORE =====
+def _load(key, build):
+    """
+    Return the entry for ``key`` with its frame loaded: from memory, from the
+    Arrow file, or by calling ``build()`` and persisting the result.
+    """
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            entry = _entries[key] = _Entry(key)
+    with entry.lock:
+        record_cache("datasets", entry.frame is not None)
+        if entry.frame is None:
+            try:
+                entry.frame = _materialize(key, build)
+            except Exception:
+                with _lock:
+                    if entry.refs == 0 and entry.frame is None:
+                        _entries.pop(key, None)
+                raise
+        entry.last_used = time.monotonic()
+    return entry
+
+def _materialize(key, build):
+    if ARROW_AVAILABLE and os.path.exists(_arrow_path(key)):
+        try:
+            return _read_arrow(key)
+        except (OSError, pa.ArrowInvalid):
+            pass
+    frame = build()
+    frame.attrs['dataset_key'] = key
+    if not ARROW_AVAILABLE:
+        return frame
+    _write_arrow(key, frame)
+    return _read_arrow(key)
+
+def evict_idle(max_idle=IDLE_EVICT_SECONDS):
+    """Drop datasets without open handles that have been idle for ``max_idle`` seconds."""
+    cutoff = time.monotonic() - max_idle
+    with _lock:
+        evicted = [k for k, e in _entries.items() if e.refs <= 0 and e.last_used <= cutoff]
+        for key in evicted:
+            del _entries[key]
+    # Out-of-core datasets hold a DuckDB connection; it is reopened on next use
+    for key in evicted:
+        close_lazy(key)
+    _prune_out_of_core()
+
+class DatasetHandle:
+    """
+    A session's reference to a stored dataset. The frame is shared between
+    sessions and must not be modified; call ``release`` when the session stops
+    using it.
+    """
+
+    def __init__(self, entry):
+        self._entry = entry
+        self.key = entry.key
+        self._released = False
+        with _lock:
+            entry.refs += 1
+
+    @property
+    def frame(self):
+        return self._entry.frame
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        with _lock:
+            self._entry.refs -= 1
+            self._entry.last_used = time.monotonic()
+        evict_idle()
+
+def open_file(path, reader=pd.read_csv):
+    """
+    Open an uploaded file through the store.
+
+    The file is hashed first; content seen before (in any session) is served from
+    memory or from its Arrow copy without parsing. Files above the out-of-core
+    threshold are converted to Parquet and only a preview frame is held in memory.
+
+    Args:
+        path (str): Path of the uploaded file
+        reader (callable): Parses the file into a DataFrame
+
+    Returns:
+        DatasetHandle: A handle to the stored dataset
+    """
+    evict_idle()
+    key = content_key(path)
+    if use_out_of_core(path):
+        return DatasetHandle(_load(key, lambda: _out_of_core_preview(key, path)))
+    return DatasetHandle(_load(key, lambda: prepare_frame(reader(path))))
+
+def _out_of_core_preview(key, path):
+    """Preview frame standing in for a dataset queried out of core (see ``lazy_dataset``)."""
+    frame = open_lazy(key, path).preview()
+    frame.attrs['out_of_core'] = True
+    return frame
+
+def register_dataset(df, fingerprint=None):
+    """
+    Register an in-memory dataset and return its reference.
+
+    Frames loaded through the store already carry their content key.
+
+    Args:
+        df (pandas.DataFrame): The dataset
+        fingerprint (str): Precomputed ``dataset_fingerprint(df)``, if available
+
+    Returns:
+        str: The dataset reference
+    """
+    key = df.attrs.get('dataset_key')
+    if key is not None and key in _entries:
+        return key
+    key = fingerprint or dataset_fingerprint(df)
+    _load(key, lambda: df.copy())
+    return key
+
+def _unknown(ref):
+    raise KeyError(f"Unknown dataset: {ref}")
+
+def get_dataset(ref):
+    """
+    Look up a dataset by reference or bundled name.
+
+    Anything but a bundled name or a hex digest is rejected before it reaches
+    the store, so a reference can never name a path outside it.
+
+    Raises:
+        KeyError: If the reference is unknown or malformed
+    """
+    if isinstance(ref, str) and ref in BUNDLED_DATASETS:
+        path = BUNDLED_DATASETS[ref]
+        if ref not in _bundled_keys:
+            _bundled_keys[ref] = content_key(path)
+        return _load(_bundled_keys[ref], lambda: prepare_frame(pd.read_csv(path))).frame
+    if not is_dataset_key(ref):
+        _unknown(ref)
+    return _load(ref, lambda: _unknown(ref)).frame
+
+def shared_artefact(df, name, compute):
+    """
+    Return ``compute(df)``, computed once per stored dataset and shared across sessions.
+
+    Frames that are not the stored frame itself (e.g. column subsets, which
+    inherit its attrs) are computed directly without caching. When several
+    server processes run, artefacts are also shared between them.
+    """
+    key = df.attrs.get('dataset_key')
+    with _lock:
+        entry = _entries.get(key)
+    if entry is None or entry.frame is not df:
+        return compute(df)
+    with entry.lock:
+        hit = name in entry.derived
+        record_cache("dataset_artefacts", hit)
+        if not hit:
+            store = shared_cache()
+            value = store.get("dataset_artefacts", (key, name), _MISSING) if store is not None else _MISSING
+            if value is _MISSING:
+                value = compute(df)
+                if store is not None:
+                    store.set("dataset_artefacts", (key, name), value)
+            entry.derived[name] = value
+        return entry.derived[name]
+
+def _store_gauge():
+    with _lock:
+        entries = list(_entries.values())
+    return {
+        (('state', 'in_memory'),): sum(1 for e in entries if e.frame is not None),
+        (('state', 'held'),): sum(1 for e in entries if e.refs > 0),
+        (('state', 'handles'),): sum(max(e.refs, 0) for e in entries),
+    }
+
+register_gauge_callback('forecast_datasets', "Datasets in the shared store", _store_gauge)
@@ -0,0 +1,154 @@
+"""
+Ensemble forecasting for the AI Forecasting Application.
+Fits the member models concurrently on the shared worker pool and combines
+them with non-negative weights learned from holdout errors.
+"""
+import numpy as np
+import pandas as pd
+from scipy.optimize import nnls
+from statsmodels.tsa.arima.model import ARIMA
+from server_scripts.helpers.functions import lstm_forecast, automl_forecast, arfima_forecast
+from server_scripts.workers import get_executor
+from server_scripts.global_helpers import compute_metrics
+
+ENSEMBLE_MEMBERS = {
+    "arima": "ARIMA",
+    "prophet": "Prophet",
+    "lstm": "LSTM",
+    "automl": "AutoML",
+    "arfima": "ARFIMA",
+}
+DEFAULT_MEMBERS = ["arima", "prophet", "arfima"]
+# Member forecasts are produced up to this horizon so horizon changes only slice them
+ENSEMBLE_MAX_HORIZON = 100
+# Holdout length used to learn the weights (capped at a quarter of the series)
+ENSEMBLE_HOLDOUT = 24
+
+def _arima_member(values, horizon, dates=None, freq=None):
+    return ARIMA(values, order=(1, 1, 1)).fit().forecast(steps=horizon)
+
+def _prophet_member(values, horizon, dates=None, freq=None):
+    from prophet import Prophet
+    if dates is None or not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.date_range('2000-01-01', periods=len(values), freq='D')
+        freq = 'D'
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False,
+                    uncertainty_samples=0)
+    model.fit(pd.DataFrame({'ds': pd.DatetimeIndex(dates)[:len(values)], 'y': values}))
+    future = model.make_future_dataframe(periods=horizon, freq=freq or 'D', include_history=False)
+    return model.predict(future)['yhat'].to_numpy()
+
+def _lstm_member(values, horizon, dates=None, freq=None):
+    return lstm_forecast(values, horizon)
+
+def _automl_member(values, horizon, dates=None, freq=None):
+    return automl_forecast(values, horizon)
+
+def _arfima_member(values, horizon, dates=None, freq=None):
+    return arfima_forecast(values, horizon)
+
+_MEMBER_FUNCTIONS = {
+    "arima": _arima_member,
+    "prophet": _prophet_member,
+    "lstm": _lstm_member,
+    "automl": _automl_member,
+    "arfima": _arfima_member,
+}
+
+def _fit_member(task):
+    """Holdout and full-history forecasts of one member; runs in a worker process."""
+    name, values, holdout, horizon, dates, freq = task
+    fn = _MEMBER_FUNCTIONS[name]
+    try:
+        holdout_forecast = np.asarray(
+            fn(values[:-holdout], holdout, dates=dates, freq=freq), dtype=float)[:holdout]
+        forecast = np.asarray(fn(values, horizon, dates=dates, freq=freq), dtype=float)[:horizon]
+        if holdout_forecast.shape != (holdout,) or forecast.shape != (horizon,):
+            raise ValueError("member returned a forecast of the wrong length")
+        if not (np.all(np.isfinite(holdout_forecast)) and np.all(np.isfinite(forecast))):
+            raise ValueError("member returned non-finite values")
+        return name, holdout_forecast, forecast, None
+    except Exception as e:
+        return name, None, None, str(e)
+
+def combination_weights(member_predictions, actual):
+    """
+    Non-negative weights summing to one that minimise the squared holdout error.
+
+    Solves min ||P w - y|| subject to w >= 0 and sum(w) = 1 in one NNLS call, with
+    the equality enforced by a heavily weighted extra row.
+
+    Args:
+        member_predictions (numpy.ndarray): Holdout forecasts, shape (holdout, n_members)
+        actual (numpy.ndarray): Holdout actuals, shape (holdout,)
+
+    Returns:
+        numpy.ndarray: Weights, shape (n_members,)
+    """
+    n_members = member_predictions.shape[1]
+    scale = np.abs(actual).max() or 1.0
+    P = member_predictions / scale
+    y = actual / scale
+    penalty = 1e3 * max(np.linalg.norm(P), 1.0)
+    A = np.vstack([P, penalty * np.ones((1, n_members))])
+    b = np.concatenate([y, [penalty]])
+    weights, _ = nnls(A, b)
+    total = weights.sum()
+    return weights / total if total > 0 else np.full(n_members, 1.0 / n_members)
+
+def fit_ensemble(values, members=None, horizon=ENSEMBLE_MAX_HORIZON, dates=None, freq=None):
+    """
+    Fit the ensemble members concurrently and learn their combination weights.
+
+    Each member is one task on the shared process pool (holdout fit then full
+    fit), so the wall time is close to that of the slowest member. Members that
+    fail are dropped and reported in ``errors``.
+
+    Args:
+        values (array): Time series values
+        members (list): Keys of ENSEMBLE_MEMBERS; defaults to DEFAULT_MEMBERS
+        horizon (int): Forecast horizon produced for every member
+        dates (array): Timestamps of ``values`` (needed by Prophet)
+        freq (str): Frequency of ``dates``
+
+    Returns:
+        dict: member names, weights, member forecasts (n_members x horizon), combined
+              forecast, holdout actuals and member holdout forecasts, and member errors
+    """
+    values = np.asarray(values, dtype=float)
+    members = list(members or DEFAULT_MEMBERS)
+    holdout = max(1, min(ENSEMBLE_HOLDOUT, len(values) // 4))
+    if dates is not None:
+        dates = pd.DatetimeIndex(dates) if pd.api.types.is_datetime64_any_dtype(dates) else None
+    tasks = [(name, values, holdout, horizon, dates, freq) for name in members]
+    results = list(get_executor("process").map(_fit_member, tasks))
+    fitted = [r for r in results if r[3] is None]
+    errors = {r[0]: r[3] for r in results if r[3] is not None}
+    if not fitted:
+        raise RuntimeError(f"All ensemble members failed: {errors}")
+    names = [r[0] for r in fitted]
+    holdout_predictions = np.column_stack([r[1] for r in fitted])
+    forecasts = np.vstack([r[2] for r in fitted])
+    actual = values[-holdout:]
+    weights = combination_weights(holdout_predictions, actual)
+    return {
+        'members': names,
+        'weights': weights,
+        'forecasts': forecasts,
+        'combined': weights @ forecasts,
+        'holdout_actual': actual,
+        'holdout_predictions': holdout_predictions,
+        'holdout_combined': holdout_predictions @ weights,
+        'errors': errors,
+    }
+
+def ensemble_contributions(ensemble, horizon):
+    """Per-member weight, holdout RMSE and weighted contribution over the first ``horizon`` steps."""
+    holdout = compute_metrics(ensemble['holdout_actual'][:, None], ensemble['holdout_predictions'], axis=0)
+    contributions = ensemble['weights'][:, None] * ensemble['forecasts'][:, :horizon]
+    return pd.DataFrame({
+        'Member': [ENSEMBLE_MEMBERS.get(name, name) for name in ensemble['members']],
+        'Weight': ensemble['weights'].round(3),
+        'Holdout RMSE': holdout['RMSE'].round(2),
+        'Mean Contribution': contributions.mean(axis=1).round(2),
+    })
@@ -0,0 +1,228 @@
+"""
+Streaming exports for the AI Forecasting Application.
+Datasets, forecasts (with their intervals) and backtest results are written
+as CSV, Parquet or Arrow IPC streams by generators that encode one chunk of
+rows at a time. Memory stays flat however large the output is, and
+out-of-core datasets stream straight from DuckDB.
+"""
+import io
+import numpy as np
+import pandas as pd
+from server_scripts.out_of_core import lazy_dataset
+from server_scripts.conformal import backtest_origins
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Parquet and Arrow IPC are only offered when pyarrow is installed
+EXPORT_FORMATS = {"csv": "CSV"}
+if ARROW_AVAILABLE:
+    EXPORT_FORMATS.update({"parquet": "Parquet", "arrow": "Arrow IPC stream"})
+EXPORT_EXTENSIONS = {"csv": "csv", "parquet": "parquet", "arrow": "arrows"}
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+# Rows encoded per chunk (and per Parquet row group)
+EXPORT_CHUNK_ROWS = 100_000
+
+# ===== ENCODERS =====
+class _Drain(io.RawIOBase):
+    """Write-only sink whose buffered bytes are handed out and released after every chunk."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def frame_batches(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Arrow record batches of ``chunk_rows`` rows of a frame (at least one, for the schema)."""
+    schema = None
+    for start in range(0, max(len(df), 1), chunk_rows):
+        batch = pa.RecordBatch.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False)
+        schema = batch.schema
+        yield batch
+
+def _csv_chunks(source, chunk_rows):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, max(len(source), 1), chunk_rows):
+            yield source.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode()
+        return
+    header = True
+    for batch in source:
+        frame = batch if isinstance(batch, pd.DataFrame) else batch.to_pandas()
+        yield frame.to_csv(index=False, header=header).encode()
+        header = False
+
+def _arrow_chunks(batches):
+    sink = _Drain()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.take()
+    if writer is not None:
+        writer.close()
+        yield sink.take()
+
+def _parquet_chunks(batches):
+    sink = _Drain()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pq.ParquetWriter(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.take()
+    if writer is not None:
+        writer.close()
+        yield sink.take()
+
+def export_stream(source, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Encode a frame or a stream of record batches chunk by chunk.
+
+    Args:
+        source: pandas.DataFrame, or an iterable of pyarrow.RecordBatch
+            (or of pandas.DataFrame chunks, for CSV)
+        fmt (str): Key of EXPORT_FORMATS
+        chunk_rows (int): Rows per chunk when ``source`` is a frame
+
+    Yields:
+        bytes: Consecutive pieces of the encoded file
+    """
+    if fmt == "csv":
+        yield from _csv_chunks(source, chunk_rows)
+        return
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    batches = frame_batches(source, chunk_rows) if isinstance(source, pd.DataFrame) else source
+    if fmt == "parquet":
+        yield from _parquet_chunks(batches)
+    else:
+        yield from _arrow_chunks(batches)
+
+def export_filename(stem, fmt):
+    return f"{stem}.{EXPORT_EXTENSIONS[fmt]}"
+
+# ===== EXPORTS =====
+def dataset_export(df, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    The whole dataset behind a session frame, as a stream of encoded chunks.
+
+    Out-of-core datasets are read from DuckDB batch by batch (as pandas
+    chunks when pyarrow is missing); their Parquet copy is returned as a file
+    path so it is sent as-is.
+
+    Returns:
+        str or generator: A file path, or a generator of bytes
+    """
+    lazy = lazy_dataset(df)
+    if lazy is None:
+        return export_stream(df, fmt, chunk_rows)
+    if fmt == "parquet":
+        return lazy.path
+    if not ARROW_AVAILABLE:
+        return export_stream(lazy.frame_chunks(chunk_rows), fmt, chunk_rows)
+    return export_stream(lazy.record_batches(chunk_rows), fmt, chunk_rows)
+
+def _band_tail(values, n):
+    if values is None or len(values) < n:
+        return np.full(n, np.nan)
+    return np.asarray(values, dtype=float)[len(values) - n:]
+
+def forecast_frame(result):
+    """Actuals followed by the forecast and its interval bounds, one row per period."""
+    target_var = result['target_var']
+    horizon = len(result['y_forecast'])
+    actual = pd.DataFrame({
+        'time': np.asarray(result['x_actual']),
+        'type': 'actual',
+        target_var: np.asarray(result['y_actual'], dtype=float),
+        'lower': np.nan,
+        'upper': np.nan,
+    })
+    forecast = pd.DataFrame({
+        'time': np.asarray(result['x_forecast']),
+        'type': 'forecast',
+        target_var: np.asarray(result['y_forecast'], dtype=float),
+        # The band may also cover some history rows; its last rows are the forecast's
+        'lower': _band_tail(result['lower'], horizon),
+        'upper': _band_tail(result['upper'], horizon),
+    })
+    frame = pd.concat([actual, forecast], ignore_index=True)
+    frame.attrs['model'] = result['label']
+    return frame
+
+def backtest_frame(fitted, horizon):
+    """
+    Backtest results of a fit, one row per forecast origin and step.
+
+    ARIMA fits are evaluated with the rolling-origin backtest used for their
+    conformal intervals; ensembles report their holdout forecasts per member.
+    Prophet fits have no backtest and give an empty frame.
+
+    Returns:
+        pandas.DataFrame: origin, step, time, actual, forecast and error columns
+                          (plus one column per member for ensembles)
+    """
+    ts_data, time_var, target_var = fitted['ts_data'], fitted['time_var'], fitted['target_var']
+    values = np.asarray(ts_data[target_var].values, dtype=float)
+    times = ts_data[time_var].to_numpy()
+    columns = ['origin', 'step', 'time', 'actual', 'forecast', 'error']
+    if fitted['model_type'] == "ensemble":
+        ensemble = fitted['model']
+        actual = ensemble['holdout_actual']
+        n = len(actual)
+        frame = pd.DataFrame({
+            'origin': times[len(values) - n - 1] if len(values) > n else None,
+            'step': np.arange(1, n + 1),
+            'time': times[len(values) - n:],
+            'actual': actual,
+            'forecast': ensemble['holdout_combined'],
+            'error': actual - ensemble['holdout_combined'],
+        })
+        for i, name in enumerate(ensemble['members']):
+            frame[name] = ensemble['holdout_predictions'][:, i]
+        return frame
+    if fitted['model_type'] == "prophet":
+        return pd.DataFrame(columns=columns)
+    # Imported here: server_forecast imports the conformal helpers this module shares
+    from server_scripts.server_forecast import arima_backtest_forecasts
+    origins = backtest_origins(len(values), horizon)
+    if len(origins) == 0:
+        return pd.DataFrame(columns=columns)
+    errors = values[origins[:, None] + np.arange(horizon)] - arima_backtest_forecasts(fitted['model'], origins, horizon)
+    steps = np.tile(np.arange(1, horizon + 1), len(origins))
+    positions = np.repeat(origins, horizon) + steps - 1
+    actual = values[positions]
+    error = errors.ravel()
+    return pd.DataFrame({
+        'origin': times[np.repeat(origins, horizon) - 1],
+        'step': steps,
+        'time': times[positions],
+        'actual': actual,
+        'forecast': actual - error,
+        'error': error,
+    })
@@ -7,6 +7,11 @@ used across the application components.
 """
 
 # ===== IMPORTS =====
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from server_scripts.instrumentation import record_cache
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -16,31 +21,265 @@ import warnings
 
 # ===== GLOBAL SETTINGS =====
 warnings.filterwarnings('ignore')
+# Column selections share memory with the session's data until written to
+# (always the case from pandas 3)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Local storage for job queues, caches and model files
+CACHE_DIR = os.environ.get("FORECAST_CACHE_DIR", os.path.join(APP_DIR, ".cache"))
 
 # ===== METRICS FUNCTIONS =====
-def calculate_metrics(actual, predicted):
+# Metrics computed by compute_metrics, in display order
+METRIC_NAMES = ('MAPE', 'sMAPE', 'RMSE', 'MAE', 'MASE', 'Bias')
+METRIC_LABELS = {
+    'MAPE': 'MAPE (%)',
+    'sMAPE': 'sMAPE (%)',
+    'RMSE': 'RMSE',
+    'MAE': 'MAE',
+    'MASE': 'MASE',
+    'Bias': 'Bias',
+}
+
+def _masked_mean(values, mask, axis):
+    """
+    Mean of ``values`` where ``mask`` holds, NaN where no element qualifies.
+    ``values`` must already be zero where ``mask`` is False.
+    """
+    count = np.count_nonzero(mask, axis=axis)
+    total = values.sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+def naive_scale(insample, season=1, axis=-1):
+    """
+    Mean absolute error of the seasonal naive forecast on the in-sample data,
+    the denominator of MASE. Missing values are skipped; a series with no
+    usable differences or a zero scale gets NaN.
+    """
+    insample = np.asarray(insample, dtype=float)
+    insample = np.moveaxis(insample, axis, -1)
+    if insample.shape[-1] <= season:
+        return np.full(insample.shape[:-1], np.nan)
+    diffs = np.abs(insample[..., season:] - insample[..., :-season])
+    finite = np.isfinite(diffs)
+    scale = _masked_mean(np.where(finite, diffs, 0.0), finite, axis=-1)
+    return np.where(scale > 0, scale, np.nan)
+
+def compute_metrics(actual, predicted, insample=None, season=1, axis=-1):
+    """
+    Vectorized forecast metrics over one or many series in a single pass.
+
+    Inputs are broadcast against each other and reduced along ``axis``, so a
+    (series x time) or (fold x horizon) array gives one value per row. Pairs
+    where either value is missing are skipped; MAPE skips zero actuals and
+    sMAPE pairs where both values are zero. A metric with no usable pair is NaN.
+
+    Parameters:
+    -----------
+    actual : array-like
+        The actual observed values
+    predicted : array-like
+        The model's predicted values
+    insample : array-like, optional
+        History used to scale MASE (the training data); defaults to ``actual``
+    season : int
+        Lag of the naive forecast that scales MASE
+    axis : int
+        Axis holding time steps
+
+    Returns:
+    --------
+    dict
+        METRIC_NAMES -> numpy arrays with ``axis`` removed (floats for 1-D input).
+        MAPE and sMAPE are percentages; Bias is the mean of predicted - actual.
+    """
+    actual, predicted = np.broadcast_arrays(np.asarray(actual, dtype=float), np.asarray(predicted, dtype=float))
+    actual = np.moveaxis(actual, axis, -1)
+    predicted = np.moveaxis(predicted, axis, -1)
+    valid = np.isfinite(actual) & np.isfinite(predicted)
+    all_valid = valid.all()
+    # Masked-out pairs are zeroed in place so every sum below can skip masking
+    error = predicted - actual
+    abs_actual = np.abs(actual)
+    denominator = np.abs(predicted)
+    if not all_valid:
+        error[~valid] = 0.0
+        abs_actual[~valid] = 0.0
+        denominator[~valid] = 0.0
+    denominator += abs_actual
+    abs_error = np.abs(error)
+    nonzero = abs_actual > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percentage = np.divide(abs_error, abs_actual, out=np.zeros_like(abs_error), where=nonzero)
+        symmetric = np.divide(abs_error, denominator, out=np.zeros_like(abs_error), where=denominator > 0)
+        mae = _masked_mean(abs_error, valid, axis=-1)
+        # ``actual`` already has time last; ``insample`` still has it on ``axis``
+        if insample is None:
+            scale = naive_scale(actual, season=season, axis=-1)
+        else:
+            scale = naive_scale(insample, season=season, axis=axis)
+        results = {
+            'MAPE': 100 * _masked_mean(percentage, valid & nonzero, axis=-1),
+            'sMAPE': 200 * _masked_mean(symmetric, valid & (denominator > 0), axis=-1),
+            'RMSE': np.sqrt(_masked_mean(error ** 2, valid, axis=-1)),
+            'MAE': mae,
+            'MASE': mae / scale,
+            'Bias': _masked_mean(error, valid, axis=-1),
+        }
+    if actual.ndim == 1:
+        return {name: float(value) for name, value in results.items()}
+    return results
+
+def calculate_metrics(actual, predicted, insample=None, season=1):
     """
-    Calculate common forecast evaluation metrics.
-    
+    Calculate common forecast evaluation metrics for display.
+
     Parameters:
     -----------
     actual : array-like
         The actual observed values
     predicted : array-like
         The model's predicted values
-        
+    insample : array-like, optional
+        History used to scale MASE; defaults to ``actual``
+    season : int
+        Lag of the naive forecast that scales MASE
+
     Returns:
     --------
     pandas.DataFrame
-        DataFrame containing MAPE, RMSE, and MAE metrics
-    """
-    mape = np.mean(np.abs((actual - predicted) / actual)) * 100
-    rmse = np.sqrt(np.mean((actual - predicted) ** 2))
-    mae = np.mean(np.abs(actual - predicted))
-    
-    metrics_df = pd.DataFrame({
-        'Metric': ['MAPE (%)', 'RMSE', 'MAE'],
-        'Value': [f"{mape:.2f}%", f"{rmse:.2f}", f"{mae:.2f}"]
+        DataFrame with the formatted METRIC_NAMES metrics (see ``compute_metrics``
+        for the numeric values)
+    """
+    metrics = compute_metrics(actual, predicted, insample=insample, season=season)
+    values = []
+    for name in METRIC_NAMES:
+        value = metrics[name]
+        if np.isnan(value):
+            values.append("n/a")
+        elif name in ('MAPE', 'sMAPE'):
+            values.append(f"{value:.2f}%")
+        else:
+            values.append(f"{value:.2f}")
+    return pd.DataFrame({
+        'Metric': [METRIC_LABELS[name] for name in METRIC_NAMES],
+        'Value': values
     })
-    
-    return metrics_df
+
+# ===== COLUMN DETECTION =====
+def guess_time_target(df):
+    """
+    Pick the time and target columns of an uploaded dataset.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The uploaded data
+
+    Returns:
+    --------
+    tuple
+        (time column, target column): the first column whose name mentions
+        'date' or 'time' (else the first column) and the first other numeric column
+    """
+    date_cols = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
+    time_var = date_cols[0] if date_cols else df.columns[0]
+    numeric_cols = [col for col in df.select_dtypes(include=['number']).columns if col != time_var]
+    other_cols = [col for col in df.columns if col != time_var]
+    target_var = numeric_cols[0] if numeric_cols else other_cols[0]
+    return time_var, target_var
+
+# ===== CACHING HELPERS =====
+def dataset_fingerprint(df):
+    """
+    Compute a content hash of a DataFrame.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The data to fingerprint
+
+    Returns:
+    --------
+    str
+        Hex digest that changes whenever the values, index or column names change
+    """
+    digest = hashlib.sha1()
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+class LRUCache:
+    """
+    Small bounded mapping that evicts the least recently used entry.
+    Named caches report their hit rate through the instrumentation layer.
+    Named caches created with ``shared=True`` also read and write the
+    cross-process cache (see shared_cache.py) when several server processes run.
+    """
+
+    def __init__(self, maxsize=32, name=None, shared=False):
+        self.maxsize = maxsize
+        self.name = name
+        self.shared = shared and name is not None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared_store(self):
+        if not self.shared:
+            return None
+        from server_scripts.shared_cache import shared_cache
+        return shared_cache()
+
+    def get(self, key, default=None):
+        with self._lock:
+            hit = key in self._data
+            if hit:
+                self._data.move_to_end(key)
+                value = self._data[key]
+        if self.name is not None:
+            record_cache(self.name, hit)
+        if hit:
+            return value
+        store = self._shared_store()
+        if store is not None:
+            missing = object()
+            value = store.get(self.name, key, missing)
+            if value is not missing:
+                self._set_local(key, value)
+                return value
+        return default
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set(self, key, value):
+        self._set_local(key, value)
+        store = self._shared_store()
+        if store is not None:
+            store.set(self.name, key, value)
+
+    def pop(self, key, default=None):
+        store = self._shared_store()
+        if store is not None:
+            store.pop(self.name, key)
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        store = self._shared_store()
+        if store is not None:
+            store.clear(self.name)
+        with self._lock:
+            self._data.clear()
@@ -6,6 +6,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import requests
 import json
 import time
+from server_scripts.instrumentation import timed, inc
+
+def _post(service, url, **kwargs):
+    """``requests.post`` with latency and status-code instrumentation."""
+    with timed("external_call", service=service):
+        response = requests.post(url, **kwargs)
+    inc('forecast_external_responses_total', service=service, code=response.status_code)
+    return response
 
 def chat(user_message, history=None, system_prompt="general", api_key=None, temp=0.7):
     """
@@ -45,7 +53,8 @@ def chat(user_message, history=None, system_prompt="general", api_key=None, temp
     # Make request with retry logic
     for attempt in range(4):
         try:
-            response = requests.post(
+            response = _post(
+                "openai",
                 "https://api.openai.com/v1/chat/completions",
                 headers=headers,
                 json=data
@@ -108,7 +117,8 @@ def chat_nvidia(user_message, history=None, api_key=None, model_llm="llama3-70b-
     # Make request with retry logic
     for attempt in range(4):
         try:
-            response = requests.post(
+            response = _post(
+                "nvidia",
                 "https://integrate.api.nvidia.com/v1/chat/completions",
                 headers=headers,
                 json=data
@@ -159,7 +169,8 @@ def gemini(prompt, temperature=0.7, api_key=None, model="gemini-pro", max_retrie
     # Make request with retry logic
     for attempt in range(max_retries):
         try:
-            response = requests.post(
+            response = _post(
+                "gemini",
                 f"https://generativelanguage.googleapis.com/v1beta/models/{model_query}",
                 params={"key": api_key},
                 headers={"Content-Type": "application/json"},
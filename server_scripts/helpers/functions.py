@@ -7,7 +7,7 @@ import numpy as np
 import pandas as pd
 from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.statespace.sarimax import SARIMAX
-from scipy import stats
+from server_scripts.model_store import lstm_weights_path, prune_store, touch_lstm_weights
 
 # Optional imports
 try:
@@ -40,15 +40,13 @@ def getmode(v, na=True):
         na (bool): Whether to remove NA values
         
     Returns:
-        The mode of the vector
+        The mode of the vector (the smallest one when tied)
     """
-    if na:
-        v = [x for x in v if not pd.isna(x)]
-    
-    if not v:  # If the list is empty after removing NAs
+    modes = pd.Series(v).mode(dropna=na)
+    if modes.empty:  # If the vector is empty after removing NAs
         return None
-        
-    return stats.mode(v, keepdims=False)[0]
+    
+    return modes.iloc[0]
 
 if TENSORFLOW_AVAILABLE:
     def lstm_forecast(ts_data, horizon):
@@ -89,8 +87,16 @@ if TENSORFLOW_AVAILABLE:
         # Compile the model
         model.compile(loss='mean_squared_error', optimizer='adam')
         
-        # Train the model
-        model.fit(X_train, y_train, epochs=100, batch_size=32, verbose=0)
+        # Train the model, or reuse the weights stored for this series and horizon
+        weights_path = lstm_weights_path(ts_data, horizon, tf.keras.__version__)
+        try:
+            model.load_weights(weights_path)
+            touch_lstm_weights(weights_path)
+        except (OSError, ValueError):
+            model.fit(X_train, y_train, epochs=100, batch_size=32, verbose=0)
+            os.makedirs(os.path.dirname(weights_path), exist_ok=True)
+            model.save_weights(weights_path)
+            prune_store()
         
         # Make predictions
         last_sequence = normalized_data[-horizon:].reshape(1, horizon, 1)
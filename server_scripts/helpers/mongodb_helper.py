@@ -5,7 +5,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from pymongo import MongoClient
 import pandas as pd
+from server_scripts.instrumentation import instrumented
 
+@instrumented("external_call", service="mongodb", call="read")
 def mongo_read(table, db, url):
     """
     Read data from MongoDB
@@ -34,6 +36,7 @@ def mongo_read(table, db, url):
     
     return df
 
+@instrumented("external_call", service="mongodb", call="append")
 def mongo_append(df, table, db, url):
     """
     Append data to MongoDB collection
@@ -67,6 +70,7 @@ def mongo_append(df, table, db, url):
     # Close connection
     client.close()
 
+@instrumented("external_call", service="mongodb", call="create")
 def mongo_create(df, table, db, url):
     """
     Create a new MongoDB collection with data
@@ -106,6 +110,7 @@ def mongo_create(df, table, db, url):
     # Close connection
     client.close()
 
+@instrumented("external_call", service="mongodb", call="list")
 def mongo_list(db, url):
     """
     List all collections in a MongoDB database
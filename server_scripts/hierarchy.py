@@ -0,0 +1,213 @@
+"""
+Hierarchical forecasting for grouped data (e.g. region -> store -> SKU).
+Builds the sparse summing matrix, fits base forecasts for every node in
+parallel and reconciles them so that every level adds up.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from statsmodels.tsa.arima.model import ARIMA
+from server_scripts.workers import default_workers, map_chunks
+from server_scripts.preprocessing import infer_frequency
+
+RECONCILIATION_CHOICES = {
+    "mint": "MinT (diagonal)",
+    "ols": "OLS",
+    "bottom_up": "Bottom-up",
+}
+BASE_MODEL_CHOICES = {
+    "arima": "ARIMA(1,1,1)",
+    "drift": "Drift",
+    "naive": "Naive",
+}
+# Nodes per worker task when fitting ARIMA base forecasts
+ARIMA_CHUNK_SIZE = 64
+
+def build_summing_matrix(bottom, levels):
+    """
+    Build the summing matrix S of a hierarchy.
+
+    Args:
+        bottom (pandas.DataFrame): One row per bottom-level node, with the ``levels`` columns
+        levels (list): Level columns from the top of the hierarchy to the bottom
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix S of shape (n_nodes, n_bottom), list of node labels,
+                numpy array of node depths where 0 is the grand total)
+    """
+    n_bottom = len(bottom)
+    columns = np.arange(n_bottom)
+    rows = [np.zeros(n_bottom, dtype=np.int64)]
+    labels = ["Total"]
+    depths = [0]
+    keys = None
+    for depth, level in enumerate(levels, start=1):
+        part = bottom[level].astype(str)
+        keys = part if keys is None else keys + " / " + part
+        codes, uniques = pd.factorize(keys)
+        rows.append(codes + len(labels))
+        labels.extend(uniques.tolist())
+        depths.extend([depth] * len(uniques))
+    row_index = np.concatenate(rows)
+    col_index = np.tile(columns, len(rows))
+    S = sparse.csr_matrix(
+        (np.ones(len(row_index)), (row_index, col_index)),
+        shape=(len(labels), n_bottom)
+    )
+    return S, labels, np.asarray(depths)
+
+def _arima_chunk(chunk):
+    """Fit ARIMA(1,1,1) to each column of a (time x nodes) block; runs in a worker process."""
+    values, horizon = chunk
+    forecasts = np.empty((values.shape[1], horizon))
+    residuals = np.empty_like(values.T)
+    for j in range(values.shape[1]):
+        try:
+            fit = ARIMA(values[:, j], order=(1, 1, 1)).fit()
+            forecasts[j] = fit.forecast(steps=horizon)
+            residuals[j] = fit.resid
+        except Exception:
+            forecasts[j] = values[-1, j]
+            residuals[j] = np.concatenate([[0.0], np.diff(values[:, j])])
+    return forecasts, residuals
+
+def base_forecasts(Y, horizon, base_model="arima"):
+    """
+    Forecast every node independently.
+
+    Args:
+        Y (numpy.ndarray): Node series, shape (time, n_nodes)
+        horizon (int): Forecast horizon
+        base_model (str): Key of BASE_MODEL_CHOICES
+
+    Returns:
+        tuple: (forecasts of shape (n_nodes, horizon), in-sample residuals of shape (n_nodes, time))
+    """
+    steps = np.arange(1, horizon + 1)
+    diffs = np.diff(Y, axis=0)
+    if base_model == "naive":
+        forecasts = np.repeat(Y[-1][:, None], horizon, axis=1)
+        residuals = np.vstack([np.zeros((1, Y.shape[1])), diffs]).T
+    elif base_model == "drift":
+        slope = diffs.mean(axis=0) if len(diffs) else np.zeros(Y.shape[1])
+        forecasts = Y[-1][:, None] + slope[:, None] * steps[None, :]
+        residuals = np.vstack([np.zeros((1, Y.shape[1])), diffs - slope]).T
+    else:
+        n_chunks = max(1, min(default_workers(), int(np.ceil(Y.shape[1] / ARIMA_CHUNK_SIZE))))
+        blocks = np.array_split(Y, n_chunks, axis=1)
+        results = map_chunks(_arima_chunk, [(block, horizon) for block in blocks])
+        forecasts = np.vstack([r[0] for r in results])
+        residuals = np.vstack([r[1] for r in results])
+    return forecasts, residuals
+
+def _solve_normal_equations(S, weights, rhs, x0, tol=1e-10, max_iter=1000):
+    """
+    Solve (S' W S) X = rhs for all horizon columns at once.
+
+    Uses Jacobi-preconditioned conjugate gradients with sparse mat-vecs, so the
+    cost per iteration is O(nnz(S) * horizon) and S' W S is never formed.
+    """
+    St = S.T.tocsr()
+
+    def matvec(x):
+        return St @ (weights[:, None] * (S @ x))
+
+    precond = 1.0 / (St.multiply(St) @ weights)
+    x = x0.copy()
+    r = rhs - matvec(x)
+    z = precond[:, None] * r
+    p = z.copy()
+    rz = np.sum(r * z, axis=0)
+    threshold = tol * (np.linalg.norm(rhs, axis=0) + 1e-300)
+    for _ in range(max_iter):
+        if np.all(np.linalg.norm(r, axis=0) <= threshold):
+            break
+        Ap = matvec(p)
+        pAp = np.sum(p * Ap, axis=0)
+        alpha = np.divide(rz, pAp, out=np.zeros_like(rz), where=pAp != 0)
+        x += alpha * p
+        r -= alpha * Ap
+        z = precond[:, None] * r
+        rz_new = np.sum(r * z, axis=0)
+        beta = np.divide(rz_new, rz, out=np.zeros_like(rz), where=rz != 0)
+        p = z + beta * p
+        rz = rz_new
+    return x
+
+def reconcile(base, S, method="mint", residuals=None):
+    """
+    Reconcile base forecasts so that every aggregate equals the sum of its children.
+
+    Args:
+        base (numpy.ndarray): Base forecasts, shape (n_nodes, horizon)
+        S (scipy.sparse.csr_matrix): Summing matrix, bottom level in the last rows
+        method (str): "bottom_up", "ols" or "mint" (MinT with a diagonal covariance
+            estimated from in-sample residual variances)
+        residuals (numpy.ndarray): In-sample residuals, shape (n_nodes, time); required for "mint"
+
+    Returns:
+        numpy.ndarray: Reconciled forecasts, shape (n_nodes, horizon)
+    """
+    n_nodes, n_bottom = S.shape
+    bottom_up = base[n_nodes - n_bottom:]
+    if method == "bottom_up":
+        return S @ bottom_up
+    if method == "mint":
+        variances = np.nanvar(residuals, axis=1)
+        floor = np.nanmax(variances) * 1e-8 if np.any(variances > 0) else 1.0
+        weights = 1.0 / np.maximum(variances, floor)
+    else:
+        weights = np.ones(n_nodes)
+    rhs = S.T @ (weights[:, None] * base)
+    bottom = _solve_normal_equations(S, weights, rhs, bottom_up.astype(float))
+    return S @ bottom
+
+def forecast_hierarchy(df, time_var, target_var, levels, horizon, method="mint", base_model="arima"):
+    """
+    Produce coherent forecasts for every node of a grouped dataset.
+
+    Args:
+        df (pandas.DataFrame): Long-format data with the time, target and level columns
+        time_var (str): Time column name
+        target_var (str): Target column name
+        levels (list): Level columns from top to bottom
+        horizon (int): Forecast horizon
+        method (str): Key of RECONCILIATION_CHOICES
+        base_model (str): Key of BASE_MODEL_CHOICES
+
+    Returns:
+        dict: Node labels and depths, the history index and node series, the future
+              index, and the base and reconciled forecasts (n_nodes x horizon)
+    """
+    pivot = df.pivot_table(index=time_var, columns=levels, values=target_var, aggfunc='sum', observed=True).sort_index()
+    pivot = pivot.fillna(0.0)
+    bottom = pivot.columns.to_frame(index=False)
+    S, labels, depths = build_summing_matrix(bottom, levels)
+    Y_bottom = pivot.to_numpy(dtype=float)
+    Y = (S @ Y_bottom.T).T
+    base, residuals = base_forecasts(Y, horizon, base_model)
+    reconciled = reconcile(base, S, method, residuals)
+    history_index = pivot.index
+    if pd.api.types.is_datetime64_any_dtype(history_index):
+        freq = infer_frequency(history_index) or 'D'
+        future_index = pd.date_range(history_index[-1], periods=horizon + 1, freq=freq)[1:]
+    else:
+        future_index = np.arange(len(history_index), len(history_index) + horizon)
+    return {
+        'labels': labels,
+        'depths': depths,
+        'history_index': history_index,
+        'history': Y,
+        'future_index': future_index,
+        'base': base,
+        'reconciled': reconciled,
+    }
+
+def hierarchy_table(result, max_depth=1):
+    """Tabulate reconciled forecasts for nodes down to ``max_depth``."""
+    keep = result['depths'] <= max_depth
+    steps = [f"h{i}" for i in range(1, result['reconciled'].shape[1] + 1)]
+    table = pd.DataFrame(result['reconciled'][keep].round(2), columns=steps)
+    table.insert(0, 'Level', result['depths'][keep])
+    table.insert(0, 'Node', np.asarray(result['labels'], dtype=object)[keep])
+    return table
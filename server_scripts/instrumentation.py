@@ -0,0 +1,190 @@
+"""
+Hot-path instrumentation for the AI Forecasting Application.
+Latency histograms, counters and in-flight gauges are kept in process memory,
+exposed in the Prometheus text format and logged as structured JSON lines.
+"""
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger("forecasting.metrics")
+
+_lock = threading.Lock()
+# Metric samples keyed by (metric name, sorted label items)
+_counters = {}
+_gauges = {}
+_histograms = {}
+# Gauges computed at scrape time: name -> (help text, fn() -> {labels dict as tuple: value})
+_gauge_callbacks = {}
+
+_HELP = {
+    'forecast_operation_duration_seconds': ('histogram', "Latency of instrumented operations"),
+    'forecast_operations_total': ('counter', "Completed instrumented operations"),
+    'forecast_operations_in_flight': ('gauge', "Instrumented operations currently running"),
+    'forecast_cache_requests_total': ('counter', "Cache lookups by cache and result"),
+}
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+# ===== RECORDING =====
+def inc(name, amount=1, **labels):
+    """Increase a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def add_gauge(name, delta, **labels):
+    """Move a gauge up or down by ``delta``."""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + delta
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                hist['buckets'][i] += 1
+        hist['sum'] += value
+        hist['count'] += 1
+
+def record_cache(cache, hit):
+    """Count one lookup of the named cache as a hit or a miss."""
+    inc('forecast_cache_requests_total', cache=cache, result="hit" if hit else "miss")
+
+def register_gauge_callback(name, help_text, fn):
+    """
+    Register a gauge whose samples are computed when the metrics are scraped.
+
+    Args:
+        name (str): Metric name
+        help_text (str): Description shown in the exposition
+        fn (callable): Returns a dict mapping label dicts (as tuples of items) to values
+    """
+    _gauge_callbacks[name] = (help_text, fn)
+
+@contextmanager
+def timed(operation, **labels):
+    """
+    Time a block as ``operation``: latency histogram, completion counter, in-flight
+    gauge and one structured log line. Exceptions are recorded with status "error"
+    and re-raised.
+    """
+    add_gauge('forecast_operations_in_flight', 1, operation=operation)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        add_gauge('forecast_operations_in_flight', -1, operation=operation)
+        observe('forecast_operation_duration_seconds', elapsed, operation=operation, **labels)
+        inc('forecast_operations_total', operation=operation, status=status, **labels)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'event': 'operation', 'operation': operation, 'status': status,
+                'duration_ms': round(elapsed * 1000, 3), **{k: str(v) for k, v in labels.items()},
+            }))
+
+def instrumented(operation, **labels):
+    """Decorator form of ``timed``."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(operation, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrumented_renderer(operation, **labels):
+    """
+    Decorator form of ``timed`` for Shiny renderers, applied above ``@render.*``.
+
+    Times the renderer's whole ``render()`` (the user function plus drawing and
+    encoding the output, e.g. the PNG of a plot), not just the function it wraps.
+    """
+    def decorator(renderer):
+        render = renderer.render
+
+        async def timed_render():
+            with timed(operation, **labels):
+                return await render()
+        renderer.render = timed_render
+        return renderer
+    return decorator
+
+# ===== EXPOSITION =====
+def _escape_label_value(value):
+    """Escape a label value as the exposition format requires: backslash, double quote and newline."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(items):
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in items) + "}"
+
+def _header(lines, name, kind, help_text):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: {'buckets': list(v['buckets']), 'sum': v['sum'], 'count': v['count']}
+                      for k, v in _histograms.items()}
+    lines = []
+    seen = set()
+
+    def header(name, default_kind):
+        if name not in seen:
+            seen.add(name)
+            kind, help_text = _HELP.get(name, (default_kind, name))
+            _header(lines, name, kind, help_text)
+
+    for (name, items), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f"{name}{_format_labels(items)} {value}")
+    for (name, items), value in sorted(gauges.items()):
+        header(name, 'gauge')
+        lines.append(f"{name}{_format_labels(items)} {value}")
+    for (name, items), hist in sorted(histograms.items()):
+        header(name, 'histogram')
+        for bound, count in zip(LATENCY_BUCKETS, hist['buckets']):
+            lines.append(f"{name}_bucket{_format_labels(items + (('le', repr(bound)),))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(items + (('le', '+Inf'),))} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(items)} {hist['sum']}")
+        lines.append(f"{name}_count{_format_labels(items)} {hist['count']}")
+    for name, (help_text, fn) in sorted(_gauge_callbacks.items()):
+        try:
+            samples = fn()
+        except Exception:
+            logger.exception("Gauge callback %s failed", name)
+            continue
+        _header(lines, name, 'gauge', help_text)
+        for items, value in sorted(samples.items()):
+            lines.append(f"{name}{_format_labels(items)} {value}")
+    return "\n".join(lines) + "\n"
+
+def reset_metrics():
+    """Forget all recorded samples (callbacks stay registered)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
@@ -0,0 +1,307 @@
+"""
+Durable local job queue for long-running forecasts.
+Jobs are stored in SQLite so they survive dropped connections and worker
+restarts; a pool of local worker threads executes them with retries,
+deduplication of identical submissions and fair scheduling across owners.
+"""
+import os
+import json
+import time
+import uuid
+import pickle
+import hashlib
+import sqlite3
+import threading
+import traceback
+import pandas as pd
+from server_scripts.global_helpers import CACHE_DIR, dataset_fingerprint
+from server_scripts.instrumentation import register_gauge_callback
+
+JOB_DB_PATH = os.environ.get("FORECAST_JOB_DB", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("FORECAST_JOB_WORKERS", "2"))
+DEFAULT_MAX_ATTEMPTS = 3
+# A running job whose lease expires (worker died) is picked up again
+LEASE_SECONDS = 120
+RETRY_BACKOFF_SECONDS = 5
+POLL_SECONDS = 1.0
+# Finished and failed jobs (with their stored results) are deleted after this long
+JOB_RETENTION_SECONDS = int(os.environ.get("FORECAST_JOB_RETENTION_HOURS", "24")) * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    result BLOB,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, not_before, created_at);
+CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, status);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key) WHERE status != 'failed';
+"""
+
+_handlers = {}
+
+def register_handler(kind, fn):
+    """Register ``fn(payload) -> result`` as the handler for jobs of ``kind``."""
+    _handlers[kind] = fn
+
+def _digest_parts(obj):
+    """Canonical, JSON-serialisable form of a payload for deduplication."""
+    if isinstance(obj, pd.DataFrame):
+        return {'__frame__': dataset_fingerprint(obj)}
+    if isinstance(obj, dict):
+        return {str(k): _digest_parts(v) for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(obj, (list, tuple)):
+        return [_digest_parts(v) for v in obj]
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    return repr(obj)
+
+def dedup_key(kind, payload, owner="anonymous"):
+    """Hash identifying identical submissions of the same job kind by the same owner."""
+    canonical = json.dumps([kind, owner, _digest_parts(payload)], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class JobQueue:
+    """SQLite-backed job queue with a local pool of worker threads."""
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ----- Submission and status -----
+    def submit(self, kind, payload, owner="anonymous", max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Queue a job, or return the existing job if the owner already submitted an
+        identical one that is queued, running or done.
+
+        Returns:
+            str: The job id
+        """
+        key = dedup_key(kind, payload, owner)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status != 'failed'", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                return row['id']
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, owner, dedup_key, payload, status, max_attempts, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, owner, key, pickle.dumps(payload), max_attempts, time.time())
+            )
+            conn.execute("COMMIT")
+            return job_id
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def status(self, job_id):
+        """Return the job's metadata (without payload or result), or None if unknown."""
+        row = self._connect().execute(
+            "SELECT id, kind, owner, status, attempts, max_attempts, error, created_at, started_at, finished_at "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def result(self, job_id):
+        """Return the stored result of a finished job, or None."""
+        row = self._connect().execute(
+            "SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)
+        ).fetchone()
+        return pickle.loads(row['result']) if row is not None and row['result'] is not None else None
+
+    def list_jobs(self, owner=None, limit=20):
+        """Most recent jobs, optionally for one owner, as a DataFrame."""
+        query = ("SELECT id, kind, owner, status, attempts, error, created_at, finished_at FROM jobs"
+                 + (" WHERE owner = ?" if owner is not None else "")
+                 + " ORDER BY created_at DESC LIMIT ?")
+        params = (owner, limit) if owner is not None else (limit,)
+        rows = self._connect().execute(query, params).fetchall()
+        return pd.DataFrame([dict(r) for r in rows],
+                            columns=['id', 'kind', 'owner', 'status', 'attempts', 'error', 'created_at', 'finished_at'])
+
+    def prune(self, max_age=JOB_RETENTION_SECONDS):
+        """Delete finished and failed jobs older than ``max_age`` seconds; return how many were deleted."""
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (time.time() - max_age,)
+        )
+        return cursor.rowcount
+
+    def counts(self):
+        """Number of jobs per status."""
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    # ----- Execution -----
+    def claim(self):
+        """
+        Atomically claim the next runnable job.
+
+        Owners with the fewest running jobs go first, then the owner served least
+        recently, then the oldest job, so one user's batch cannot starve the others.
+        Running jobs with an expired lease (their worker died) are claimable again.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT j.id FROM jobs j
+                WHERE (j.status = 'queued' AND j.not_before <= :now)
+                   OR (j.status = 'running' AND j.lease_until < :now)
+                ORDER BY
+                    (SELECT COUNT(*) FROM jobs r
+                     WHERE r.owner = j.owner AND r.status = 'running' AND r.lease_until >= :now),
+                    (SELECT MAX(s.started_at) FROM jobs s WHERE s.owner = j.owner),
+                    j.created_at
+                LIMIT 1
+                """, {'now': now}
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, "
+                "lease_until = ? WHERE id = ?",
+                (now, now + LEASE_SECONDS, row['id'])
+            )
+            job = conn.execute("SELECT id, kind, payload, attempts, max_attempts FROM jobs WHERE id = ?",
+                               (row['id'],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return dict(job)
+
+    def _finish(self, job_id, result):
+        self._connect().execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ?, lease_until = NULL "
+            "WHERE id = ?", (pickle.dumps(result), time.time(), job_id)
+        )
+
+    def _fail(self, job, error):
+        now = time.time()
+        if job['attempts'] < job['max_attempts']:
+            self._connect().execute(
+                "UPDATE jobs SET status = 'queued', error = ?, not_before = ?, lease_until = NULL WHERE id = ?",
+                (error, now + RETRY_BACKOFF_SECONDS * 2 ** (job['attempts'] - 1), job['id'])
+            )
+        else:
+            self._connect().execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                (error, now, job['id'])
+            )
+
+    def run_one(self):
+        """Claim and execute one job; returns False if nothing was runnable."""
+        job = self.claim()
+        if job is None:
+            return False
+        with self._held_lock:
+            self._held.add(job['id'])
+        try:
+            handler = _handlers.get(job['kind'])
+            if handler is None:
+                raise KeyError(f"No handler registered for job kind '{job['kind']}'")
+            self._finish(job['id'], handler(pickle.loads(job['payload'])))
+        except Exception as e:
+            self._fail(job, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=3)}")
+        finally:
+            with self._held_lock:
+                self._held.discard(job['id'])
+        return True
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                if not self.run_one():
+                    self._stop.wait(POLL_SECONDS)
+            except sqlite3.Error:
+                self._stop.wait(POLL_SECONDS)
+
+    def _heartbeat(self):
+        """Extend the leases of the jobs held by this process and prune expired jobs."""
+        while not self._stop.wait(LEASE_SECONDS / 3):
+            with self._held_lock:
+                held = list(self._held)
+            try:
+                for job_id in held:
+                    self._connect().execute(
+                        "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                        (time.time() + LEASE_SECONDS, job_id)
+                    )
+                self.prune()
+            except sqlite3.Error:
+                pass
+
+    def start(self, n_workers=JOB_WORKERS):
+        """Start the worker and heartbeat threads (idempotent)."""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(n_workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    def stop(self):
+        """Signal the worker threads to stop after their current job."""
+        self._stop.set()
+        self._threads = []
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def _job_gauge():
+    # Only report once the queue is in use; scraping must not start the workers
+    if _queue is None:
+        return {}
+    return {(('status', status),): n for status, n in _queue.counts().items()}
+
+register_gauge_callback('forecast_jobs', "Jobs in the durable queue by status", _job_gauge)
+
+def get_job_queue():
+    """Return the process-wide job queue, starting its workers on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+            _queue.start()
+        return _queue
@@ -0,0 +1,266 @@
+"""
+On-disk store of fitted models for the AI Forecasting Application.
+Fits survive restarts and redeploys: Prophet models are kept as Prophet JSON,
+ARIMA results with statsmodels' own save format and the rest of a fit (history,
+metrics, ensemble member forecasts) as a pickle. Every entry records the store
+format version, the library versions and the fingerprint of the data it was
+fitted on; entries that no longer match are discarded when read.
+"""
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import statsmodels
+from server_scripts.global_helpers import CACHE_DIR
+from server_scripts.instrumentation import record_cache
+
+logger = logging.getLogger("forecasting.models")
+
+MODEL_STORE_DIR = os.environ.get("FORECAST_MODEL_STORE", os.path.join(CACHE_DIR, "models"))
+# Bump when the layout of stored entries changes (2: ARIMA half-widths computed at fit time)
+MODEL_STORE_VERSION = 2
+MODEL_STORE_MAX_ENTRIES = int(os.environ.get("FORECAST_MODEL_STORE_ENTRIES", "200"))
+# Most used entries loaded into memory after startup
+PRELOAD_ENTRIES = int(os.environ.get("FORECAST_MODEL_PRELOAD", "8"))
+
+_META = "meta.json"
+_FITTED = "fitted.pkl"
+_PROPHET = "model.json"
+_STATSMODELS = "model.pkl"
+_LSTM_DIR = "lstm"
+
+def _library_versions():
+    versions = {'numpy': np.__version__, 'pandas': pd.__version__, 'statsmodels': statsmodels.__version__}
+    try:
+        import prophet
+        versions['prophet'] = prophet.__version__
+    except ImportError:
+        pass
+    return versions
+
+LIBRARY_VERSIONS = _library_versions()
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:20]
+
+def _series_dir(series):
+    return os.path.join(MODEL_STORE_DIR, _digest(series))
+
+def _entry_dir(series, options):
+    return os.path.join(_series_dir(series), _digest(options))
+
+def _options_from_json(options):
+    """Options as stored in JSON (tuples become lists) back to the tuple used as cache key."""
+    return tuple(tuple(value) if isinstance(value, list) else value for value in options)
+
+# ===== SAVE / LOAD =====
+def save_model(series, options, fitted):
+    """
+    Persist the result of ``fit_forecast_model``.
+
+    Args:
+        series (tuple): (time_var, target_var, data fingerprint)
+        options (tuple): Fit options the result was produced with
+        fitted (dict): The fit
+
+    Returns:
+        bool: Whether the entry was written
+    """
+    target = _entry_dir(series, options)
+    staging = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    model = fitted.get('model')
+    rest = dict(fitted)
+    try:
+        os.makedirs(staging, exist_ok=True)
+        if fitted['model_type'] == "prophet":
+            from prophet.serialize import model_to_json
+            with open(os.path.join(staging, _PROPHET), "w") as f:
+                f.write(model_to_json(model))
+            rest.pop('model')
+        elif fitted['model_type'] != "ensemble":
+            model.save(os.path.join(staging, _STATSMODELS))
+            rest.pop('model')
+        with open(os.path.join(staging, _FITTED), "wb") as f:
+            pickle.dump(rest, f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = {
+            'version': MODEL_STORE_VERSION,
+            'libraries': LIBRARY_VERSIONS,
+            'model_type': fitted['model_type'],
+            'time_var': series[0],
+            'target_var': series[1],
+            'fingerprint': series[2],
+            'options': list(options),
+            'created': time.time(),
+            'loads': 0,
+        }
+        with open(os.path.join(staging, _META), "w") as f:
+            json.dump(meta, f)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+    except Exception:
+        logger.warning("Could not store %s model", fitted.get('model_type'), exc_info=True)
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+    prune_store()
+    return True
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, _META)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _is_current(meta, series=None):
+    return (meta is not None and meta.get('version') == MODEL_STORE_VERSION
+            and meta.get('libraries') == LIBRARY_VERSIONS
+            and (series is None or meta.get('fingerprint') == series[2]))
+
+def _load_entry(path, meta):
+    with open(os.path.join(path, _FITTED), "rb") as f:
+        fitted = pickle.load(f)
+    if meta['model_type'] == "prophet":
+        from prophet.serialize import model_from_json
+        with open(os.path.join(path, _PROPHET)) as f:
+            fitted['model'] = model_from_json(f.read())
+    elif meta['model_type'] != "ensemble":
+        from statsmodels.tsa.arima.model import ARIMAResults
+        fitted['model'] = ARIMAResults.load(os.path.join(path, _STATSMODELS))
+    return fitted
+
+def load_model(series, options):
+    """
+    A stored fit for the series and options, or None.
+
+    Entries written by another store version, other library versions or for
+    different data are removed instead of being loaded.
+    """
+    path = _entry_dir(series, options)
+    meta = _read_meta(path)
+    fitted = None
+    if meta is not None:
+        if _is_current(meta, series):
+            try:
+                fitted = _load_entry(path, meta)
+            except Exception:
+                logger.warning("Discarding unreadable stored model %s", path, exc_info=True)
+        if fitted is None:
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            _record_load(path, meta)
+    record_cache("model_store", fitted is not None)
+    return fitted
+
+def _record_load(path, meta):
+    """Count the load and refresh the entry's age, so popular entries are kept and preloaded."""
+    meta['loads'] = meta.get('loads', 0) + 1
+    try:
+        with open(os.path.join(path, _META), "w") as f:
+            json.dump(meta, f)
+    except OSError:
+        pass
+
+def lstm_weights_path(values, horizon, library_version):
+    """
+    File for the Keras weights of the LSTM fitted on ``values`` for ``horizon``.
+
+    Weights depend only on the series, the horizon (the input window length)
+    and the Keras version, so they are stored outside the per-series entries.
+    They count towards ``MODEL_STORE_MAX_ENTRIES`` like the other entries; call
+    ``touch_lstm_weights`` after loading them so used weights are kept.
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(values, dtype=float).tobytes())
+    digest.update(repr((horizon, library_version, MODEL_STORE_VERSION)).encode())
+    return os.path.join(MODEL_STORE_DIR, _LSTM_DIR, f"{digest.hexdigest()[:20]}.weights.h5")
+
+def touch_lstm_weights(path):
+    """Refresh the age of stored LSTM weights after a load."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _lstm_weights():
+    """Paths of the stored LSTM weights."""
+    lstm_dir = os.path.join(MODEL_STORE_DIR, _LSTM_DIR)
+    try:
+        return [os.path.join(lstm_dir, name) for name in os.listdir(lstm_dir) if name.endswith(".weights.h5")]
+    except OSError:
+        return []
+
+# ===== MAINTENANCE =====
+def stored_entries():
+    """(path, meta) of every entry, most recently used first."""
+    entries = []
+    try:
+        series_dirs = [os.path.join(MODEL_STORE_DIR, name) for name in os.listdir(MODEL_STORE_DIR)]
+    except OSError:
+        return entries
+    for series_dir in series_dirs:
+        if not os.path.isdir(series_dir):
+            continue
+        for name in os.listdir(series_dir):
+            path = os.path.join(series_dir, name)
+            meta = _read_meta(path)
+            if meta is not None:
+                entries.append((path, meta))
+    entries.sort(key=lambda entry: os.path.getmtime(os.path.join(entry[0], _META)), reverse=True)
+    return entries
+
+def prune_store(max_entries=MODEL_STORE_MAX_ENTRIES):
+    """
+    Remove stale entries and the least recently used ones beyond ``max_entries``.
+    Stored LSTM weights share the same budget and recency order.
+    """
+    candidates = [(os.path.getmtime(os.path.join(path, _META)), path, _is_current(meta))
+                  for path, meta in stored_entries()]
+    for path in _lstm_weights():
+        try:
+            candidates.append((os.path.getmtime(path), path, True))
+        except OSError:
+            pass
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    kept = 0
+    for _, path, current in candidates:
+        if current and kept < max_entries:
+            kept += 1
+            continue
+        if not os.path.isdir(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            # Other fits of the series remain
+            pass
+
+def popular_models(limit=PRELOAD_ENTRIES):
+    """
+    Load the most used stored fits.
+
+    Returns:
+        list: (series, options, fitted) tuples, most used first
+    """
+    current = [(path, meta) for path, meta in stored_entries() if _is_current(meta)]
+    current.sort(key=lambda entry: entry[1].get('loads', 0), reverse=True)
+    loaded = []
+    for path, meta in current[:limit]:
+        try:
+            fitted = _load_entry(path, meta)
+        except Exception:
+            logger.warning("Discarding unreadable stored model %s", path, exc_info=True)
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        series = (meta['time_var'], meta['target_var'], meta['fingerprint'])
+        loaded.append((series, _options_from_json(meta['options']), fitted))
+    return loaded
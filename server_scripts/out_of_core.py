@@ -0,0 +1,268 @@
+"""
+Out-of-core mode for datasets larger than worker memory.
+Large uploads are converted once to Parquet by DuckDB and queried in place:
+the preview, summary statistics, resampling and per-series extraction run as
+pushed-down queries, and only their (aggregated) results reach pandas.
+"""
+import os
+import threading
+import pandas as pd
+from server_scripts.global_helpers import CACHE_DIR
+from server_scripts.schema import describe_schema
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+# Uploads larger than this many bytes are queried out of core instead of loaded
+OUT_OF_CORE_BYTES = int(os.environ.get("FORECAST_OUT_OF_CORE_MB", "256")) * 2**20
+DUCKDB_MEMORY_LIMIT = os.environ.get("FORECAST_DUCKDB_MEMORY", "1GB")
+PARQUET_DIR = os.path.join(CACHE_DIR, "parquet")
+SPILL_DIR = os.path.join(CACHE_DIR, "duckdb_tmp")
+PREVIEW_ROWS = 5000
+# Points pulled for overview plots of the whole series
+OVERVIEW_POINTS = 2000
+# Rows in one DuckDB vector, the unit of fetch_df_chunk
+_VECTOR_ROWS = 2048
+
+# Pandas grain -> DuckDB date_trunc part
+_TRUNC_PARTS = {
+    "min": "minute",
+    "h": "hour",
+    "D": "day",
+    "W": "week",
+    "MS": "month",
+    "QS": "quarter",
+    "YS": "year",
+}
+_AGGREGATES = {
+    "mean": "avg({v})",
+    "sum": "sum({v})",
+    "median": "median({v})",
+    "last": "arg_max({v}, {t})",
+    "min": "min({v})",
+    "max": "max({v})",
+}
+
+_lazy = {}
+_lazy_lock = threading.Lock()
+
+def use_out_of_core(path):
+    """True when a file should be queried out of core rather than loaded into pandas."""
+    return DUCKDB_AVAILABLE and os.path.getsize(path) > OUT_OF_CORE_BYTES
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+class LazyDataset:
+    """A Parquet-backed dataset queried through DuckDB without loading it into memory."""
+
+    def __init__(self, key, parquet_path):
+        self.key = key
+        self.path = parquet_path
+        self._lock = threading.Lock()
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        self._con = duckdb.connect()
+        self._con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_LIMIT}'")
+        self._con.execute(f"SET temp_directory = '{SPILL_DIR}'")
+        self._con.execute(f"CREATE VIEW data AS SELECT * FROM read_parquet('{parquet_path}')")
+        self.n_rows = self.query("SELECT count(*) AS n FROM data")['n'].iloc[0]
+        self.schema = describe_schema(self.preview())
+        self._time_expr = self._time_expression()
+
+    def close(self):
+        """Close the DuckDB connection; the dataset cannot be queried afterwards."""
+        with self._lock:
+            self._con.close()
+
+    def query(self, sql, params=None):
+        """Run a query against the ``data`` view and return the result as a DataFrame."""
+        with self._lock:
+            return self._con.execute(sql, params or []).df()
+
+    def record_batches(self, chunk_rows):
+        """
+        Stream the whole dataset as Arrow record batches of up to ``chunk_rows`` rows.
+
+        Runs on its own cursor, so a long export does not hold the query lock.
+        """
+        cursor = self._con.cursor()
+        try:
+            yield from cursor.execute("SELECT * FROM data").fetch_record_batch(chunk_rows)
+        finally:
+            cursor.close()
+
+    def frame_chunks(self, chunk_rows):
+        """
+        Stream the whole dataset as pandas frames of about ``chunk_rows`` rows, without pyarrow.
+
+        Runs on its own cursor, like ``record_batches``.
+        """
+        vectors = max(1, chunk_rows // _VECTOR_ROWS)
+        cursor = self._con.cursor()
+        try:
+            result = cursor.execute("SELECT * FROM data")
+            while True:
+                chunk = result.fetch_df_chunk(vectors)
+                if chunk.empty:
+                    return
+                yield chunk
+        finally:
+            cursor.close()
+
+    def _time_expression(self):
+        """SQL expression giving the time column as a timestamp, matching the schema's parsing."""
+        column = _quote(self.schema['time_var'])
+        types = self.query("DESCRIBE data").set_index('column_name')['column_type']
+        column_type = types[self.schema['time_var']].upper()
+        if self.schema['time_kind'] != "datetime":
+            return column
+        if column_type.startswith(("TIMESTAMP", "DATE")):
+            return f"CAST({column} AS TIMESTAMP)"
+        if "INT" in column_type:
+            return f"CAST(make_date(CAST({column} AS INTEGER), 1, 1) AS TIMESTAMP)"
+        return f"TRY_CAST({column} AS TIMESTAMP)"
+
+    def preview(self, limit=PREVIEW_ROWS):
+        """The first rows of the dataset, normalized like an in-memory upload."""
+        # Imported here: the dataset store itself opens out-of-core datasets
+        from server_scripts.datasets import prepare_frame
+        return prepare_frame(self.query(f"SELECT * FROM data LIMIT {int(limit)}"))
+
+    def summary_stats(self):
+        """``compute_summary_stats`` computed by DuckDB over the whole dataset."""
+        rows = []
+        for col in self.schema['numeric_cols']:
+            c = _quote(col)
+            rows.append(self.query(f"""
+                SELECT '{str(col).replace("'", "''")}' AS variable,
+                       count({c}) AS count, avg({c}) AS mean, stddev_samp({c}) AS std,
+                       min({c}) AS min,
+                       quantile_cont({c}, 0.25) AS "25%", quantile_cont({c}, 0.5) AS "50%",
+                       quantile_cont({c}, 0.75) AS "75%",
+                       max({c}) AS max, skewness({c}) AS skew, kurtosis({c}) AS kurtosis
+                FROM data"""))
+        if not rows:
+            return None
+        return pd.concat(rows, ignore_index=True).round(2)
+
+    def series(self, time_var, target_var, grain="raw", how="mean", levels=()):
+        """
+        Extract one series (or one per combination of ``levels``), aggregated to
+        ``grain`` inside DuckDB. Missing times and targets are dropped, like
+        ``resample_series``; only the result is materialized.
+
+        Returns:
+            pandas.DataFrame: ``time_var``, ``target_var`` and the level columns
+        """
+        t = self._time_expr if time_var == self.schema['time_var'] else _quote(time_var)
+        v = _quote(target_var)
+        level_cols = [_quote(level) for level in levels]
+        select_levels = "".join(f", {c}" for c in level_cols)
+        where = f"WHERE {t} IS NOT NULL AND {v} IS NOT NULL AND NOT isnan(CAST({v} AS DOUBLE))"
+        if not grain or grain == "raw" or self.schema['time_kind'] != "datetime":
+            if levels:
+                sql = (f"SELECT {t} AS {_quote(time_var)}, sum({v}) AS {v}{select_levels} FROM data {where} "
+                       f"GROUP BY ALL ORDER BY 1")
+            else:
+                sql = f"SELECT {t} AS {_quote(time_var)}, {v} FROM data {where} ORDER BY 1"
+        else:
+            if grain not in _TRUNC_PARTS:
+                raise ValueError(f"Unknown grain {grain!r}; expected one of {['raw'] + list(_TRUNC_PARTS)}")
+            if how not in _AGGREGATES:
+                raise ValueError(f"Unknown aggregation {how!r}; expected one of {list(_AGGREGATES)}")
+            bucket = f"date_trunc('{_TRUNC_PARTS[grain]}', {t})"
+            if grain == "W":
+                # Pandas weekly bins are labelled by the Sunday that ends them
+                bucket = f"({bucket} + INTERVAL 6 DAY)"
+            aggregate = _AGGREGATES[how].format(v=v, t=t)
+            sql = (f"SELECT {bucket} AS {_quote(time_var)}, {aggregate} AS {v}{select_levels} "
+                   f"FROM data {where} GROUP BY ALL ORDER BY 1")
+        result = self.query(sql)
+        if self.schema['time_kind'] == "datetime":
+            result[time_var] = pd.to_datetime(result[time_var])
+        return result
+
+    def overview(self, max_points=OVERVIEW_POINTS):
+        """Target averaged over ``max_points`` equal-width time buckets, for whole-series plots."""
+        time_var, target_var = self.schema['time_var'], self.schema['target_var']
+        t = self._time_expr
+        x = f"epoch_us({t})" if self.schema['time_kind'] == "datetime" else f"CAST({t} AS DOUBLE)"
+        v = _quote(target_var)
+        result = self.query(f"""
+            WITH bounds AS (SELECT min({x}) AS lo, max({x}) AS hi FROM data)
+            SELECT min({t}) AS {_quote(time_var)}, avg({v}) AS {v}
+            FROM data, bounds
+            WHERE {t} IS NOT NULL
+            GROUP BY floor(({x} - lo) / greatest((hi - lo) / {int(max_points)}, 1))
+            ORDER BY 1""")
+        if self.schema['time_kind'] == "datetime":
+            result[time_var] = pd.to_datetime(result[time_var])
+        return result
+
+def parquet_path(key):
+    return os.path.join(PARQUET_DIR, f"{key}.parquet")
+
+def parquet_keys():
+    """Keys of the out-of-core datasets with a Parquet copy on disk."""
+    try:
+        names = os.listdir(PARQUET_DIR)
+    except OSError:
+        return []
+    return [name[:-len(".parquet")] for name in names if name.endswith(".parquet")]
+
+def close_lazy(key, remove_file=False):
+    """
+    Close the out-of-core dataset of ``key`` and forget it; it is reopened from
+    its Parquet copy on next use. With ``remove_file`` the copy is deleted too.
+    """
+    with _lazy_lock:
+        dataset = _lazy.pop(key, None)
+    if dataset is not None:
+        dataset.close()
+    if remove_file:
+        try:
+            os.remove(parquet_path(key))
+        except OSError:
+            pass
+
+def open_lazy(key, csv_path):
+    """
+    Return the out-of-core dataset for a file, converting it to Parquet on first use.
+
+    The conversion streams through DuckDB, so it needs no more memory than the
+    configured DuckDB limit.
+    """
+    with _lazy_lock:
+        dataset = _lazy.get(key)
+        if dataset is not None:
+            return dataset
+        os.makedirs(PARQUET_DIR, exist_ok=True)
+        path = parquet_path(key)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            con = duckdb.connect()
+            con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_LIMIT}'")
+            con.execute(f"COPY (SELECT * FROM read_csv_auto(?)) TO '{tmp_path}' (FORMAT PARQUET)", [csv_path])
+            con.close()
+            os.replace(tmp_path, path)
+        dataset = _lazy[key] = LazyDataset(key, path)
+        return dataset
+
+def lazy_dataset(df):
+    """The out-of-core dataset a preview frame stands for, or None for in-memory data."""
+    if df is None or not df.attrs.get('out_of_core'):
+        return None
+    key = df.attrs.get('dataset_key')
+    with _lazy_lock:
+        dataset = _lazy.get(key)
+    if dataset is None:
+        path = parquet_path(key)
+        if os.path.exists(path):
+            with _lazy_lock:
+                dataset = _lazy.get(key)
+                if dataset is None:
+                    dataset = _lazy[key] = LazyDataset(key, path)
+    return dataset
@@ -0,0 +1,113 @@
+"""
+Outlier screening for the AI Forecasting Application.
+A Hampel filter flags points far from their rolling median, measured in
+rolling median absolute deviations (MAD). Flags are shown in the data plot and
+flagged values can be winsorized to the filter bounds before fitting.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Points in the centred window (the point itself and 3 on each side)
+HAMPEL_WINDOW = 7
+# Distance from the rolling median, in robust standard deviations, that flags a point
+HAMPEL_SIGMAS = 3.0
+# Scales the MAD to a standard deviation for normally distributed data
+MAD_SCALE = 1.4826
+# Rows per block; blocks overlap by two half-windows so results match an unchunked pass
+CHUNK_ROWS = 1_000_000
+
+def _rolling_median(values, window):
+    """
+    Centred rolling median of each column of a 2-D array (odd ``window``).
+
+    Windows are strided views, so the interior is one ``np.partition`` over
+    (rows x window) without copying windows in Python; the shortened windows
+    at the ends are computed directly. Blocks with missing values use pandas'
+    NaN-aware sliding-window median instead.
+    """
+    n, half = len(values), window // 2
+    if n <= window or np.isnan(values).any():
+        return pd.DataFrame(values).rolling(window, center=True, min_periods=1).median().to_numpy()
+    median = np.empty_like(values)
+    windows = sliding_window_view(values, window, axis=0)
+    median[half:n - half] = np.partition(windows, half, axis=-1)[..., half]
+    for i in range(half):
+        median[i] = np.median(values[:i + half + 1], axis=0)
+        median[n - 1 - i] = np.median(values[n - 1 - i - half:], axis=0)
+    return median
+
+def hampel_bounds(values, window=HAMPEL_WINDOW, n_sigmas=HAMPEL_SIGMAS, chunk_rows=CHUNK_ROWS):
+    """
+    Lower and upper Hampel bounds of every point, for all columns at once.
+
+    The centre is the rolling median and the scale the rolling median of the
+    absolute deviations from it (times MAD_SCALE). Rows are processed in
+    overlapping blocks of ``chunk_rows`` to bound memory on long series.
+
+    Args:
+        values (array): 1-D series or 2-D (rows x columns) array
+        window (int): Centred window length (rounded up to odd)
+        n_sigmas (float): Bound distance in robust standard deviations
+        chunk_rows (int): Rows per block
+
+    Returns:
+        tuple: (lower, upper) arrays shaped like ``values``
+    """
+    values = np.asarray(values, dtype=float)
+    window = window // 2 * 2 + 1
+    flat = values.ndim == 1
+    if flat:
+        values = values[:, None]
+    n = len(values)
+    half = window // 2
+    lower = np.empty_like(values)
+    upper = np.empty_like(values)
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        lo, hi = max(start - 2 * half, 0), min(stop + 2 * half, n)
+        block = values[lo:hi]
+        median = _rolling_median(block, window)
+        scale = MAD_SCALE * _rolling_median(np.abs(block - median), window)
+        offset = start - lo
+        median = median[offset:offset + stop - start]
+        scale = scale[offset:offset + stop - start]
+        lower[start:stop] = median - n_sigmas * scale
+        upper[start:stop] = median + n_sigmas * scale
+    if flat:
+        return lower[:, 0], upper[:, 0]
+    return lower, upper
+
+def _numeric_columns(df, columns):
+    if columns is not None:
+        return list(columns)
+    return list(df.select_dtypes(include=['number']).columns)
+
+def flag_outliers(df, columns=None, window=HAMPEL_WINDOW, n_sigmas=HAMPEL_SIGMAS):
+    """
+    Hampel flags for the numeric columns of a frame (missing values are never flagged).
+
+    Returns:
+        pandas.DataFrame: Boolean frame with the same index and the screened columns
+    """
+    columns = _numeric_columns(df, columns)
+    values = df[columns].to_numpy(dtype=float)
+    lower, upper = hampel_bounds(values, window=window, n_sigmas=n_sigmas)
+    flags = (values < lower) | (values > upper)
+    return pd.DataFrame(flags, index=df.index, columns=columns)
+
+def winsorize_outliers(df, columns=None, window=HAMPEL_WINDOW, n_sigmas=HAMPEL_SIGMAS):
+    """
+    Clip the flagged values of the numeric columns to their Hampel bounds.
+
+    Returns:
+        tuple: (new frame, number of values changed)
+    """
+    columns = _numeric_columns(df, columns)
+    values = df[columns].to_numpy(dtype=float)
+    lower, upper = hampel_bounds(values, window=window, n_sigmas=n_sigmas)
+    clipped = np.clip(values, lower, upper)
+    changed = int(np.count_nonzero(clipped != values) - np.count_nonzero(np.isnan(values)))
+    if not changed:
+        return df, 0
+    return df.assign(**{col: clipped[:, i] for i, col in enumerate(columns)}), changed
@@ -0,0 +1,240 @@
+"""
+Preprocessing stages applied to a series before model fitting.
+Contains frequency inference, resampling to a coarser modeling grain and
+gap filling on the full time grid.
+"""
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from server_scripts.global_helpers import LRUCache
+
+# ===== MODELING GRAINS =====
+GRAIN_CHOICES = {
+    "raw": "As uploaded",
+    "min": "Minute",
+    "h": "Hourly",
+    "D": "Daily",
+    "W": "Weekly",
+    "MS": "Monthly",
+    "QS": "Quarterly",
+    "YS": "Yearly",
+}
+AGGREGATION_CHOICES = {
+    "mean": "Mean",
+    "sum": "Sum",
+    "median": "Median",
+    "last": "Last",
+    "min": "Min",
+    "max": "Max",
+}
+
+# Calendar frequencies recognised from the median spacing (in days) when pd.infer_freq fails
+_CALENDAR_SPACING = [
+    ((6.5, 7.5), "W"),
+    ((27.5, 31.5), "MS"),
+    ((89.5, 92.5), "QS"),
+    ((364.5, 366.5), "YS"),
+]
+
+# Timestamps used to infer the frequency of a series
+FREQUENCY_SAMPLE = 10000
+
+# ===== GAP FILLING =====
+IMPUTATION_CHOICES = {
+    "none": "None (leave gaps)",
+    "ffill": "Forward fill",
+    "interpolate": "Linear interpolation",
+    "seasonal": "Seasonal naive",
+    "mode": "Most frequent value",
+}
+# Season length used by seasonal-naive filling, by frequency alias prefix
+SEASON_LENGTHS = {
+    "min": 60,
+    "h": 24,
+    "D": 7,
+    "B": 5,
+    "W": 52,
+    "MS": 12,
+    "ME": 12,
+    "QS": 4,
+    "QE": 4,
+}
+# A time grid may hold at most this many times the observed rows; sparser data
+# (or a misdetected frequency) is filled in place without reindexing
+MAX_GRID_EXPANSION = 10
+
+# Resampled series keyed by (dataset fingerprint, time_var, target_var, grain, aggregation)
+_resample_cache = LRUCache(maxsize=64, name="resample", shared=True)
+# Gap-filled frames keyed by (cache key, time_var, columns, freq, method)
+_impute_cache = LRUCache(maxsize=64, name="impute", shared=True)
+
+def infer_frequency(times):
+    """
+    Infer the cadence of a datetime column.
+
+    Args:
+        times (array-like): Datetime values, in any order and possibly with gaps
+
+    Returns:
+        str: A pandas offset alias (e.g. "D", "h", "MS"), or None if it cannot be inferred
+    """
+    # The cadence is read from the earliest timestamps, which also keeps very long
+    # histories within the nanosecond range used below
+    index = pd.DatetimeIndex(times).dropna().unique().sort_values()[:FREQUENCY_SAMPLE].as_unit('ns')
+    if len(index) < 2:
+        return None
+    if len(index) >= 3:
+        freq = pd.infer_freq(index)
+        if freq is not None:
+            return freq
+    # Irregular or gappy series: fall back to the median spacing
+    spacing = np.median(np.diff(index.asi8))
+    days = spacing / pd.Timedelta(days=1).value
+    for (low, high), alias in _CALENDAR_SPACING:
+        if low <= days <= high:
+            return alias
+    return to_offset(pd.Timedelta(int(spacing))).freqstr
+
+def resample_series(ts_data, time_var, target_var, grain="raw", how="mean", cache_key=None):
+    """
+    Aggregate a series to a coarser modeling grain.
+
+    The aggregation is a single vectorized ``resample`` over the datetime column;
+    empty bins are dropped. Results are cached per ``cache_key`` (usually the
+    dataset fingerprint), grain and aggregation, so repeated runs at the same
+    grain skip the aggregation.
+
+    Args:
+        ts_data (pandas.DataFrame): Data with ``time_var`` and ``target_var`` columns
+        time_var (str): Time column name
+        target_var (str): Target column name
+        grain (str): Key of GRAIN_CHOICES; "raw" returns the data unchanged
+        how (str): Key of AGGREGATION_CHOICES
+        cache_key (str): Identifier of the source dataset, or None to disable caching
+
+    Returns:
+        pandas.DataFrame: Resampled data with the same two columns
+    """
+    if not grain or grain == "raw":
+        return ts_data
+    times = ts_data[time_var]
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        # Numeric time columns (e.g. plain years) have no calendar to resample on
+        if pd.api.types.is_numeric_dtype(times):
+            return ts_data
+        times = pd.to_datetime(times, errors='coerce')
+    key = (cache_key, time_var, target_var, grain, how) if cache_key is not None else None
+    if key is not None:
+        cached = _resample_cache.get(key)
+        if cached is not None:
+            return cached
+    series = pd.Series(ts_data[target_var].to_numpy(), index=pd.DatetimeIndex(times), name=target_var)
+    series = series[series.index.notna()]
+    resampled = series.resample(grain).agg(how)
+    if how == "sum":
+        # Bins with no rows at all are gaps, not zero totals
+        counts = series.resample(grain).count()
+        resampled = resampled[counts > 0]
+    resampled = resampled.dropna()
+    result = pd.DataFrame({time_var: resampled.index, target_var: resampled.to_numpy()})
+    if key is not None:
+        _resample_cache.set(key, result)
+    return result
+
+def season_length(freq):
+    """Seasonal period for a frequency alias (e.g. 12 for monthly), or None if unknown."""
+    if not freq:
+        return None
+    alias = to_offset(freq).name
+    for prefix in sorted(SEASON_LENGTHS, key=len, reverse=True):
+        if alias == prefix or alias.startswith(f"{prefix}-"):
+            return SEASON_LENGTHS[prefix]
+    return None
+
+def _full_grid(times, freq):
+    """Regular DatetimeIndex covering ``times`` at ``freq``, or None if it cannot be built."""
+    if not freq or len(times) < 2:
+        return None
+    try:
+        grid = pd.date_range(times.min(), times.max(), freq=freq)
+    except (ValueError, OverflowError):
+        return None
+    if len(grid) > MAX_GRID_EXPANSION * len(times) or not times.isin(grid).all():
+        return None
+    return grid
+
+def _seasonal_fill(values, season):
+    """
+    Fill NaNs with the value one season earlier, all columns at once. Gaps
+    longer than a season are filled from the nearest earlier season.
+    """
+    values = values.copy()
+    missing = np.isnan(values)
+    while season and missing[season:].any():
+        shifted = np.full_like(values, np.nan)
+        shifted[season:] = values[:-season]
+        fill = missing & ~np.isnan(shifted)
+        if not fill.any():
+            break
+        values[fill] = shifted[fill]
+        missing &= ~fill
+    return values
+
+def fill_gaps(ts_data, time_var, freq=None, method="none", cache_key=None):
+    """
+    Reindex a frame to its full time grid and impute the missing values.
+
+    Duplicate timestamps are averaged, the frame is reindexed to every step of
+    ``freq`` between its first and last timestamp, and all numeric columns are
+    imputed together as one 2-D array. Values still missing at the edges (e.g.
+    before the first observation) are filled from the nearest observation.
+
+    Args:
+        ts_data (pandas.DataFrame): Data with ``time_var`` and numeric columns
+        time_var (str): Time column name
+        freq (str): Frequency alias of the grid; None imputes without reindexing
+        method (str): Key of IMPUTATION_CHOICES; "none" returns the data unchanged
+        cache_key (str): Identifier of the source dataset, or None to disable caching
+
+    Returns:
+        pandas.DataFrame: ``time_var`` and the numeric columns, without gaps
+    """
+    if not method or method == "none":
+        return ts_data
+    columns = [col for col in ts_data.select_dtypes(include=['number']).columns if col != time_var]
+    key = (cache_key, time_var, tuple(columns), freq, method) if cache_key is not None else None
+    if key is not None:
+        cached = _impute_cache.get(key)
+        if cached is not None:
+            return cached
+    times = ts_data[time_var]
+    frame = pd.DataFrame(ts_data[columns].to_numpy(dtype=float), columns=columns,
+                         index=pd.Index(times.to_numpy(), name=time_var))
+    frame = frame[frame.index.notna()]
+    if not frame.index.is_unique:
+        frame = frame.groupby(level=0, sort=True).mean()
+    elif not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+    if pd.api.types.is_datetime64_any_dtype(frame.index):
+        grid = _full_grid(frame.index, freq)
+        if grid is not None:
+            frame = frame.reindex(grid)
+    if method == "ffill":
+        frame = frame.ffill()
+    elif method == "interpolate":
+        frame = frame.interpolate(method='linear', limit_area='inside')
+    elif method == "seasonal":
+        season = season_length(freq)
+        if season:
+            frame = pd.DataFrame(_seasonal_fill(frame.to_numpy(), season), index=frame.index, columns=columns)
+        frame = frame.ffill()
+    elif method == "mode":
+        modes = frame.mode().iloc[0] if len(frame) else pd.Series(dtype=float)
+        frame = frame.fillna(modes)
+    else:
+        raise ValueError(f"Unknown imputation method: {method}")
+    frame = frame.ffill().bfill()
+    result = frame.rename_axis(time_var).reset_index()
+    if key is not None:
+        _impute_cache.set(key, result)
+    return result
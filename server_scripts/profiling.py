@@ -0,0 +1,218 @@
+"""
+On-demand profiling of forecast runs for the AI Forecasting Application.
+Re-runs a forecast through the normal entry points with a deterministic
+(cProfile) or sampling profiler attached plus tracemalloc, and writes the
+profile and a flamegraph-ready collapsed stack file for download.
+"""
+import os
+import sys
+import hmac
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from urllib.parse import parse_qs
+import pandas as pd
+from server_scripts.global_helpers import CACHE_DIR
+from server_scripts.server_forecast import (
+    fit_forecast_model, predict_forecast, run_arima_forecast, run_prophet_forecast
+)
+
+# FORECAST_ADMIN shows the profiling controls to every visitor; with
+# FORECAST_ADMIN_TOKEN they are only shown to sessions opened with ?admin=<token>
+ADMIN_ENABLED = os.environ.get("FORECAST_ADMIN", "").lower() in ("1", "true", "yes")
+ADMIN_TOKEN = os.environ.get("FORECAST_ADMIN_TOKEN", "")
+PROFILING_AVAILABLE = ADMIN_ENABLED or bool(ADMIN_TOKEN)
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+# Profile files beyond this many are deleted, oldest first
+PROFILE_MAX_FILES = int(os.environ.get("FORECAST_PROFILE_FILES", "40"))
+PROFILER_CHOICES = {
+    "deterministic": "Deterministic (cProfile)",
+    "sampling": "Sampling",
+}
+SAMPLE_INTERVAL = 0.005
+# Frames kept per stack in the tracemalloc snapshot and rows in the summaries
+TRACEMALLOC_FRAMES = 10
+TOP_N = 25
+
+# tracemalloc is process-wide, so only one profile runs at a time
+_profile_lock = threading.Lock()
+
+def is_admin_session(url_search):
+    """Whether a session opened with the query string ``url_search`` may use the profiling controls."""
+    if ADMIN_ENABLED:
+        return True
+    if not ADMIN_TOKEN:
+        return False
+    tokens = parse_qs(url_search.lstrip("?")).get("admin", [])
+    return any(hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()) for token in tokens)
+
+class StackSampler:
+    """
+    Samples the Python stack of one thread at a fixed interval from a background
+    thread and counts identical stacks, in the collapsed format used by flamegraph tools.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Collapsed stacks, one ``frame;frame;frame count`` line each."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top_n=TOP_N):
+        """Samples per function, counting time spent in the function itself and in its callees."""
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1].split(" (")[0]] += count
+            for name in {f.split(" (")[0] for f in frames}:
+                total_counts[name] += count
+        samples = sum(self.stacks.values()) or 1
+        rows = [{'Function': name, 'Self %': round(100 * self_counts[name] / samples, 1),
+                 'Total %': round(100 * count / samples, 1)}
+                for name, count in total_counts.most_common(top_n)]
+        return pd.DataFrame(rows, columns=['Function', 'Self %', 'Total %'])
+
+def _run_forecast(job_args, horizon, use_cache=True):
+    """Run a forecast through the same entry points as the UI."""
+    ts_data, time_var, target_var = job_args['ts_data'], job_args['time_var'], job_args['target_var']
+    model_type = job_args['model_type']
+    if model_type == "prophet":
+        return run_prophet_forecast(
+            ts_data, time_var, target_var, horizon, fast_mode=job_args.get('fast_mode', False),
+            uncertainty_samples=job_args.get('uncertainty_samples', 0),
+            interval_method=job_args.get('interval_method', "sampling"), use_cache=use_cache
+        )
+    if model_type == "auto_arima":
+        return run_arima_forecast(ts_data, time_var, target_var, horizon, use_cache=use_cache)
+    return predict_forecast(fit_forecast_model(**job_args, use_cache=use_cache), horizon)
+
+def _cprofile_summary(profile, top_n=TOP_N):
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, name), (cc, nc, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'Function': f"{name} ({os.path.basename(filename)}:{line})",
+                     'Calls': nc, 'Self (s)': tottime, 'Total (s)': cumtime})
+    summary = pd.DataFrame(rows, columns=['Function', 'Calls', 'Self (s)', 'Total (s)'])
+    return summary.sort_values('Total (s)', ascending=False).head(top_n).round(4).reset_index(drop=True)
+
+def _memory_summary(snapshot, top_n=TOP_N):
+    rows = []
+    for stat in snapshot.statistics('lineno')[:top_n]:
+        frame = stat.traceback[0]
+        rows.append({'Location': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                     'Size (KiB)': round(stat.size / 1024, 1), 'Allocations': stat.count})
+    return pd.DataFrame(rows, columns=['Location', 'Size (KiB)', 'Allocations'])
+
+def _prune_profiles():
+    files = [os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR)]
+    if len(files) <= PROFILE_MAX_FILES:
+        return
+    files.sort(key=os.path.getmtime)
+    for path in files[:len(files) - PROFILE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def profile_forecast(job_args, horizon, mode="deterministic", cold=True):
+    """
+    Profile one forecast run for wall-clock time and memory allocations.
+
+    The stack sampler always runs so a collapsed stack file is produced in both
+    modes; in deterministic mode cProfile is attached as well and its stats are
+    written as the profile file. Runs are serialised because tracemalloc traces
+    the whole process; allocations made by other threads during the run are
+    included in the memory figures.
+
+    Args:
+        job_args (dict): Keyword arguments of ``fit_forecast_model``
+        horizon (int): Forecast horizon
+        mode (str): Key of PROFILER_CHOICES
+        cold (bool): Fit without the model caches and warm starts so the full fit is
+            measured; cached and stored fits are left untouched
+
+    Returns:
+        dict: Wall time, peak traced memory, function and memory summaries and the
+              paths of the profile and collapsed stack files
+    """
+    with _profile_lock:
+        return _profile_forecast(job_args, horizon, mode, cold)
+
+def _profile_forecast(job_args, horizon, mode, cold):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = uuid.uuid4().hex[:12]
+    sampler = StackSampler(threading.get_ident())
+    profile = cProfile.Profile() if mode == "deterministic" else None
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        if profile is not None:
+            profile.enable()
+        try:
+            _run_forecast(job_args, horizon, use_cache=not cold)
+        finally:
+            if profile is not None:
+                profile.disable()
+    finally:
+        wall_seconds = time.perf_counter() - start
+        sampler.stop()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+
+    collapsed_path = os.path.join(PROFILE_DIR, f"{profile_id}.collapsed.txt")
+    with open(collapsed_path, "w") as f:
+        f.write(sampler.collapsed())
+    if profile is not None:
+        profile_path = os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+        profile.dump_stats(profile_path)
+        summary = _cprofile_summary(profile)
+    else:
+        profile_path = collapsed_path
+        summary = sampler.summary()
+    _prune_profiles()
+    return {
+        'id': profile_id,
+        'mode': mode,
+        'model_type': job_args['model_type'],
+        'wall_seconds': wall_seconds,
+        'peak_bytes': peak,
+        'samples': sum(sampler.stacks.values()),
+        'summary': summary,
+        'memory': _memory_summary(snapshot),
+        'profile_path': profile_path,
+        'collapsed_path': collapsed_path,
+    }
@@ -0,0 +1,141 @@
+"""
+Forecast run history for the AI Forecasting Application.
+Each session keeps its last forecast results in a bounded, least-recently-used
+store, so runs can be compared side by side without refitting.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+RUN_HISTORY_SIZE = int(os.environ.get("FORECAST_RUN_HISTORY", "10"))
+# Upper bound on the arrays held by one session's history
+RUN_HISTORY_MAX_BYTES = int(os.environ.get("FORECAST_RUN_HISTORY_MB", "64")) * 2**20
+# Rows of actuals shown before the forecasts in the comparison plot
+COMPARE_HISTORY_ROWS = 100
+
+def result_nbytes(result):
+    """Approximate memory held by the arrays of a forecast result."""
+    total = 0
+    for value in result.values():
+        if isinstance(value, (np.ndarray, pd.Series, pd.Index)):
+            total += value.nbytes
+        elif isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(index=False).sum())
+    return total
+
+class RunHistory:
+    """
+    The last ``maxsize`` forecast results of a session, least recently used
+    evicted first, also bounded by ``max_bytes`` of result arrays.
+    Viewing a run marks it as used.
+    """
+
+    def __init__(self, maxsize=RUN_HISTORY_SIZE, max_bytes=RUN_HISTORY_MAX_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._runs = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def add(self, result, settings=""):
+        """
+        Record a forecast result.
+
+        Args:
+            result (dict): Output of ``predict_forecast``
+            settings (str): Short description of the inputs the run was made with
+
+        Returns:
+            str: The run id
+        """
+        with self._lock:
+            run_id = str(self._next_id)
+            self._next_id += 1
+            self._runs[run_id] = {
+                'id': run_id,
+                'label': f"Run {run_id}: {result['label']} ({result['horizon']} periods)",
+                'settings': settings,
+                'time': time.strftime('%H:%M:%S'),
+                'result': result,
+                'nbytes': result_nbytes(result),
+            }
+            self._evict()
+            return run_id
+
+    def _evict(self):
+        total = sum(run['nbytes'] for run in self._runs.values())
+        # The newest run is always kept, even if it alone exceeds the byte limit
+        while len(self._runs) > 1 and (len(self._runs) > self.maxsize or total > self.max_bytes):
+            _, run = self._runs.popitem(last=False)
+            total -= run['nbytes']
+
+    def get(self, run_ids):
+        """The runs with the given ids that are still held, in the order given."""
+        with self._lock:
+            runs = []
+            for run_id in run_ids:
+                if run_id in self._runs:
+                    self._runs.move_to_end(run_id)
+                    runs.append(self._runs[run_id])
+            return runs
+
+    def runs(self):
+        """All held runs, newest first."""
+        with self._lock:
+            return sorted(self._runs.values(), key=lambda run: int(run['id']), reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+
+    def __len__(self):
+        return len(self._runs)
+
+# ===== COMPARISON =====
+def history_table(runs):
+    """One row per run with its settings and headline metrics."""
+    rows = []
+    for run in runs:
+        result = run['result']
+        metrics = dict(zip(result['metrics']['Metric'], result['metrics']['Value']))
+        rows.append({
+            'Run': run['id'], 'Time': run['time'], 'Model': result['label'],
+            'Target': result['target_var'], 'Horizon': result['horizon'],
+            'Settings': run['settings'], **metrics,
+        })
+    return pd.DataFrame(rows)
+
+def compare_metrics(runs):
+    """Metrics of several runs side by side, one column per run."""
+    table = None
+    for run in runs:
+        metrics = run['result']['metrics'].rename(columns={'Value': f"Run {run['id']} ({run['result']['label']})"})
+        table = metrics if table is None else table.merge(metrics, on='Metric', how='left')
+    return table
+
+def plot_comparison(runs, history_rows=COMPARE_HISTORY_ROWS):
+    """Overlay the forecasts (and interval bands) of several runs on the latest actuals."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    shown_actuals = set()
+    for i, run in enumerate(runs):
+        result = run['result']
+        if result['target_var'] not in shown_actuals:
+            shown_actuals.add(result['target_var'])
+            x_actual = result['x_actual'][-history_rows:]
+            ax.plot(x_actual, result['y_actual'][-history_rows:], color='black', linewidth=1.5, alpha=0.7,
+                    label=f"Actual ({result['target_var']})")
+        color = colors[i % len(colors)]
+        ax.plot(result['x_forecast'], result['y_forecast'], color=color, linewidth=2, label=run['label'])
+        if result['x_band'] is not None and not np.all(np.isnan(result['lower'])):
+            ax.fill_between(result['x_band'], result['lower'], result['upper'], color=color, alpha=0.12)
+    ax.set_title("Forecast Comparison", fontsize=14)
+    ax.set_xlabel('Time', fontsize=12)
+    ax.legend(fontsize=9)
+    ax.grid(True, alpha=0.3)
+    plt.tight_layout()
+    return fig
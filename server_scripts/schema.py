@@ -0,0 +1,120 @@
+"""
+Ingestion-time schema normalization for the AI Forecasting Application.
+Uploaded data is typed once: numeric-looking text becomes numeric, the time
+column is parsed and sorted, and a schema descriptor is attached to the frame
+so renderers and models read it instead of re-deriving types on every call.
+"""
+import pandas as pd
+from server_scripts.global_helpers import guess_time_target
+from server_scripts.preprocessing import infer_frequency
+
+# Integer time columns in this range are read as calendar years
+YEAR_RANGE = (1000, 2999)
+# Share of non-missing text values that must parse for a column to count as dates/numbers
+PARSE_THRESHOLD = 0.9
+
+def _parse_share(parsed, original):
+    present = original.notna().sum()
+    return parsed.notna().sum() / present if present else 0.0
+
+def coerce_numeric_columns(df):
+    """Convert text columns whose values are (almost) all numbers to numeric dtypes."""
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            numeric = pd.to_numeric(values, errors='coerce')
+            if _parse_share(numeric, values) >= PARSE_THRESHOLD:
+                converted[col] = numeric
+    return df.assign(**converted) if converted else df
+
+def parse_time_column(values):
+    """
+    Parse a candidate time column.
+
+    Integer columns whose values all look like years (e.g. 1995) are parsed with
+    ``format='%Y'``; other numeric columns are left as a plain numeric axis.
+
+    Returns:
+        pandas.Series: Datetime values, or None if the column is not time-like
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if pd.api.types.is_bool_dtype(values):
+        return None
+    if pd.api.types.is_numeric_dtype(values):
+        present = values.dropna()
+        if (len(present) > 0 and (present % 1 == 0).all()
+                and present.between(*YEAR_RANGE).all()):
+            return pd.to_datetime(values.astype('Int64').astype(str), format='%Y', errors='coerce')
+        return None
+    parsed = pd.to_datetime(values, errors='coerce')
+    return parsed if _parse_share(parsed, values) >= PARSE_THRESHOLD else None
+
+def describe_schema(df, time_var=None, target_var=None):
+    """
+    Build the schema descriptor of a frame without modifying it.
+
+    Returns:
+        dict: ``time_var``, ``target_var``, ``time_kind`` ("datetime", "numeric" or
+              "other"), ``numeric_cols``, ``category_cols``, ``freq`` and ``sorted``
+    """
+    if time_var is None or target_var is None:
+        guessed_time, guessed_target = guess_time_target(df)
+        time_var = time_var or guessed_time
+        target_var = target_var or guessed_target
+    times = df[time_var]
+    if pd.api.types.is_datetime64_any_dtype(times):
+        time_kind = "datetime"
+    elif pd.api.types.is_numeric_dtype(times):
+        time_kind = "numeric"
+    else:
+        time_kind = "other"
+    numeric_cols = [col for col in df.select_dtypes(include=['number']).columns if col != time_var]
+    return {
+        'time_var': time_var,
+        'target_var': target_var,
+        'time_kind': time_kind,
+        'numeric_cols': numeric_cols,
+        'category_cols': [col for col in df.columns if col not in numeric_cols and col != time_var],
+        'freq': infer_frequency(times) if time_kind == "datetime" else None,
+        # Missing timestamps are sorted last and do not count against the order
+        'sorted': bool(times.dropna().is_monotonic_increasing),
+    }
+
+def normalize_frame(df):
+    """
+    Type an uploaded frame once at ingestion.
+
+    Numeric-looking text columns are converted, the time column is parsed, rows
+    are sorted by time and a datetime time column also becomes the index. The
+    schema descriptor is stored in ``df.attrs['schema']``.
+
+    Returns:
+        pandas.DataFrame: The normalized frame (a new object; the input is not modified)
+    """
+    df = coerce_numeric_columns(df)
+    time_var, _ = guess_time_target(df)
+    parsed = parse_time_column(df[time_var])
+    if parsed is not None:
+        df = df.assign(**{time_var: parsed})
+    if not df[time_var].dropna().is_monotonic_increasing or df[time_var].isna().any():
+        df = df.sort_values(by=time_var, kind='stable', na_position='last')
+    if parsed is not None:
+        df = df.set_axis(pd.DatetimeIndex(df[time_var].to_numpy()), axis=0)
+    else:
+        df = df.reset_index(drop=True)
+    df.attrs['schema'] = describe_schema(df, time_var=time_var)
+    return df
+
+def frame_schema(df):
+    """
+    Schema descriptor of a frame: the one stored at ingestion when it still
+    matches the frame's columns, else a freshly described one.
+    """
+    schema = df.attrs.get('schema')
+    if schema is not None:
+        columns = set(df.columns)
+        if {schema['time_var'], schema['target_var'], *schema['numeric_cols']} <= columns:
+            return schema
+    return describe_schema(df)
@@ -0,0 +1,37 @@
+"""
+Client-side chart handlers for the AI Forecasting Application.
+When a chart's "Interactive chart" switch is on, its data is sent once to the
+browser as downsampled typed arrays instead of rendering a matplotlib image.
+"""
+from server_scripts.charts import CHART_MESSAGE, data_chart, empty_chart, forecast_chart
+from server_scripts.instrumentation import timed
+from server_scripts.server_data import data_viz_source
+from server_scripts.server_forecast import INTERVAL_WIDTH
+
+def handle_client_charts(input, session, data, forecast_result):
+    from shiny import reactive
+
+    @reactive.effect
+    async def _():
+        if not input.data_viz_interactive():
+            return
+        df = data.get()
+        if df is None:
+            payload = empty_chart("data_viz_chart", "Upload data to see visualization")
+        else:
+            with timed("render", output="data_viz_chart"):
+                source, outliers = data_viz_source(df, input.flag_outliers())
+                payload = data_chart("data_viz_chart", source, outliers)
+        await session.send_custom_message(CHART_MESSAGE, payload)
+
+    @reactive.effect
+    async def _():
+        if not input.forecast_plot_interactive():
+            return
+        result = forecast_result()
+        if result is None:
+            payload = empty_chart("forecast_plot_chart", "Upload data and click 'Run Forecast' to see results")
+        else:
+            with timed("render", output="forecast_plot_chart"):
+                payload = forecast_chart("forecast_plot_chart", result, f'{INTERVAL_WIDTH:.0%} Prediction Interval')
+        await session.send_custom_message(CHART_MESSAGE, payload)
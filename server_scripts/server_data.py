@@ -2,170 +2,248 @@
 Data handling and visualization logic for the AI Forecasting Application.
 Contains file upload, data preview, visualization, and summary stats functions.
 """
+import os
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from io import StringIO
+from server_scripts.schema import frame_schema
+from server_scripts.storage import memory_report
+from server_scripts.datasets import open_file, shared_artefact
+from server_scripts.out_of_core import lazy_dataset
+from server_scripts.outliers import flag_outliers
+from server_scripts.instrumentation import instrumented_renderer, timed
+from server_scripts.exports import export_stream
+from server_scripts.global_helpers import APP_DIR
+
+TEMPLATE_PATH = os.path.join(APP_DIR, "timeseries_demo.csv")
 
 def handle_file_upload(input, session, data):
-    from shiny import reactive
+    from shiny import reactive, ui
+    # The session holds a handle into the shared dataset store, not its own copy
+    handles = []
+
+    def release_handles():
+        while handles:
+            handles.pop().release()
+
+    session.on_ended(release_handles)
+
     @reactive.effect
     def _():
         file_info = input.file()
         if file_info and len(file_info) > 0:
             file_path = file_info[0]["datapath"]
-            df = pd.read_csv(file_path)
+            with timed("load_upload"):
+                handle = open_file(file_path, reader=read_uploaded_file)
+            release_handles()
+            handles.append(handle)
+            df = handle.frame
+            schema = frame_schema(df)
             data.set(df)
+            ref = handle.key
+            ui.notification_show(f"Dataset reference for the REST API: {ref}", duration=8)
+            if lazy_dataset(df) is not None:
+                ui.notification_show(
+                    f"Large file: {lazy_dataset(df).n_rows:,} rows are queried out of core; "
+                    f"the table shows the first {len(df):,}", duration=8)
             session.ui.update_select(
                 "time_variable",
                 choices=df.columns.tolist(),
                 selected=df.columns[0] if len(df.columns) > 0 else None
             )
-            numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+            numeric_cols = schema['numeric_cols']
             session.ui.update_select(
                 "target_variable",
                 choices=numeric_cols,
                 selected=numeric_cols[0] if len(numeric_cols) > 0 else None
             )
+            session.ui.update_selectize("hierarchy_levels", choices=schema['category_cols'], selected=[])
 
 def render_uploaded_data(output, data):
     from shiny import render
     @output
+    @instrumented_renderer("render", output="uploaded_data")
     @render.data_frame
     def uploaded_data():
         if data.get() is not None:
             return data.get()
         return pd.DataFrame()
 
+def render_memory_report(output, data):
+    from shiny import render
+    @output
+    @instrumented_renderer("render", output="memory_report")
+    @render.table
+    def memory_usage():
+        if data.get() is None:
+            return pd.DataFrame({'Note': ['Upload data to see its memory usage']})
+        return shared_artefact(data.get(), "memory_report", memory_report)
+
+def read_uploaded_file(file_path):
+    """Parse an uploaded CSV file."""
+    return pd.read_csv(file_path)
+
+def placeholder_figure(message):
+    """Figure showing only a centred message."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.text(0.5, 0.5, message, ha='center', va='center', transform=ax.transAxes)
+    return fig
+
+def target_outliers(df):
+    """Hampel outlier flags of the target column, or None if the target is not numeric."""
+    schema = frame_schema(df)
+    target_col = schema['target_var']
+    if target_col not in schema['numeric_cols']:
+        return None
+    return flag_outliers(df, [target_col])[target_col].to_numpy()
+
+def build_data_viz(df, outliers=None):
+    """
+    Line plot of the target column over the time column, with a linear trend
+    and, when ``outliers`` (a boolean array) is given, the flagged points marked.
+    """
+    schema = frame_schema(df)
+    target_col = schema['target_var']
+    if target_col not in schema['numeric_cols']:
+        return placeholder_figure("No numeric columns found for visualization")
+    fig, ax = plt.subplots(figsize=(10, 6))
+    if schema['time_kind'] != "other":
+        x = df[schema['time_var']]
+        ax.set_xlabel(schema['time_var'])
+    else:
+        x = pd.RangeIndex(len(df))
+        ax.set_xlabel('Index')
+    ax.plot(x, df[target_col], marker='o', linestyle='-', alpha=0.7)
+    if outliers is not None and outliers.any():
+        ax.scatter(np.asarray(x)[outliers], df[target_col].to_numpy()[outliers], color='red', marker='x',
+                   s=60, zorder=3, label=f'Outliers ({int(outliers.sum())})')
+        ax.legend()
+    ax.set_ylabel(target_col)
+    ax.set_title(f'Time Series Plot of {target_col}')
+    ax.grid(True, alpha=0.3)
+    try:
+        z = np.polyfit(range(len(df)), df[target_col], 1)
+        p = np.poly1d(z)
+        ax.plot(x, p(range(len(df))), "r--", alpha=0.7, label='Trend')
+        ax.legend()
+    except:
+        pass
+    plt.tight_layout()
+    return fig
+
+def compute_summary_stats(df):
+    """Descriptive statistics, skew and kurtosis of the numeric columns, or None if there are none."""
+    numeric_df = df[frame_schema(df)['numeric_cols']]
+    if numeric_df.empty:
+        return None
+    stats = numeric_df.describe().T
+    stats['skew'] = numeric_df.skew()
+    stats['kurtosis'] = numeric_df.kurtosis()
+    stats = stats.round(2)
+    stats = stats.reset_index().rename(columns={'index': 'variable'})
+    return stats
+
+def dataset_summary_stats(df):
+    """Summary statistics of the whole dataset, pushed down to DuckDB for out-of-core data."""
+    lazy = lazy_dataset(df)
+    return lazy.summary_stats() if lazy is not None else compute_summary_stats(df)
+
+def build_stats_viz(df, plot_type):
+    """Boxplot, violin plot or per-column histograms of the numeric columns."""
+    numeric_df = df[frame_schema(df)['numeric_cols']]
+    if numeric_df.empty:
+        return placeholder_figure("No numeric columns found for visualization")
+    fig, ax = plt.subplots(figsize=(10, 6))
+    if plot_type == "Boxplot":
+        sns.boxplot(data=numeric_df, ax=ax)
+        ax.set_title("Boxplot of Numeric Variables")
+        ax.set_xlabel("Variables")
+        ax.set_ylabel("Values")
+        plt.xticks(rotation=45)
+    elif plot_type == "Violin Plot":
+        sns.violinplot(data=numeric_df, ax=ax)
+        ax.set_title("Violin Plot of Numeric Variables")
+        ax.set_xlabel("Variables")
+        ax.set_ylabel("Values")
+        plt.xticks(rotation=45)
+    elif plot_type == "Histogram":
+        plt.close(fig)
+        n_cols = len(numeric_df.columns)
+        n_rows = (n_cols + 1) // 2
+        fig, axes = plt.subplots(n_rows, min(n_cols, 2), figsize=(12, 3*n_rows))
+        axes = axes.flatten() if n_cols > 1 else [axes]
+        for i, col in enumerate(numeric_df.columns):
+            if i < len(axes):
+                sns.histplot(numeric_df[col], kde=True, ax=axes[i])
+                axes[i].set_title(f"Histogram of {col}")
+        for j in range(i + 1, len(axes)):
+            axes[j].set_visible(False)
+    plt.tight_layout()
+    return fig
+
+def data_viz_source(df, with_outliers=False):
+    """
+    Frame shown by the data plot (the DuckDB overview for out-of-core data) and
+    its outlier flags when requested (shared across sessions for stored datasets).
+    """
+    lazy = lazy_dataset(df)
+    if lazy is not None:
+        source = lazy.overview()
+        return source, target_outliers(source) if with_outliers else None
+    return df, shared_artefact(df, "outliers", target_outliers) if with_outliers else None
+
 def render_data_viz(output, data, input):
     from shiny import render
     @output
+    @instrumented_renderer("render", output="data_viz")
     @render.plot
     def data_viz():
         if data.get() is None:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.text(0.5, 0.5, "Upload data to see visualization", ha='center', va='center', transform=ax.transAxes)
-            return fig
-        df = data.get()
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        if len(numeric_cols) > 0:
-            target_col = numeric_cols[0]
-            fig, ax = plt.subplots(figsize=(10, 6))
-            date_cols = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
-            if date_cols:
-                date_col = date_cols[0]
-                if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-                    df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-                ax.plot(df[date_col], df[target_col], marker='o', linestyle='-', alpha=0.7)
-                ax.set_xlabel(date_col)
-            else:
-                ax.plot(df.index, df[target_col], marker='o', linestyle='-', alpha=0.7)
-                ax.set_xlabel('Index')
-            ax.set_ylabel(target_col)
-            ax.set_title(f'Time Series Plot of {target_col}')
-            ax.grid(True, alpha=0.3)
-            try:
-                import numpy as np
-                z = np.polyfit(range(len(df)), df[target_col], 1)
-                p = np.poly1d(z)
-                ax.plot(range(len(df)), p(range(len(df))), "r--", alpha=0.7, label='Trend')
-                ax.legend()
-            except:
-                pass
-            plt.tight_layout()
-            return fig
-        else:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.text(0.5, 0.5, "No numeric columns found for visualization", ha='center', va='center', transform=ax.transAxes)
-            return fig
+            return placeholder_figure("Upload data to see visualization")
+        source, outliers = data_viz_source(data.get(), input.flag_outliers())
+        return build_data_viz(source, outliers)
 
 def render_summary_stats(output, data):
     from shiny import render
     @output
+    @instrumented_renderer("render", output="summary_stats")
     @render.table
     def summary_stats():
         if data.get() is None:
             return pd.DataFrame({'Note': ['Upload data to see summary statistics']})
-        df = data.get()
-        numeric_df = df.select_dtypes(include=['number'])
-        if numeric_df.empty:
+        stats = shared_artefact(data.get(), "summary_stats", dataset_summary_stats)
+        if stats is None:
             return pd.DataFrame({'Note': ['No numeric columns found in the data']})
-        stats = numeric_df.describe().T
-        stats['skew'] = numeric_df.skew()
-        stats['kurtosis'] = numeric_df.kurtosis()
-        stats = stats.round(2)
-        stats = stats.reset_index().rename(columns={'index': 'variable'})
         return stats
 
 def render_stats_viz(output, data, input):
     from shiny import render
     @output
+    @instrumented_renderer("render", output="stats_viz")
     @render.plot
     def stats_viz():
         if data.get() is None:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.text(0.5, 0.5, "Upload data to see visualization", ha='center', va='center', transform=ax.transAxes)
-            return fig
-        df = data.get()
-        numeric_df = df.select_dtypes(include=['number'])
-        if numeric_df.empty:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.text(0.5, 0.5, "No numeric columns found for visualization", ha='center', va='center', transform=ax.transAxes)
-            return fig
-        plot_type = input.plot_type()
-        fig, ax = plt.subplots(figsize=(10, 6))
-        if plot_type == "Boxplot":
-            sns.boxplot(data=numeric_df, ax=ax)
-            ax.set_title("Boxplot of Numeric Variables")
-            ax.set_xlabel("Variables")
-            ax.set_ylabel("Values")
-            plt.xticks(rotation=45)
-        elif plot_type == "Violin Plot":
-            sns.violinplot(data=numeric_df, ax=ax)
-            ax.set_title("Violin Plot of Numeric Variables")
-            ax.set_xlabel("Variables")
-            ax.set_ylabel("Values")
-            plt.xticks(rotation=45)
-        elif plot_type == "Histogram":
-            plt.close(fig)
-            n_cols = len(numeric_df.columns)
-            n_rows = (n_cols + 1) // 2
-            fig, axes = plt.subplots(n_rows, min(n_cols, 2), figsize=(12, 3*n_rows))
-            axes = axes.flatten() if n_cols > 1 else [axes]
-            for i, col in enumerate(numeric_df.columns):
-                if i < len(axes):
-                    sns.histplot(numeric_df[col], kde=True, ax=axes[i])
-                    axes[i].set_title(f"Histogram of {col}")
-            for j in range(i + 1, len(axes)):
-                axes[j].set_visible(False)
-        plt.tight_layout()
-        return fig
+            return placeholder_figure("Upload data to see visualization")
+        return build_stats_viz(data.get(), input.plot_type())
 
 def render_download_summary_stats(output, data):
     from shiny import render
     @output
-    @render.download(filename="summary_statistics.csv")
+    @render.download(filename="summary_statistics.csv", media_type="text/csv")
     def download_summary_stats():
+        # A returned string would be taken as a file path, so messages are yielded
         if data.get() is None:
-            return "No data available"
-        df = data.get()
-        numeric_df = df.select_dtypes(include=['number'])
-        if numeric_df.empty:
-            return "No numeric data available"
-        stats = numeric_df.describe().T
-        stats['skew'] = numeric_df.skew()
-        stats['kurtosis'] = numeric_df.kurtosis()
-        stats = stats.round(2)
-        stats = stats.reset_index().rename(columns={'index': 'variable'})
-        return stats.to_csv(index=False)
+            return iter([b"No data available"])
+        stats = shared_artefact(data.get(), "summary_stats", dataset_summary_stats)
+        if stats is None:
+            return iter([b"No numeric data available"])
+        return export_stream(stats, "csv")
 
 def render_download_template(output):
     from shiny import render
     @output
-    @render.download(filename="sample_data.csv")
+    @render.download(filename="sample_data.csv", media_type="text/csv")
     def download_template():
-        sample_data = pd.read_csv("timeseries_demo.csv")
-        buffer = StringIO()
-        sample_data.to_csv(buffer, index=False)
-        buffer.seek(0)
-        yield buffer.getvalue()
+        # Served as-is from disk
+        return TEMPLATE_PATH
@@ -0,0 +1,57 @@
+"""
+Export download handling for the AI Forecasting Application.
+Downloads of the dataset, the current forecast and its backtest stream
+chunk by chunk in the format chosen next to the buttons.
+"""
+from server_scripts.exports import (
+    EXPORT_MEDIA_TYPES, backtest_frame, dataset_export, export_filename, export_stream, forecast_frame
+)
+from server_scripts.instrumentation import timed
+
+def timed_stream(chunks, **labels):
+    """Pass chunks through, timing the whole stream as one "export" operation."""
+    with timed("export", **labels):
+        yield from chunks
+
+def handle_exports(input, output, data, fitted_model, forecast_result):
+    from shiny import render
+
+    # Handlers return a generator of chunks, or a file path that Shiny sends as-is
+    @output
+    @render.download(
+        filename=lambda: export_filename("dataset", input.dataset_export_format()),
+        media_type=lambda: EXPORT_MEDIA_TYPES[input.dataset_export_format()],
+    )
+    def download_dataset():
+        df = data.get()
+        if df is None:
+            return iter([b"No data available"])
+        export = dataset_export(df, input.dataset_export_format())
+        if isinstance(export, str):
+            return export
+        return timed_stream(export, output="dataset")
+
+    @output
+    @render.download(
+        filename=lambda: export_filename("forecast", input.forecast_export_format()),
+        media_type=lambda: EXPORT_MEDIA_TYPES[input.forecast_export_format()],
+    )
+    def download_forecast():
+        result = forecast_result()
+        if result is None:
+            return iter([b"Run a forecast first"])
+        return timed_stream(export_stream(forecast_frame(result), input.forecast_export_format()),
+                            output="forecast")
+
+    @output
+    @render.download(
+        filename=lambda: export_filename("backtest", input.forecast_export_format()),
+        media_type=lambda: EXPORT_MEDIA_TYPES[input.forecast_export_format()],
+    )
+    def download_backtest():
+        fitted = fitted_model.get()
+        result = forecast_result()
+        if fitted is None or result is None:
+            return iter([b"Run a forecast first"])
+        frame = backtest_frame(fitted, result['horizon'])
+        return timed_stream(export_stream(frame, input.forecast_export_format()), output="backtest")
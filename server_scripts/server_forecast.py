@@ -2,78 +2,450 @@
 Forecasting model logic for the AI Forecasting Application.
 Contains Prophet and ARIMA forecast functions.
 """
+from statistics import NormalDist
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from prophet import Prophet
 from statsmodels.tsa.arima.model import ARIMA
-from server_scripts.global_helpers import calculate_metrics
-
-def run_prophet_forecast(ts_data, time_var, target_var, horizon, output):
-    prophet_df = ts_data.rename(columns={time_var: 'ds', target_var: 'y'})
-    if not pd.api.types.is_datetime64_any_dtype(prophet_df['ds']):
-        prophet_df['ds'] = pd.to_datetime(prophet_df['ds'])
-    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
-    model.fit(prophet_df)
-    future = model.make_future_dataframe(periods=horizon, freq='D')
-    forecast = model.predict(future)
-    @output
-    @output.plot
-    def forecast_plot():
-        fig, ax = plt.subplots(figsize=(10, 6))
-        plt.style.use('seaborn-v0_8-whitegrid')
-        ax.plot(prophet_df['ds'], prophet_df['y'], 'b-', linewidth=2, alpha=0.8, label='Actual')
-        ax.plot(forecast['ds'].tail(horizon), forecast['yhat'].tail(horizon), 'r-', linewidth=2, alpha=0.8, label='Forecast')
-        ax.fill_between(
-            forecast['ds'].tail(horizon+10),
-            forecast['yhat_lower'].tail(horizon+10),
-            forecast['yhat_upper'].tail(horizon+10),
-            color='red', alpha=0.2, label='95% Confidence Interval')
-        ax.set_title(f'Prophet Forecast for {target_var} (Next {horizon} periods)', fontsize=14)
-        ax.set_xlabel('Time', fontsize=12)
-        ax.set_ylabel(target_var, fontsize=12)
-        ax.legend(fontsize=10)
-        ax.grid(True, alpha=0.3)
-        plt.tight_layout()
-        return fig
-    actual = prophet_df['y'].values
-    predicted = forecast['yhat'][:len(actual)].values
-    metrics_df = calculate_metrics(actual, predicted)
-    @output
-    @output.table
-    def forecast_metrics():
-        return metrics_df
-
-def run_arima_forecast(ts_data, time_var, target_var, horizon, output):
-    ts_values = ts_data[target_var].values
-    model = ARIMA(ts_values, order=(1, 1, 1))
-    model_fit = model.fit()
-    forecast_values = model_fit.forecast(steps=horizon)
-    @output
-    @output.plot
-    def forecast_plot():
-        fig, ax = plt.subplots(figsize=(10, 6))
-        plt.style.use('seaborn-v0_8-whitegrid')
+from server_scripts.global_helpers import LRUCache, calculate_metrics, dataset_fingerprint
+from server_scripts.preprocessing import infer_frequency
+from server_scripts.job_queue import register_handler
+from server_scripts.model_store import load_model, popular_models, save_model
+from server_scripts.ensemble import ENSEMBLE_MAX_HORIZON, fit_ensemble, ensemble_contributions
+from server_scripts.conformal import (
+    MIN_TRAIN_SIZE, backtest_origins, conformal_interval, conformal_quantiles, values_key
+)
+
+# ===== PROPHET SETTINGS =====
+INTERVAL_WIDTH = 0.95
+DEFAULT_UNCERTAINTY_SAMPLES = 1000
+FAST_UNCERTAINTY_SAMPLES = 200
+# Rows before the forecast start that also get an interval band in the plot
+BAND_HISTORY_ROWS = 10
+
+# ===== ARIMA SETTINGS =====
+ARIMA_ORDER = (1, 1, 1)
+# Incremental updates allowed before the parameters are re-estimated from scratch
+ARIMA_REFIT_EVERY = 30
+
+# Series whose warm-start state is kept per model, least recently used evicted first
+WARM_START_ENTRIES = 256
+# Leading values that, with the first timestamp, identify a series in series_key()
+SERIES_KEY_ROWS = 8
+
+# Fitted Stan parameters of the last Prophet fit, keyed by series_key()
+_prophet_params = LRUCache(maxsize=WARM_START_ENTRIES, name="prophet_warm_start")
+# Last ARIMA results per series_key(): {'results', 'values', 'updates'}
+_arima_state = LRUCache(maxsize=WARM_START_ENTRIES, name="arima_state")
+# Results of fit_forecast_model per series fingerprint: {fit options: fitted}.
+# Shared between server processes, so a series fitted by one worker is reused by the others.
+_fitted_models = LRUCache(maxsize=16, name="fitted_models", shared=True)
+
+def series_key(ts_data, time_var, target_var):
+    """
+    Identify a series by its columns, first timestamp and first values, so
+    appended rows keep the same key while different series starting on the
+    same date do not share one.
+    """
+    first = ts_data[time_var].iloc[0] if len(ts_data) > 0 else None
+    head = values_key(ts_data[target_var].values[:SERIES_KEY_ROWS])
+    return (time_var, target_var, str(first), head)
+
+def fitted_key(ts_data, time_var, target_var):
+    """Identify a series by the content of its time and target columns."""
+    return (time_var, target_var, dataset_fingerprint(ts_data[[time_var, target_var]]))
+
+def prophet_warm_start(model):
+    """Return the fitted parameters of a Prophet model in the form expected by ``fit(init=...)``."""
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        params[name] = model.params[name][0][0]
+    for name in ['delta', 'beta']:
+        params[name] = model.params[name][0]
+    return params
+
+def fit_prophet_model(prophet_df, key=None, uncertainty_samples=DEFAULT_UNCERTAINTY_SAMPLES):
+    """
+    Fit a Prophet model, warm-starting from the previous fit of the same series if available.
+
+    Falls back to a cold start when the cached parameters no longer match the model
+    (e.g. a different number of changepoints after the history grew).
+    """
+    def new_model():
+        return Prophet(
+            yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False,
+            interval_width=INTERVAL_WIDTH, uncertainty_samples=uncertainty_samples
+        )
+    init = _prophet_params.get(key) if key is not None else None
+    model = new_model()
+    if init is not None:
+        try:
+            model.fit(prophet_df, init=init)
+        except Exception:
+            model = new_model()
+            model.fit(prophet_df)
+    else:
+        model.fit(prophet_df)
+    if key is not None:
+        _prophet_params.set(key, prophet_warm_start(model))
+    return model
+
+def prophet_analytic_intervals(model, frame, residual_std, interval_width=INTERVAL_WIDTH):
+    """
+    Gaussian prediction intervals for the rows of ``frame`` without Monte Carlo sampling.
+
+    Combines the in-sample residual spread with the variance of future trend changes
+    implied by the fitted changepoints (Laplace-distributed slope changes arriving at
+    the historical changepoint rate), so the band widens with distance from the history.
+    """
+    z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+    t = model.setup_dataframe(frame[['ds']].copy())['t'].to_numpy()
+    dt = np.clip(t - 1.0, 0.0, None)
+    scale = np.mean(np.abs(model.params['delta'])) + 1e-8
+    rate = len(model.changepoints_t)
+    trend_std = scale * np.sqrt(2.0 * rate / 3.0) * dt ** 1.5 * model.y_scale
+    half_width = z * np.sqrt(residual_std ** 2 + trend_std ** 2)
+    return half_width
+
+def predict_prophet(model, frame, residual_std, uncertainty_samples=DEFAULT_UNCERTAINTY_SAMPLES,
+                    interval_method="sampling"):
+    """
+    Point forecasts and interval bounds for the rows of ``frame``.
+
+    The uncertainty simulation is what dominates ``Prophet.predict``, so callers pass
+    only the rows that are plotted. With ``interval_method="analytic"`` the simulation
+    is skipped entirely and the band comes from ``prophet_analytic_intervals``.
+    """
+    if interval_method == "analytic" or not uncertainty_samples:
+        model.uncertainty_samples = 0
+        forecast = model.predict(frame)
+        if interval_method == "analytic":
+            half_width = prophet_analytic_intervals(model, frame, residual_std)
+            forecast['yhat_lower'] = forecast['yhat'] - half_width
+            forecast['yhat_upper'] = forecast['yhat'] + half_width
+        else:
+            forecast['yhat_lower'] = np.nan
+            forecast['yhat_upper'] = np.nan
+    else:
+        model.uncertainty_samples = uncertainty_samples
+        forecast = model.predict(frame)
+    model.uncertainty_samples = uncertainty_samples
+    return forecast
+
+def fit_arima_model(ts_values, key=None, refit_every=ARIMA_REFIT_EVERY):
+    """
+    Fit an ARIMA model, or update the cached fit of the same series incrementally.
+
+    When the new values extend the previously fitted values, the state-space filter
+    is run over the appended observations only (``results.append(refit=False)``),
+    keeping the estimated parameters. A full re-estimation happens when the history
+    changed, or after ``refit_every`` incremental updates.
+    """
+    values = np.asarray(ts_values, dtype=float)
+    state = _arima_state.get(key) if key is not None else None
+    if state is not None:
+        previous = state['values']
+        n_prev = len(previous)
+        if len(values) == n_prev and np.array_equal(values, previous):
+            return state['results']
+        if (len(values) > n_prev and state['updates'] < refit_every
+                and np.array_equal(values[:n_prev], previous)):
+            results = state['results'].append(values[n_prev:], refit=False)
+            _arima_state.set(key, {'results': results, 'values': values, 'updates': state['updates'] + 1})
+            return results
+    results = ARIMA(values, order=ARIMA_ORDER).fit()
+    if key is not None:
+        _arima_state.set(key, {'results': results, 'values': values, 'updates': 0})
+    return results
+
+def arima_backtest_forecasts(model_fit, origins, horizon):
+    """
+    Rolling-origin forecasts of a fitted ARIMA model, read off its filter output.
+
+    The predicted state at each origin only depends on the observations before
+    it, so running the state-space recursion forward from there gives the same
+    forecasts as ``model_fit.apply(values[:origin]).forecast(horizon)`` with the
+    fitted parameters, without a new fit or a filter run per window.
+
+    Returns:
+        numpy.ndarray: Point forecasts, shape (n_origins, horizon)
+    """
+    ssm = model_fit.model.ssm
+    design, transition = ssm['design'], ssm['transition']
+    obs_intercept, state_intercept = ssm['obs_intercept'], ssm['state_intercept']
+    # ARIMA system matrices are time-invariant: use their first (only) period
+    design = design[..., 0] if design.ndim == 3 else design
+    transition = transition[..., 0] if transition.ndim == 3 else transition
+    obs_intercept = obs_intercept[..., 0] if obs_intercept.ndim == 2 else obs_intercept
+    state_intercept = state_intercept[..., 0] if state_intercept.ndim == 2 else state_intercept
+    states = np.asarray(model_fit.predicted_state)[:, origins]
+    forecasts = np.empty((len(origins), horizon))
+    for step in range(horizon):
+        forecasts[:, step] = (design @ states)[0] + obs_intercept[0]
+        states = transition @ states + state_intercept[:, None]
+    return forecasts
+
+def arima_half_widths(model_fit, ts_values, horizon):
+    """
+    Conformal half-widths of a fitted ARIMA model for up to ``horizon`` steps.
+
+    The horizon is capped at the longest one the series can be backtested
+    for; returns None when it is too short for any backtest.
+    """
+    values = np.asarray(ts_values, dtype=float)
+    horizon = min(horizon, len(values) - MIN_TRAIN_SIZE)
+    origins = backtest_origins(len(values), horizon) if horizon >= 1 else []
+    if len(origins) == 0:
+        return None
+    actual = values[origins[:, None] + np.arange(horizon)]
+    return conformal_quantiles(np.abs(actual - arima_backtest_forecasts(model_fit, origins, horizon)))
+
+def refresh_models(series, time_var, target_var, model_type="auto_arima", **options):
+    """
+    Bring the cached fits of many series up to date with their latest observations.
+
+    Each series goes through ``fit_forecast_model``, so the refreshed fits land in
+    the same caches, warm-start state and model store that later forecasts of
+    the series read. ARIMA fits of series that only gained rows are updated
+    incrementally; Prophet fits warm-start from the previous parameters.
+
+    Args:
+        series (dict): Mapping of series name to a DataFrame with ``time_var`` and ``target_var``
+        time_var (str): Time column name
+        target_var (str): Target column name
+        model_type (str): "auto_arima" or "prophet"
+        **options: Further keyword arguments of ``fit_forecast_model``
+
+    Returns:
+        dict: Mapping of series name to the result of ``fit_forecast_model``
+    """
+    return {
+        name: fit_forecast_model(ts_data.sort_values(by=time_var), time_var, target_var, model_type, **options)
+        for name, ts_data in series.items()
+    }
+
+# ===== FIT / PREDICT =====
+def fit_forecast_model(ts_data, time_var, target_var, model_type, fast_mode=False,
+                       uncertainty_samples=FAST_UNCERTAINTY_SAMPLES, interval_method="sampling",
+                       freq=None, members=None, max_horizon=ENSEMBLE_MAX_HORIZON, use_cache=True):
+    """
+    Fit a forecast model once, independently of the forecast horizon.
+
+    Returns a dict holding the fitted model, the history it was fitted on, the
+    in-sample metrics and the prediction options, to be passed to ``predict_forecast``.
+    The forecast frequency is inferred from the time column unless ``freq`` is given.
+    For the ensemble, member forecasts are produced up to ``max_horizon`` at fit
+    time, and for ARIMA the conformal residuals, so predicting never fits again.
+    Fits are cached per series content and options, across server processes when
+    several run (see serve.py), and persisted in the model store across restarts.
+    With ``use_cache=False`` the fit starts cold and bypasses all of these caches
+    (and warm starts) without reading or changing them, e.g. to profile a full fit.
+    """
+    if not use_cache:
+        return _fit_forecast_model(ts_data, time_var, target_var, model_type, fast_mode,
+                                   uncertainty_samples, interval_method, freq, members, max_horizon,
+                                   use_cache=False)
+    series = fitted_key(ts_data, time_var, target_var)
+    options = (model_type, fast_mode, uncertainty_samples, interval_method, freq,
+               tuple(members) if members is not None else None, max_horizon)
+    fits = _fitted_models.get(series) or {}
+    if options in fits:
+        return fits[options]
+    fitted = load_model(series, options)
+    if fitted is not None:
+        seed_warm_start(fitted)
+    else:
+        fitted = _fit_forecast_model(ts_data, time_var, target_var, model_type, fast_mode,
+                                     uncertainty_samples, interval_method, freq, members, max_horizon)
+        save_model(series, options, fitted)
+    _fitted_models.set(series, {**fits, options: fitted})
+    return fitted
+
+def seed_warm_start(fitted):
+    """Let later fits of a series with appended rows start from a fit loaded from the model store."""
+    ts_data, time_var, target_var = fitted['ts_data'], fitted['time_var'], fitted['target_var']
+    key = series_key(ts_data, time_var, target_var)
+    if fitted['model_type'] == "prophet":
+        if key not in _prophet_params:
+            _prophet_params.set(key, prophet_warm_start(fitted['model']))
+    elif fitted['model_type'] != "ensemble" and key not in _arima_state:
+        values = np.asarray(ts_data[target_var].values, dtype=float)
+        _arima_state.set(key, {'results': fitted['model'], 'values': values, 'updates': 0})
+
+def preload_models():
+    """Load the most used stored fits into memory; run once in the background after startup."""
+    for series, options, fitted in popular_models():
+        fits = _fitted_models.get(series) or {}
+        if options not in fits:
+            seed_warm_start(fitted)
+            _fitted_models.set(series, {**fits, options: fitted})
+
+def _fit_forecast_model(ts_data, time_var, target_var, model_type, fast_mode, uncertainty_samples,
+                        interval_method, freq, members, max_horizon, use_cache=True):
+    # Without a key the ARIMA and Prophet fits neither use nor update warm-start state
+    key = series_key(ts_data, time_var, target_var) if use_cache else None
+    if freq is None and pd.api.types.is_datetime64_any_dtype(ts_data[time_var]):
+        freq = infer_frequency(ts_data[time_var])
+    fitted = {
+        'model_type': model_type,
+        'time_var': time_var,
+        'target_var': target_var,
+        'ts_data': ts_data,
+        'freq': freq,
+    }
+    if model_type == "prophet":
+        prophet_df = ts_data.rename(columns={time_var: 'ds', target_var: 'y'})
+        if not pd.api.types.is_datetime64_any_dtype(prophet_df['ds']):
+            prophet_df['ds'] = pd.to_datetime(prophet_df['ds'])
+            if fitted['freq'] is None:
+                fitted['freq'] = infer_frequency(prophet_df['ds'])
+        if not fast_mode:
+            uncertainty_samples = DEFAULT_UNCERTAINTY_SAMPLES
+            interval_method = "sampling"
+        model = fit_prophet_model(prophet_df, key, uncertainty_samples=uncertainty_samples)
+        # In-sample point predictions never need the uncertainty simulation
+        model.uncertainty_samples = 0
+        in_sample = model.predict(prophet_df[['ds']])['yhat'].to_numpy()
+        model.uncertainty_samples = uncertainty_samples
+        actual = prophet_df['y'].to_numpy()
+        fitted.update({
+            'model': model,
+            'history': prophet_df,
+            'residual_std': float(np.nanstd(actual - in_sample)),
+            'uncertainty_samples': uncertainty_samples,
+            'interval_method': interval_method,
+            'metrics': calculate_metrics(actual, in_sample),
+        })
+    elif model_type == "ensemble":
+        ts_values = ts_data[target_var].values
+        ensemble = fit_ensemble(
+            ts_values, members=members, horizon=max_horizon,
+            dates=ts_data[time_var], freq=fitted['freq']
+        )
+        fitted.update({
+            'model': ensemble,
+            'metrics': calculate_metrics(
+                ensemble['holdout_actual'], ensemble['holdout_combined'],
+                insample=ts_values[:-len(ensemble['holdout_actual'])]
+            ),
+        })
+    else:
+        ts_values = ts_data[target_var].values
+        model_fit = fit_arima_model(ts_values, key)
+        # The first fitted value of a differenced model carries no information
+        predicted = np.asarray(model_fit.fittedvalues)[1:]
+        actual = ts_values[1:]
+        fitted.update({
+            'model': model_fit,
+            'values_key': values_key(ts_values),
+            'half_widths': arima_half_widths(model_fit, ts_values, max_horizon),
+            'metrics': calculate_metrics(actual, predicted),
+        })
+    return fitted
+
+def predict_forecast(fitted, horizon):
+    """
+    Forecast ``horizon`` periods ahead from a result of ``fit_forecast_model``.
+
+    Returns a dict with the actual and forecast series, the interval band (if the
+    model provides one) and the metrics table, ready for ``plot_forecast``.
+    """
+    ts_data = fitted['ts_data']
+    time_var = fitted['time_var']
+    target_var = fitted['target_var']
+    result = {
+        'model_type': fitted['model_type'],
+        'target_var': target_var,
+        'horizon': horizon,
+        'metrics': fitted['metrics'],
+        'x_band': None,
+        'lower': None,
+        'upper': None,
+    }
+    if fitted['model_type'] == "prophet":
+        model = fitted['model']
+        history = fitted['history']
+        future = model.make_future_dataframe(periods=horizon, freq=fitted['freq'] or 'D', include_history=False)
+        frame = pd.concat([history[['ds']].tail(BAND_HISTORY_ROWS), future], ignore_index=True)
+        forecast = predict_prophet(
+            model, frame, fitted['residual_std'],
+            fitted['uncertainty_samples'], fitted['interval_method']
+        )
+        result.update({
+            'label': 'Prophet',
+            'x_actual': history['ds'],
+            'y_actual': history['y'].to_numpy(),
+            'x_forecast': forecast['ds'].tail(horizon),
+            'y_forecast': forecast['yhat'].tail(horizon).to_numpy(),
+            'x_band': forecast['ds'],
+            'lower': forecast['yhat_lower'].to_numpy(),
+            'upper': forecast['yhat_upper'].to_numpy(),
+        })
+    else:
+        ts_values = ts_data[target_var].values
+        if fitted['model_type'] == "ensemble":
+            ensemble = fitted['model']
+            horizon = min(horizon, ensemble['forecasts'].shape[1])
+            forecast_values = ensemble['combined'][:horizon]
+            result['horizon'] = horizon
+            result['contributions'] = ensemble_contributions(ensemble, horizon)
+        else:
+            forecast_values = np.asarray(fitted['model'].forecast(steps=horizon))
         if pd.api.types.is_datetime64_any_dtype(ts_data[time_var]):
             x_actual = ts_data[time_var]
-            last_date = x_actual.iloc[-1]
-            date_range = pd.date_range(start=last_date, periods=horizon+1)[1:]
-            x_forecast = date_range
-            ax.plot(x_actual, ts_values, 'b-', linewidth=2, alpha=0.8, label='Actual')
-            ax.plot(x_forecast, forecast_values, 'r-', linewidth=2, alpha=0.8, label='Forecast')
+            x_forecast = pd.date_range(start=x_actual.iloc[-1], periods=horizon+1, freq=fitted['freq'] or 'D')[1:]
         else:
-            ax.plot(range(len(ts_values)), ts_values, 'b-', linewidth=2, alpha=0.8, label='Actual')
-            ax.plot(range(len(ts_values), len(ts_values) + horizon), forecast_values, 'r-', linewidth=2, alpha=0.8, label='Forecast')
-        ax.set_title(f'ARIMA Forecast for {target_var} (Next {horizon} periods)', fontsize=14)
-        ax.set_xlabel('Time', fontsize=12)
-        ax.set_ylabel(target_var, fontsize=12)
-        ax.legend(fontsize=10)
-        ax.grid(True, alpha=0.3)
-        plt.tight_layout()
-        return fig
-    predicted = model_fit.fittedvalues
-    actual = ts_values[1:len(predicted)+1]
-    metrics_df = calculate_metrics(actual, predicted)
-    @output
-    @output.table
-    def forecast_metrics():
-        return metrics_df
+            x_actual = np.arange(len(ts_values))
+            x_forecast = np.arange(len(ts_values), len(ts_values) + horizon)
+        result.update({
+            'label': 'Ensemble' if fitted['model_type'] == "ensemble" else 'ARIMA',
+            'x_actual': x_actual,
+            'y_actual': ts_values,
+            'x_forecast': x_forecast,
+            'y_forecast': forecast_values,
+        })
+        if fitted['model_type'] == "ensemble":
+            return result
+        # Half-widths were computed at fit time up to max_horizon; later steps get no band
+        half_widths = fitted['half_widths']
+        if half_widths is not None:
+            lower, upper = conformal_interval(forecast_values, half_widths)
+            result.update({'x_band': x_forecast, 'lower': lower, 'upper': upper})
+    return result
+
+def plot_forecast(result):
+    """Plot the actual series, the forecast and its interval band."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plt.style.use('seaborn-v0_8-whitegrid')
+    ax.plot(result['x_actual'], result['y_actual'], 'b-', linewidth=2, alpha=0.8, label='Actual')
+    ax.plot(result['x_forecast'], result['y_forecast'], 'r-', linewidth=2, alpha=0.8, label='Forecast')
+    if result['x_band'] is not None and not np.all(np.isnan(result['lower'])):
+        ax.fill_between(
+            result['x_band'], result['lower'], result['upper'],
+            color='red', alpha=0.2, label=f'{INTERVAL_WIDTH:.0%} Prediction Interval')
+    ax.set_title(f"{result['label']} Forecast for {result['target_var']} (Next {result['horizon']} periods)", fontsize=14)
+    ax.set_xlabel('Time', fontsize=12)
+    ax.set_ylabel(result['target_var'], fontsize=12)
+    ax.legend(fontsize=10)
+    ax.grid(True, alpha=0.3)
+    plt.tight_layout()
+    return fig
+
+def run_prophet_forecast(ts_data, time_var, target_var, horizon, fast_mode=False,
+                         uncertainty_samples=FAST_UNCERTAINTY_SAMPLES, interval_method="sampling", use_cache=True):
+    """Fit Prophet and forecast ``horizon`` periods in one call."""
+    fitted = fit_forecast_model(
+        ts_data, time_var, target_var, "prophet", fast_mode=fast_mode,
+        uncertainty_samples=uncertainty_samples, interval_method=interval_method, use_cache=use_cache
+    )
+    return predict_forecast(fitted, horizon)
+
+def run_arima_forecast(ts_data, time_var, target_var, horizon, use_cache=True):
+    """Fit ARIMA and forecast ``horizon`` periods in one call."""
+    fitted = fit_forecast_model(ts_data, time_var, target_var, "auto_arima", use_cache=use_cache)
+    return predict_forecast(fitted, horizon)
+
+# ===== BACKGROUND JOBS =====
+# Fitted models are returned by the job so the UI can still change the horizon without refitting
+register_handler("fit_forecast", lambda payload: fit_forecast_model(**payload))
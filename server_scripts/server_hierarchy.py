@@ -0,0 +1,63 @@
+"""
+Hierarchical forecasting logic for the AI Forecasting Application.
+Contains the run handler and renderers for coherent multi-level forecasts.
+"""
+import pandas as pd
+import matplotlib.pyplot as plt
+from server_scripts.schema import frame_schema
+from server_scripts.out_of_core import lazy_dataset
+from server_scripts.hierarchy import forecast_hierarchy, hierarchy_table
+
+def handle_hierarchy_forecast(input, output, data):
+    from shiny import reactive, render, ui
+    hierarchy_result = reactive.Value(None)
+
+    @reactive.effect
+    @reactive.event(input.run_hierarchy)
+    def _():
+        df = data.get()
+        levels = list(input.hierarchy_levels() or [])
+        if df is None or not levels:
+            ui.notification_show("Select at least one hierarchy level", type="warning")
+            return
+        schema = frame_schema(df)
+        time_var, target_var = schema['time_var'], schema['target_var']
+        lazy = lazy_dataset(df)
+        if lazy is not None:
+            frame = lazy.series(time_var, target_var, levels=levels)
+        else:
+            frame = df[[time_var, target_var] + levels]
+        result = forecast_hierarchy(
+            frame, time_var, target_var, levels, input.forecast_horizon(),
+            method=input.reconciliation_method(), base_model=input.hierarchy_base_model()
+        )
+        result['target_var'] = target_var
+        hierarchy_result.set(result)
+
+    @output
+    @render.plot
+    def hierarchy_plot():
+        result = hierarchy_result.get()
+        fig, ax = plt.subplots(figsize=(10, 6))
+        if result is None:
+            ax.text(0.5, 0.5, "Choose hierarchy levels and click 'Run Hierarchical Forecast'",
+                    ha='center', va='center', transform=ax.transAxes)
+            return fig
+        ax.plot(result['history_index'], result['history'][:, 0], 'b-', linewidth=2, alpha=0.8, label='Actual (Total)')
+        ax.plot(result['future_index'], result['base'][0], 'r--', linewidth=1.5, alpha=0.7, label='Base forecast')
+        ax.plot(result['future_index'], result['reconciled'][0], 'r-', linewidth=2, alpha=0.8, label='Reconciled forecast')
+        ax.set_title(f"Hierarchical Forecast for Total {result['target_var']}", fontsize=14)
+        ax.set_xlabel('Time', fontsize=12)
+        ax.set_ylabel(result['target_var'], fontsize=12)
+        ax.legend(fontsize=10)
+        ax.grid(True, alpha=0.3)
+        plt.tight_layout()
+        return fig
+
+    @output
+    @render.table
+    def hierarchy_forecast():
+        result = hierarchy_result.get()
+        if result is None:
+            return pd.DataFrame({'Note': ["Run a hierarchical forecast to see reconciled forecasts"]})
+        return hierarchy_table(result)
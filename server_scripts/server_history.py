@@ -0,0 +1,82 @@
+"""
+Run history handling for the AI Forecasting Application.
+Records every forecast of the session and renders the comparison of chosen
+runs from the stored results, without refitting.
+"""
+import pandas as pd
+import matplotlib.pyplot as plt
+from server_scripts.run_history import RunHistory, history_table, compare_metrics, plot_comparison
+
+def run_settings(fitted):
+    """Short description of the inputs a fit was made with."""
+    parts = [f"{len(fitted['ts_data'])} rows"]
+    if fitted.get('freq'):
+        parts.append(f"freq {fitted['freq']}")
+    if fitted['model_type'] == "ensemble":
+        parts.append("members " + ", ".join(fitted['model']['members']))
+    if fitted['model_type'] == "prophet" and fitted.get('interval_method') == "analytic":
+        parts.append("analytic intervals")
+    return "; ".join(parts)
+
+def handle_run_history(input, output, fitted_model, forecast_result):
+    from shiny import reactive, render, ui
+    history = RunHistory()
+    version = reactive.Value(0)
+
+    def refresh(selected=None):
+        choices = {run['id']: run['label'] for run in history.runs()}
+        if selected is None:
+            selected = [run_id for run_id in (input.compare_runs() or []) if run_id in choices]
+        ui.update_selectize("compare_runs", choices=choices, selected=selected)
+        version.set(version.get() + 1)
+
+    @reactive.effect
+    @reactive.event(fitted_model)
+    def _():
+        fitted = fitted_model.get()
+        if fitted is None:
+            return
+        # Only new fits are recorded; changing the horizon alone is not a new run
+        with reactive.isolate():
+            result = forecast_result()
+            selected = list(input.compare_runs() or [])
+        if result is not None:
+            run_id = history.add(result, run_settings(fitted))
+            refresh(selected[-1:] + [run_id])
+
+    @reactive.effect
+    @reactive.event(input.clear_history)
+    def _():
+        history.clear()
+        refresh([])
+
+    def selected_runs():
+        version.get()
+        return history.get(input.compare_runs() or [])
+
+    @output
+    @render.table
+    def run_history():
+        version.get()
+        runs = history.runs()
+        if not runs:
+            return pd.DataFrame({'Note': ["Run a forecast to start the history"]})
+        return history_table(runs)
+
+    @output
+    @render.plot
+    def compare_plot():
+        runs = selected_runs()
+        if runs:
+            return plot_comparison(runs)
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.text(0.5, 0.5, "Choose runs to compare", ha='center', va='center', transform=ax.transAxes)
+        return fig
+
+    @output
+    @render.table
+    def compare_metrics_table():
+        runs = selected_runs()
+        if not runs:
+            return pd.DataFrame({'Note': ["Choose runs to compare"]})
+        return compare_metrics(runs)
@@ -0,0 +1,80 @@
+"""
+Background job handling for the AI Forecasting Application.
+Submits forecasts to the durable job queue, polls their status and loads
+finished fits into the session.
+"""
+import pandas as pd
+from server_scripts.job_queue import get_job_queue
+
+# Seconds between job status polls
+JOB_POLL_SECONDS = 2
+# Longest client id accepted from the browser
+MAX_CLIENT_ID_LENGTH = 64
+
+def handle_background_jobs(input, output, session, fitted_model, job_args):
+    from shiny import reactive, render, ui
+    awaiting_job = reactive.Value(None)
+
+    def job_owner():
+        """Id of this browser, kept in its localStorage (see www/custom.js), or the session id until it arrives."""
+        if input.client_id.is_set() and input.client_id():
+            return str(input.client_id())[:MAX_CLIENT_ID_LENGTH]
+        return session.id
+
+    def load_job(job_id):
+        queue = get_job_queue()
+        status = queue.status(job_id)
+        # Jobs of other browsers are reported as unknown rather than loaded
+        if status is None or status['owner'] != job_owner():
+            ui.notification_show(f"Unknown job {job_id}", type="error")
+            return True
+        if status['kind'] != "fit_forecast":
+            ui.notification_show(f"Job {job_id[:8]} is a {status['kind']} job, not a forecast fit", type="error")
+            return True
+        if status['status'] == "done":
+            fitted_model.set(queue.result(job_id))
+            ui.notification_show(f"Loaded result of job {job_id[:8]}", type="message")
+            return True
+        if status['status'] == "failed":
+            ui.notification_show(f"Job {job_id[:8]} failed: {status['error'].splitlines()[0]}", type="error")
+            return True
+        return False
+
+    @reactive.effect
+    @reactive.event(input.run_forecast_background)
+    def _():
+        args = job_args()
+        if args is None:
+            ui.notification_show("Upload data before running a forecast", type="warning")
+            return
+        job_id = get_job_queue().submit("fit_forecast", args, owner=job_owner())
+        awaiting_job.set(job_id)
+        ui.notification_show(f"Queued job {job_id[:8]}", type="message")
+
+    @reactive.effect
+    def _():
+        job_id = awaiting_job.get()
+        if job_id is None:
+            return
+        if load_job(job_id):
+            awaiting_job.set(None)
+        else:
+            reactive.invalidate_later(JOB_POLL_SECONDS)
+
+    @reactive.effect
+    @reactive.event(input.load_job)
+    def _():
+        job_id = (input.job_id() or "").strip()
+        if job_id and not load_job(job_id):
+            ui.notification_show(f"Job {job_id[:8]} is still running", type="warning")
+
+    @output
+    @render.table
+    def job_status():
+        reactive.invalidate_later(JOB_POLL_SECONDS)
+        jobs = get_job_queue().list_jobs(owner=job_owner())
+        if jobs.empty:
+            return pd.DataFrame({'Note': ["No background jobs from this browser"]})
+        jobs['created_at'] = pd.to_datetime(jobs['created_at'], unit='s').dt.strftime('%H:%M:%S')
+        jobs['error'] = jobs['error'].fillna("").str.split("\n").str[0]
+        return jobs[['id', 'kind', 'status', 'attempts', 'created_at', 'error']]
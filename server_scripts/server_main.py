@@ -8,10 +8,22 @@ import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
 from io import StringIO
-from server_scripts.global_helpers import calculate_metrics
-from server_scripts.server_forecast import run_prophet_forecast, run_arima_forecast
+from server_scripts.global_helpers import calculate_metrics, dataset_fingerprint
+from server_scripts.preprocessing import fill_gaps, resample_series
+from server_scripts.outliers import winsorize_outliers
+from server_scripts.schema import frame_schema
+from server_scripts.out_of_core import lazy_dataset
+from server_scripts.server_forecast import fit_forecast_model, predict_forecast, plot_forecast
+from server_scripts.server_hierarchy import handle_hierarchy_forecast
+from server_scripts.server_jobs import handle_background_jobs
+from server_scripts.instrumentation import instrumented_renderer, timed
+from server_scripts.profiling import PROFILING_AVAILABLE
+from server_scripts.server_profiling import handle_profiling
+from server_scripts.server_charts import handle_client_charts
+from server_scripts.server_history import handle_run_history
+from server_scripts.server_exports import handle_exports
 from server_scripts.server_data import (
-    handle_file_upload, render_uploaded_data, render_data_viz, render_summary_stats,
+    handle_file_upload, render_uploaded_data, render_memory_report, render_data_viz, render_summary_stats,
     render_stats_viz, render_download_summary_stats, render_download_template
 )
 
@@ -29,6 +41,9 @@ def server_function(input, output, session):
     # ----- Data Preview -----
     render_uploaded_data(output, data)
 
+    # ----- Memory Usage -----
+    render_memory_report(output, data)
+
     # ----- Data Visualization -----
     render_data_viz(output, data, input)
 
@@ -41,30 +56,102 @@ def server_function(input, output, session):
     # ----- Download Summary Statistics -----
     render_download_summary_stats(output, data)
 
+    # ----- Dataset Fingerprint -----
+    @reactive.calc
+    def data_fingerprint():
+        df = data.get()
+        if df is None:
+            return None
+        # Stored datasets are already content-addressed
+        return df.attrs.get('dataset_key') or dataset_fingerprint(df)
+
     # ----- Forecast Runner -----
+    # Fitting only happens on "Run Forecast"; the horizon is applied to the cached
+    # fit in forecast_result so changing it does not refit the model.
+    fitted_model = reactive.Value(None)
+
+    def forecast_job_args():
+        """Keyword arguments of fit_forecast_model for the current data and inputs, or None."""
+        df = data.get()
+        if df is None:
+            return None
+        schema = frame_schema(df)
+        time_var, target_var = schema['time_var'], schema['target_var']
+        if not time_var or not target_var or time_var not in df.columns or target_var not in df.columns:
+            return None
+        lazy = lazy_dataset(df)
+        if lazy is not None:
+            # Out-of-core data: aggregate inside DuckDB and pull only the series
+            ts_data = lazy.series(time_var, target_var, grain=input.model_grain(), how=input.grain_aggregation())
+        else:
+            # Copy-on-write: the selection shares the session's column buffers until modified
+            ts_data = df[[time_var, target_var]]
+            if not schema['sorted']:
+                ts_data = ts_data.sort_values(by=time_var)
+            ts_data = resample_series(
+                ts_data, time_var, target_var,
+                grain=input.model_grain(), how=input.grain_aggregation(),
+                cache_key=data_fingerprint()
+            )
+        grain = input.model_grain()
+        ts_data = fill_gaps(
+            ts_data, time_var, freq=schema['freq'] if grain == "raw" else grain,
+            method=input.impute_method(), cache_key=(data_fingerprint(), grain, input.grain_aggregation())
+        )
+        if input.winsorize_outliers():
+            ts_data, _ = winsorize_outliers(ts_data, [target_var])
+        return dict(
+            ts_data=ts_data, time_var=time_var, target_var=target_var,
+            model_type=input.forecast_model(),
+            fast_mode=input.prophet_fast_mode(),
+            uncertainty_samples=input.uncertainty_samples() or 0,
+            interval_method=input.interval_method(),
+            members=list(input.ensemble_members() or [])
+        )
+
     @reactive.effect
+    @reactive.event(input.run_forecast)
     def _():
-        if not input.run_forecast() or data.get() is None:
-            return
-        df = data.get()
-        date_cols = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        time_var = date_cols[0] if date_cols else df.columns[0]
-        target_var = numeric_cols[0] if numeric_cols else df.columns[1]
+        job_args = forecast_job_args()
+        if job_args is not None:
+            with timed("fit", model=job_args['model_type']):
+                fitted_model.set(fit_forecast_model(**job_args))
+
+    # ----- Background Jobs -----
+    handle_background_jobs(input, output, session, fitted_model, forecast_job_args)
+
+    # ----- Profiling (admin sessions only) -----
+    if PROFILING_AVAILABLE:
+        handle_profiling(input, output, session, forecast_job_args)
+
+    @reactive.calc
+    def forecast_result():
+        fitted = fitted_model.get()
         horizon = input.forecast_horizon()
-        model_type = input.forecast_model()
-        if not time_var or not target_var or time_var not in df.columns or target_var not in df.columns:
-            return
-        ts_data = df[[time_var, target_var]].copy().sort_values(by=time_var)
-        if model_type == "prophet":
-            run_prophet_forecast(ts_data, time_var, target_var, horizon, output)
-        elif model_type == "auto_arima":
-            run_arima_forecast(ts_data, time_var, target_var, horizon, output)
-
-    # ----- Initial Plot and Metrics -----
+        if fitted is None or not horizon:
+            return None
+        with timed("predict", model=fitted['model_type']):
+            return predict_forecast(fitted, horizon)
+
+    @output
+    @render.text
+    def detected_frequency():
+        df = data.get()
+        if df is None:
+            return ""
+        schema = frame_schema(df)
+        if schema['time_kind'] != "datetime":
+            return "Detected frequency: unknown (no date/time column)"
+        return f"Detected frequency: {schema['freq'] or 'unknown'}"
+
+    # ----- Forecast Plot and Metrics -----
     @output
+    @instrumented_renderer("render", output="forecast_plot")
     @render.plot
     def forecast_plot():
+        result = forecast_result()
+        if result is not None:
+            return plot_forecast(result)
         fig, ax = plt.subplots(figsize=(10, 6))
         ax.text(
             0.5, 0.5,
@@ -77,10 +164,33 @@ def server_function(input, output, session):
     @output
     @render.table
     def forecast_metrics():
+        result = forecast_result()
+        if result is not None:
+            return result['metrics']
         return pd.DataFrame({
             'Metric': ['Note'],
             'Value': ["Run a forecast to see metrics"]
         })
 
+    @output
+    @render.table
+    def ensemble_weights():
+        result = forecast_result()
+        if result is None or 'contributions' not in result:
+            return pd.DataFrame({'Note': ["Run an ensemble forecast to see member weights"]})
+        return result['contributions']
+
+    # ----- Run History and Comparison -----
+    handle_run_history(input, output, fitted_model, forecast_result)
+
+    # ----- Exports -----
+    handle_exports(input, output, data, fitted_model, forecast_result)
+
+    # ----- Client-side Charts -----
+    handle_client_charts(input, session, data, forecast_result)
+
+    # ----- Hierarchical Forecast -----
+    handle_hierarchy_forecast(input, output, data)
+
     # ----- Template Download Handler -----
     render_download_template(output)
@@ -0,0 +1,92 @@
+"""
+Admin profiling controls for the AI Forecasting Application.
+Re-runs the current forecast under a profiler and offers the profile and
+collapsed stacks as downloads. The controls are only rendered for admin
+sessions, and the profiled run executes on a worker thread so the session
+stays responsive.
+"""
+import os
+import asyncio
+import functools
+import pandas as pd
+from server_scripts.profiling import is_admin_session, profile_forecast
+from server_scripts.workers import get_executor
+
+def handle_profiling(input, output, session, job_args):
+    from shiny import reactive, render, ui
+    from ui_scripts.components.forecast_tab import profiling_card
+    last_profile = reactive.Value(None)
+
+    @reactive.calc
+    def is_admin():
+        return is_admin_session(session.clientdata.url_search())
+
+    @output
+    @render.ui
+    def profiling_panel():
+        return profiling_card() if is_admin() else None
+
+    @reactive.extended_task
+    async def profile_task(args, horizon, mode):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor("thread"), functools.partial(profile_forecast, args, horizon, mode=mode)
+        )
+
+    @reactive.effect
+    @reactive.event(input.run_profile)
+    def _():
+        if not is_admin():
+            return
+        args = job_args()
+        if args is None:
+            ui.notification_show("Upload data before profiling a forecast", type="warning")
+            return
+        if profile_task.status() == "running":
+            ui.notification_show("A profile is already running", type="warning")
+            return
+        ui.notification_show("Profiling forecast...", type="message")
+        profile_task(args, input.forecast_horizon() or 12, input.profiler_mode())
+
+    @reactive.effect
+    def _():
+        status = profile_task.status()
+        if status == "error":
+            ui.notification_show(f"Profiling failed: {profile_task.error()}", type="error")
+        elif status == "success":
+            result = profile_task.value()
+            last_profile.set(result)
+            ui.notification_show(
+                f"Profiled in {result['wall_seconds']:.2f}s, peak traced memory "
+                f"{result['peak_bytes'] / 2**20:.1f} MiB", type="message"
+            )
+
+    @output
+    @render.table
+    def profile_summary():
+        result = last_profile.get()
+        if result is None:
+            return pd.DataFrame({'Note': ["Run the profiler to see hot spots"]})
+        return result['summary']
+
+    @output
+    @render.table
+    def profile_memory():
+        result = last_profile.get()
+        if result is None:
+            return pd.DataFrame({'Note': ["Run the profiler to see allocations"]})
+        return result['memory']
+
+    @output
+    @render.download(filename=lambda: os.path.basename(last_profile.get()['profile_path']) if last_profile.get() else "profile.txt")
+    def download_profile():
+        result = last_profile.get()
+        if result is not None:
+            return result['profile_path']
+
+    @output
+    @render.download(filename=lambda: os.path.basename(last_profile.get()['collapsed_path']) if last_profile.get() else "profile.collapsed.txt")
+    def download_collapsed():
+        result = last_profile.get()
+        if result is not None:
+            return result['collapsed_path']
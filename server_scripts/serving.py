@@ -0,0 +1,228 @@
+"""
+Multi-process serving for the AI Forecasting Application.
+Starts several uvicorn server processes on local ports and a small TCP proxy in
+front of them. Each client address is always routed to the same process, which
+keeps a Shiny session (its websocket, uploads and downloads) on the process
+that holds its state. Workers share fitted models and derived data through the
+cross-process cache (see shared_cache.py).
+"""
+import os
+import sys
+import time
+import zlib
+import signal
+import asyncio
+import logging
+import subprocess
+from server_scripts.global_helpers import APP_DIR
+
+logger = logging.getLogger("forecasting.serving")
+
+# Resident memory assumed per server process when sizing the worker count
+WORKER_MEMORY_MB = int(os.environ.get("FORECAST_WORKER_MEMORY_MB", "768"))
+MAX_AUTO_WORKERS = 8
+# Bytes of the first request read to find a forwarded client address
+MAX_HEADER_BYTES = 65536
+RESTART_DELAY = 1.0
+# Use the X-Forwarded-For client address for affinity (when behind another proxy)
+TRUST_FORWARDED = os.environ.get("FORECAST_TRUST_FORWARDED", "").lower() in ("1", "true", "yes")
+
+# ===== SIZING =====
+def available_cpus():
+    """CPUs this process may run on, limited by a cgroup (container) CPU quota if any."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+def available_memory_mb():
+    """Memory available for new processes in MiB, or None when it cannot be read."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+def default_worker_count():
+    """
+    Number of server processes: FORECAST_SERVE_WORKERS if set, else one per
+    available CPU, bounded by the available memory and MAX_AUTO_WORKERS.
+    """
+    configured = os.environ.get("FORECAST_SERVE_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    count = min(available_cpus(), MAX_AUTO_WORKERS)
+    memory = available_memory_mb()
+    if memory is not None:
+        count = min(count, memory // WORKER_MEMORY_MB)
+    return max(1, count)
+
+# ===== WORKER PROCESSES =====
+class WorkerProcess:
+    """One uvicorn server process on a local port, restarted when it exits."""
+
+    def __init__(self, index, port, env):
+        self.index = index
+        self.port = port
+        self.env = env
+        self.process = None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(self.port)],
+            cwd=APP_DIR, env=self.env
+        )
+        logger.info("started worker %d (pid %d) on port %d", self.index, self.process.pid, self.port)
+
+    def ensure_running(self):
+        if self.process is not None and self.process.poll() is not None:
+            logger.warning("worker %d exited with code %s, restarting", self.index, self.process.returncode)
+            self.start()
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+def worker_env(n_workers):
+    """Environment of the server processes: shared cache on, CPU pools split between them."""
+    env = dict(os.environ)
+    env["FORECAST_SHARED_CACHE"] = "1"
+    env.setdefault("FORECAST_WORKERS", str(max(1, available_cpus() // n_workers)))
+    return env
+
+# ===== PROXY =====
+def affinity_key(peer, head):
+    """Client address used for routing: the peer address, or the forwarded one when trusted."""
+    if TRUST_FORWARDED:
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"x-forwarded-for" and value.strip():
+                return value.split(b",")[0].strip().decode("latin-1")
+    return peer[0] if peer else ""
+
+async def _read_head(reader):
+    head = b""
+    while b"\r\n\r\n" not in head and len(head) < MAX_HEADER_BYTES:
+        chunk = await reader.read(4096)
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+class StickyProxy:
+    """TCP proxy routing each client address to a fixed worker, failing over to the next one."""
+
+    def __init__(self, ports):
+        self.ports = list(ports)
+
+    def route(self, key):
+        """Ports in the order to try for a client: its own worker first."""
+        start = zlib.crc32(key.encode()) % len(self.ports)
+        return self.ports[start:] + self.ports[:start]
+
+    async def handle(self, client_reader, client_writer):
+        head = await _read_head(client_reader)
+        if not head:
+            client_writer.close()
+            return
+        key = affinity_key(client_writer.get_extra_info("peername"), head)
+        for port in self.route(key):
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+            except OSError:
+                continue
+        else:
+            client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await client_writer.drain()
+            client_writer.close()
+            return
+        upstream_writer.write(head)
+        await asyncio.gather(_pipe(client_reader, upstream_writer), _pipe(upstream_reader, client_writer))
+
+# ===== RUNNER =====
+def _wait_for_ports(ports, timeout=120):
+    """Block until every worker accepts connections, or the timeout passes."""
+    import socket
+    deadline = time.monotonic() + timeout
+    pending = set(ports)
+    while pending and time.monotonic() < deadline:
+        for port in list(pending):
+            with socket.socket() as sock:
+                if sock.connect_ex(("127.0.0.1", port)) == 0:
+                    pending.discard(port)
+        time.sleep(0.2)
+    return not pending
+
+async def _supervise(workers, interval=RESTART_DELAY):
+    while True:
+        await asyncio.sleep(interval)
+        for worker in workers:
+            worker.ensure_running()
+
+def serve(host="127.0.0.1", port=8000, n_workers=None):
+    """
+    Run ``n_workers`` server processes behind a sticky proxy listening on ``host:port``.
+
+    With a single worker the app is served directly by uvicorn, without the proxy.
+    """
+    n_workers = n_workers or default_worker_count()
+    if n_workers == 1:
+        import uvicorn
+        from app import app
+        uvicorn.run(app, host=host, port=port)
+        return
+    base_port = int(os.environ.get("FORECAST_WORKER_BASE_PORT", str(port + 1)))
+    env = worker_env(n_workers)
+    workers = [WorkerProcess(i, base_port + i, env) for i in range(n_workers)]
+    for worker in workers:
+        worker.start()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        if not _wait_for_ports([worker.port for worker in workers]):
+            logger.warning("not every worker started listening in time")
+        proxy = StickyProxy(worker.port for worker in workers)
+
+        async def main():
+            server = await asyncio.start_server(proxy.handle, host, port)
+            print(f"Serving on http://{host}:{port} with {n_workers} workers (ports {base_port}-{base_port + n_workers - 1})")
+            async with server:
+                await asyncio.gather(server.serve_forever(), _supervise(workers))
+
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.stop()
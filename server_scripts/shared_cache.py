@@ -0,0 +1,140 @@
+"""
+Cross-process cache for the AI Forecasting Application.
+When several server processes run side by side (see serve.py), entries stored
+here by one process are served to the others: a SQLite file in WAL mode holds
+pickled values under a namespace and key, bounded in total size.
+"""
+import os
+import time
+import pickle
+import hashlib
+import sqlite3
+import threading
+from server_scripts.global_helpers import CACHE_DIR
+from server_scripts.instrumentation import record_cache
+
+# Enabled by serve.py for its workers, or explicitly with FORECAST_SHARED_CACHE=1
+SHARED_CACHE_ENABLED = os.environ.get("FORECAST_SHARED_CACHE", "").lower() in ("1", "true", "yes")
+SHARED_CACHE_PATH = os.environ.get("FORECAST_SHARED_CACHE_PATH", os.path.join(CACHE_DIR, "shared_cache.sqlite3"))
+SHARED_CACHE_MAX_BYTES = int(os.environ.get("FORECAST_SHARED_CACHE_MB", "512")) * 2**20
+# Values larger than this are kept in the local process only
+MAX_VALUE_BYTES = 64 * 2**20
+# Share of the size limit kept after an eviction, so evictions are not run on every write
+_EVICT_TO = 0.8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+def _key_digest(key):
+    """Stable text form of a cache key; keys are tuples of strings and numbers."""
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+class SharedCache:
+    """
+    Size-bounded, least-recently-used key/value store shared by every process
+    using the same file. Failures (locked database, unpicklable values) are
+    treated as misses so callers can fall back to computing the value.
+    """
+
+    def __init__(self, path=SHARED_CACHE_PATH, max_bytes=SHARED_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, default=None):
+        digest = _key_digest(key)
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM entries WHERE namespace = ? AND key = ?",
+                               (namespace, digest)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE entries SET last_used = ? WHERE namespace = ? AND key = ?",
+                             (time.time(), namespace, digest))
+                value = pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            row = None
+        record_cache(f"shared_{namespace}", row is not None)
+        return value if row is not None else default
+
+    def set(self, namespace, key, value):
+        """Store a value; returns False if it could not be shared."""
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+        if len(blob) > MAX_VALUE_BYTES:
+            return False
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (namespace, _key_digest(key), blob, len(blob), time.time())
+            )
+            self._evict(conn)
+        except sqlite3.Error:
+            return False
+        return True
+
+    def pop(self, namespace, key):
+        try:
+            self._connect().execute("DELETE FROM entries WHERE namespace = ? AND key = ?",
+                                    (namespace, _key_digest(key)))
+        except sqlite3.Error:
+            pass
+
+    def clear(self, namespace=None):
+        conn = self._connect()
+        if namespace is None:
+            conn.execute("DELETE FROM entries")
+        else:
+            conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * _EVICT_TO)
+        # Oldest entries first, until the running total of their sizes covers the excess
+        conn.execute("""
+            DELETE FROM entries WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, size, SUM(size) OVER (ORDER BY last_used ROWS UNBOUNDED PRECEDING) AS freed
+                    FROM entries
+                ) WHERE freed - size < ?
+            )""", (excess,))
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_cache():
+    """The process's handle on the shared cache, or None when sharing is disabled."""
+    global _shared
+    if not SHARED_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared is None:
+            try:
+                _shared = SharedCache()
+            except (OSError, sqlite3.Error):
+                return None
+        return _shared
@@ -0,0 +1,95 @@
+"""
+Compact in-memory storage for uploaded datasets.
+Numeric columns are downcast when no information is lost and text columns
+become categoricals or Arrow strings, so each session holds a smaller frame.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+# Compact storage is on unless FORECAST_COMPACT_STORAGE is set to 0/false
+COMPACT_STORAGE = os.environ.get("FORECAST_COMPACT_STORAGE", "1").lower() not in ("0", "false", "no")
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+try:
+    import pyarrow  # noqa: F401
+    ARROW_STRINGS = True
+except ImportError:
+    ARROW_STRINGS = False
+
+def _compact_float(values):
+    """float32 when every value survives the round trip to float32 exactly, else unchanged."""
+    if values.dtype != np.float64:
+        return values
+    original = values.to_numpy()
+    finite = original[np.isfinite(original)]
+    if finite.size and np.abs(finite).max() > np.finfo(np.float32).max:
+        return values
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.to_numpy(dtype=np.float64), original, equal_nan=True):
+        return narrowed
+    return values
+
+def compact_column(values):
+    """Smallest lossless representation of one column."""
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(values, downcast='integer')
+    if pd.api.types.is_float_dtype(values):
+        return _compact_float(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+        n_unique = values.nunique(dropna=True)
+        if len(values) > 0 and n_unique <= CATEGORY_MAX_UNIQUE_RATIO * len(values):
+            return values.astype('category')
+        if ARROW_STRINGS:
+            return values.astype('string[pyarrow]')
+    return values
+
+def frame_memory(df):
+    """Deep memory usage per column in bytes, including the index."""
+    return df.memory_usage(deep=True, index=True)
+
+def compact_frame(df):
+    """
+    Return a compact copy of a frame; the index, column order and ``attrs`` are kept.
+
+    Integers are downcast to the smallest integer type holding their range, floats
+    to float32 when every value is exactly representable, and text columns become
+    categoricals (low cardinality) or Arrow-backed strings. The original dtypes and sizes are kept
+    in ``attrs['original_memory']`` for ``memory_report``.
+    """
+    before = frame_memory(df)
+    compacted = df.assign(**{col: compact_column(df[col]) for col in df.columns})
+    compacted.attrs = dict(df.attrs)
+    compacted.attrs['original_memory'] = {
+        str(col): (str(df[col].dtype) if col in df.columns else 'index', int(size))
+        for col, size in before.items()
+    }
+    return compacted
+
+def memory_report(df):
+    """
+    Per-column dtype and memory of a frame, before and after compaction when known.
+
+    Returns:
+        pandas.DataFrame: Column, dtypes, sizes in KiB and savings, with a total row
+    """
+    after = frame_memory(df)
+    original = df.attrs.get('original_memory', {})
+    rows = []
+    for col, size in after.items():
+        dtype = str(df[col].dtype) if col in df.columns else 'index'
+        original_dtype, original_size = original.get(str(col), (dtype, int(size)))
+        rows.append({'Column': str(col), 'Original Type': original_dtype, 'Type': dtype,
+                     'Original (KiB)': original_size / 1024, 'Current (KiB)': size / 1024})
+    report = pd.DataFrame(rows)
+    total = {'Column': 'Total', 'Original Type': '', 'Type': '',
+             'Original (KiB)': report['Original (KiB)'].sum(), 'Current (KiB)': report['Current (KiB)'].sum()}
+    report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+    saved = 1 - report['Current (KiB)'] / report['Original (KiB)'].where(report['Original (KiB)'] > 0)
+    report['Saved (%)'] = (100 * saved).fillna(0.0)
+    return report.round(1)
@@ -0,0 +1,76 @@
+"""
+Shared worker pools for the AI Forecasting Application.
+Process pools run CPU-bound model fits in parallel; thread pools run work that
+must share in-process caches with the Shiny sessions.
+"""
+import os
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+THREAD_NAME_PREFIX = "forecast"
+
+_pools = {}
+_lock = threading.Lock()
+
+def default_workers():
+    """Number of workers per pool: FORECAST_WORKERS if set, else the CPU count."""
+    configured = os.environ.get("FORECAST_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, os.cpu_count() or 1)
+
+def get_executor(kind="process"):
+    """
+    Return the process-wide executor of the given kind, creating it on first use.
+
+    Args:
+        kind (str): "process" or "thread"
+
+    Returns:
+        concurrent.futures.Executor: The shared executor
+    """
+    with _lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            if kind == "process":
+                pool = ProcessPoolExecutor(max_workers=default_workers())
+            else:
+                pool = ThreadPoolExecutor(max_workers=default_workers(), thread_name_prefix=THREAD_NAME_PREFIX)
+            _pools[kind] = pool
+        return pool
+
+def map_chunks(fn, chunks, kind="process"):
+    """
+    Apply ``fn`` to each chunk on the shared pool, preserving order.
+
+    A single chunk runs inline to avoid the dispatch overhead.
+    """
+    chunks = list(chunks)
+    if len(chunks) <= 1:
+        return [fn(chunk) for chunk in chunks]
+    return list(get_executor(kind).map(fn, chunks))
+
+def in_worker_thread():
+    """True when called from a thread of the shared thread pool."""
+    return threading.current_thread().name.startswith(THREAD_NAME_PREFIX)
+
+def thread_map(fn, items):
+    """
+    Apply ``fn`` to each item on the shared thread pool, preserving order.
+
+    Runs inline when already on a pool thread: waiting on the same pool from one
+    of its workers would deadlock once every worker is busy.
+    """
+    if in_worker_thread():
+        return [fn(item) for item in items]
+    return list(get_executor("thread").map(fn, items))
+
+def shutdown_executors():
+    """Shut down all shared pools."""
+    with _lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+atexit.register(shutdown_executors)
@@ -1,4 +1,5 @@
 from shiny import ui
+from server_scripts.assets import FONT_AWESOME_CDN, FONT_AWESOME_CSS, asset_url, load_manifest
 
 def nav_panel(title, *children, **kwargs):
     """Wrapper for ui.nav_panel to centralize future behaviour or styling."""
@@ -31,13 +32,36 @@ def file_input(input_id, label, accept=None):
     return ui.input_file(input_id, label, accept=accept)
 
 def get_custom_head():
-    """Return common head tags used across the app (styles/scripts)."""
+    """
+    Return common head tags used across the app (styles/scripts).
+
+    Assets are served from the fingerprinted build in www/dist (see
+    server_scripts/assets.py); jQuery comes with Shiny itself.
+    """
+    manifest = load_manifest()
     return ui.tags.head(
         ui.tags.link(
             rel="stylesheet",
-            href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css",
+            href=asset_url(FONT_AWESOME_CSS, manifest, fallback=FONT_AWESOME_CDN),
+        ),
+        ui.tags.link(rel="stylesheet", href=asset_url("custom.css", manifest)),
+        ui.tags.script(src=asset_url("custom.js", manifest)),
+        ui.tags.script(src=asset_url("charts.js", manifest)),
+    )
+
+def chart_output(output_id, switch_id):
+    """
+    A plot output with a switch to replace it by a client-side chart.
+
+    The chart is drawn in the browser (www/charts.js) into a div with id
+    ``<output_id>_chart``; the hidden plot output is not rendered by the server.
+    """
+    return ui.div(
+        ui.input_switch(switch_id, "Interactive chart", value=False),
+        ui.panel_conditional(f"!input.{switch_id}", ui.output_plot(output_id)),
+        ui.panel_conditional(
+            f"input.{switch_id}",
+            ui.div(id=f"{output_id}_chart", class_="client-chart"),
+            ui.div("Scroll to zoom, drag to pan, double-click to reset", class_="text-muted small"),
         ),
-        ui.tags.link(rel="stylesheet", href="custom.css"),
-        ui.tags.script(src="https://code.jquery.com/jquery-3.6.0.min.js"),
-        ui.tags.script(src="custom.js"),
     )
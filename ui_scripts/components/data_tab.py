@@ -1,5 +1,6 @@
 from shiny import ui
-from ui_scripts.components.common_ui import nav_panel, file_input, download_button, action_button
+from ui_scripts.components.common_ui import nav_panel, file_input, download_button, action_button, chart_output
+from server_scripts.exports import EXPORT_FORMATS
 
 
 def data_tab():
@@ -38,9 +39,28 @@ def data_tab():
                     ui.output_data_frame("uploaded_data"),
                     class_="card p-3 mt-3",
                 ),
+                ui.div(
+                    ui.h3("Export Dataset"),
+                    ui.div(
+                        ui.input_select("dataset_export_format", "Format", choices=EXPORT_FORMATS),
+                        download_button(
+                            "download_dataset",
+                            "Download Dataset",
+                            icon_class="fas fa-file-export",
+                        ),
+                        class_="d-flex gap-2 align-items-end",
+                    ),
+                    class_="card p-3 mt-3",
+                ),
+                ui.div(
+                    ui.h3("Memory Usage"),
+                    ui.output_table("memory_usage"),
+                    class_="card p-3 mt-3",
+                ),
                 ui.div(
                     ui.h3("Quick Visualization"),
-                    ui.output_plot("data_viz"),
+                    ui.input_switch("flag_outliers", "Flag outliers (Hampel filter)", value=False),
+                    chart_output("data_viz", "data_viz_interactive"),
                     class_="card p-3 mt-3",
                 ),
                 class_="card-body",
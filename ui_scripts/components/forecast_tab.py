@@ -1,5 +1,42 @@
 from shiny import ui
-from ui_scripts.components.common_ui import nav_panel, action_button
+from ui_scripts.components.common_ui import nav_panel, action_button, download_button, chart_output
+from server_scripts.preprocessing import GRAIN_CHOICES, AGGREGATION_CHOICES, IMPUTATION_CHOICES
+from server_scripts.hierarchy import RECONCILIATION_CHOICES, BASE_MODEL_CHOICES
+from server_scripts.ensemble import ENSEMBLE_MEMBERS, DEFAULT_MEMBERS
+from server_scripts.profiling import PROFILING_AVAILABLE, PROFILER_CHOICES
+from server_scripts.exports import EXPORT_FORMATS
+
+
+def profiling_card():
+    """Admin-only controls to re-run the current forecast under a profiler (rendered per session)."""
+    return ui.div(
+        ui.h3("Profiling"),
+        ui.input_select("profiler_mode", "Profiler", choices=PROFILER_CHOICES),
+        ui.div(
+            action_button(
+                "run_profile",
+                "Profile Forecast",
+                icon_class="fas fa-stopwatch",
+                class_="btn-warning",
+            ),
+            download_button(
+                "download_profile",
+                "Download Profile",
+                icon_class="fas fa-download",
+            ),
+            download_button(
+                "download_collapsed",
+                "Download Collapsed Stacks",
+                icon_class="fas fa-fire",
+            ),
+            class_="d-flex gap-2",
+        ),
+        ui.h4("Hot Spots"),
+        ui.output_table("profile_summary"),
+        ui.h4("Memory Allocations"),
+        ui.output_table("profile_memory"),
+        class_="card p-3 mt-3",
+    )
 
 
 def forecast_tab():
@@ -20,21 +57,167 @@ def forecast_tab():
                 choices={
                     "auto_arima": "Auto ARIMA",
                     "prophet": "Prophet",
+                    "ensemble": "Ensemble",
                 },
             ),
-            action_button(
-                "run_forecast",
-                "Run Forecast",
-                icon_class="fas fa-play",
-                class_="btn-primary",
+            ui.panel_conditional(
+                "input.forecast_model === 'ensemble'",
+                ui.input_checkbox_group(
+                    "ensemble_members",
+                    "Ensemble Members",
+                    choices=ENSEMBLE_MEMBERS,
+                    selected=DEFAULT_MEMBERS,
+                ),
+            ),
+            ui.input_select(
+                "model_grain",
+                "Modeling Grain",
+                choices=GRAIN_CHOICES,
+            ),
+            ui.panel_conditional(
+                "input.model_grain !== 'raw'",
+                ui.input_select(
+                    "grain_aggregation",
+                    "Aggregation",
+                    choices=AGGREGATION_CHOICES,
+                ),
+            ),
+            ui.input_select(
+                "impute_method",
+                "Fill Missing Values",
+                choices=IMPUTATION_CHOICES,
+            ),
+            ui.input_switch("winsorize_outliers", "Winsorize outliers before fitting", value=False),
+            ui.div(ui.output_text("detected_frequency"), class_="text-muted small mb-2"),
+            ui.panel_conditional(
+                "input.forecast_model === 'prophet'",
+                ui.input_switch("prophet_fast_mode", "Fast Prophet mode", value=False),
+                ui.panel_conditional(
+                    "input.prophet_fast_mode",
+                    ui.input_numeric(
+                        "uncertainty_samples",
+                        "Uncertainty Samples",
+                        value=200,
+                        min=0,
+                        max=1000,
+                    ),
+                    ui.input_select(
+                        "interval_method",
+                        "Interval Method",
+                        choices={
+                            "sampling": "Simulation",
+                            "analytic": "Analytic",
+                        },
+                    ),
+                ),
+            ),
+            ui.div(
+                action_button(
+                    "run_forecast",
+                    "Run Forecast",
+                    icon_class="fas fa-play",
+                    class_="btn-primary",
+                ),
+                action_button(
+                    "run_forecast_background",
+                    "Run in Background",
+                    icon_class="fas fa-clock",
+                    class_="btn-secondary",
+                ),
+                class_="d-flex gap-2",
             ),
             class_="card p-3",
         ),
+        ui.div(
+            ui.h3("Background Jobs"),
+            ui.output_table("job_status"),
+            ui.div(
+                ui.input_text("job_id", "Job ID"),
+                action_button(
+                    "load_job",
+                    "Load Result",
+                    icon_class="fas fa-folder-open",
+                    class_="btn-secondary",
+                ),
+                class_="d-flex gap-2 align-items-end",
+            ),
+            class_="card p-3 mt-3",
+        ),
         ui.div(
             ui.h3("Forecast Results"),
-            ui.output_plot("forecast_plot"),
+            chart_output("forecast_plot", "forecast_plot_interactive"),
             ui.h3("Forecast Metrics"),
             ui.output_table("forecast_metrics"),
+            ui.panel_conditional(
+                "input.forecast_model === 'ensemble'",
+                ui.h3("Ensemble Members"),
+                ui.output_table("ensemble_weights"),
+            ),
+            ui.div(
+                ui.input_select("forecast_export_format", "Export Format", choices=EXPORT_FORMATS),
+                download_button(
+                    "download_forecast",
+                    "Download Forecast",
+                    icon_class="fas fa-file-export",
+                ),
+                download_button(
+                    "download_backtest",
+                    "Download Backtest",
+                    icon_class="fas fa-file-export",
+                ),
+                class_="d-flex gap-2 align-items-end",
+            ),
+            class_="card p-3 mt-3",
+        ),
+        ui.div(
+            ui.h3("Run History"),
+            ui.output_table("run_history"),
+            ui.div(
+                ui.input_selectize(
+                    "compare_runs",
+                    "Compare Runs",
+                    choices=[],
+                    multiple=True,
+                ),
+                action_button(
+                    "clear_history",
+                    "Clear History",
+                    icon_class="fas fa-trash",
+                    class_="btn-secondary",
+                ),
+                class_="d-flex gap-2 align-items-end",
+            ),
+            ui.output_plot("compare_plot"),
+            ui.output_table("compare_metrics_table"),
+            class_="card p-3 mt-3",
+        ),
+        ui.div(
+            ui.h3("Hierarchical Forecast"),
+            ui.input_selectize(
+                "hierarchy_levels",
+                "Hierarchy Levels (top to bottom)",
+                choices=[],
+                multiple=True,
+            ),
+            ui.input_select(
+                "hierarchy_base_model",
+                "Base Model",
+                choices=BASE_MODEL_CHOICES,
+            ),
+            ui.input_select(
+                "reconciliation_method",
+                "Reconciliation",
+                choices=RECONCILIATION_CHOICES,
+            ),
+            action_button(
+                "run_hierarchy",
+                "Run Hierarchical Forecast",
+                icon_class="fas fa-sitemap",
+                class_="btn-primary",
+            ),
+            ui.output_plot("hierarchy_plot"),
+            ui.output_table("hierarchy_forecast"),
             class_="card p-3 mt-3",
-        )
+        ),
+        ui.output_ui("profiling_panel") if PROFILING_AVAILABLE else None,
     )
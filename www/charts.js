@@ -0,0 +1,422 @@
+// ===== Client-side charts for AI Forecasting App =====
+// Draws the line/band payloads sent by server_scripts/charts.py on a canvas.
+// Zoom (mouse wheel), pan (drag), reset (double click), hover and theme or
+// size changes are handled here without contacting the server.
+
+(function() {
+  'use strict';
+
+  var PADDING = { top: 36, right: 16, bottom: 44, left: 64 };
+  var TIME_STEPS = [
+    1e3, 5e3, 15e3, 3e4, 6e4, 3e5, 9e5, 18e5, 36e5, 108e5, 216e5, 432e5,
+    864e5, 1728e5, 6048e5, 2592e6, 7776e6, 15552e6, 31536e6
+  ];
+  var charts = {};
+
+  // ----- Payload decoding -----
+  function decode(base64, ArrayType) {
+    var binary = atob(base64);
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) {
+      bytes[i] = binary.charCodeAt(i);
+    }
+    return new ArrayType(bytes.buffer);
+  }
+
+  function decodePayload(msg) {
+    return {
+      title: msg.title,
+      xLabel: msg.xLabel,
+      yLabel: msg.yLabel,
+      xKind: msg.xKind,
+      message: msg.message,
+      lines: (msg.lines || []).map(function(s) {
+        return { name: s.name, color: s.color, dash: s.dash, markers: s.markers, total: s.total,
+                 x: decode(s.x, Float64Array), y: decode(s.y, Float32Array) };
+      }),
+      bands: (msg.bands || []).map(function(s) {
+        return { name: s.name, color: s.color, x: decode(s.x, Float64Array),
+                 lower: decode(s.lower, Float32Array), upper: decode(s.upper, Float32Array) };
+      })
+    };
+  }
+
+  // ----- Axis helpers -----
+  function niceStep(span, target) {
+    var raw = span / Math.max(target, 1);
+    var magnitude = Math.pow(10, Math.floor(Math.log10(raw)));
+    var steps = [1, 2, 2.5, 5, 10];
+    for (var i = 0; i < steps.length; i++) {
+      if (steps[i] * magnitude >= raw) {
+        return steps[i] * magnitude;
+      }
+    }
+    return 10 * magnitude;
+  }
+
+  function ticks(lo, hi, target, kind) {
+    var span = hi - lo;
+    if (!(span > 0)) {
+      return [lo];
+    }
+    var step = niceStep(span, target);
+    if (kind === 'time') {
+      step = TIME_STEPS[TIME_STEPS.length - 1];
+      for (var i = 0; i < TIME_STEPS.length; i++) {
+        if (TIME_STEPS[i] >= span / target) {
+          step = TIME_STEPS[i];
+          break;
+        }
+      }
+      if (span / step > target * 2) {
+        step = niceStep(span / 31536e6, target) * 31536e6;
+      }
+    }
+    var out = [];
+    for (var v = Math.ceil(lo / step) * step; v <= hi; v += step) {
+      out.push(v);
+    }
+    return out;
+  }
+
+  function formatValue(v, kind, span) {
+    if (kind === 'time') {
+      var iso = new Date(v).toISOString();
+      if (span < 864e5 * 2) {
+        return iso.slice(11, 16);
+      }
+      return span < 31536e6 * 3 ? iso.slice(0, 10) : iso.slice(0, 7);
+    }
+    var abs = Math.abs(v);
+    if (abs !== 0 && (abs >= 1e6 || abs < 1e-3)) {
+      return v.toExponential(2);
+    }
+    return parseFloat(v.toPrecision(6)).toString();
+  }
+
+  function lowerBound(values, target) {
+    var lo = 0, hi = values.length;
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (values[mid] < target) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    return lo;
+  }
+
+  // ----- Chart -----
+  function Chart(el) {
+    this.el = el;
+    this.canvas = document.createElement('canvas');
+    this.canvas.className = 'client-chart-canvas';
+    this.tooltip = document.createElement('div');
+    this.tooltip.className = 'client-chart-tooltip';
+    el.innerHTML = '';
+    el.appendChild(this.canvas);
+    el.appendChild(this.tooltip);
+    this.data = null;
+    this.view = null;
+    this.hover = null;
+    this.drag = null;
+    this.bindEvents();
+    var self = this;
+    new ResizeObserver(function() { self.draw(); }).observe(el);
+  }
+
+  Chart.prototype.setData = function(data) {
+    this.data = data;
+    this.view = this.fullRange();
+    this.hover = null;
+    this.draw();
+  };
+
+  Chart.prototype.fullRange = function() {
+    var lo = Infinity, hi = -Infinity;
+    var series = this.data.lines.concat(this.data.bands);
+    series.forEach(function(s) {
+      if (s.x.length) {
+        lo = Math.min(lo, s.x[0]);
+        hi = Math.max(hi, s.x[s.x.length - 1]);
+      }
+    });
+    if (!isFinite(lo)) {
+      return { lo: 0, hi: 1 };
+    }
+    return lo === hi ? { lo: lo - 1, hi: hi + 1 } : { lo: lo, hi: hi };
+  };
+
+  Chart.prototype.yRange = function() {
+    var view = this.view, lo = Infinity, hi = -Infinity;
+    function scan(x, arrays) {
+      var start = Math.max(lowerBound(x, view.lo) - 1, 0);
+      var stop = Math.min(lowerBound(x, view.hi) + 1, x.length);
+      for (var i = start; i < stop; i++) {
+        for (var a = 0; a < arrays.length; a++) {
+          var v = arrays[a][i];
+          if (v < lo) { lo = v; }
+          if (v > hi) { hi = v; }
+        }
+      }
+    }
+    this.data.lines.forEach(function(s) { scan(s.x, [s.y]); });
+    this.data.bands.forEach(function(s) { scan(s.x, [s.lower, s.upper]); });
+    if (!isFinite(lo)) {
+      return { lo: 0, hi: 1 };
+    }
+    var pad = (hi - lo) * 0.05 || Math.abs(hi) * 0.05 || 1;
+    return { lo: lo - pad, hi: hi + pad };
+  };
+
+  Chart.prototype.plotArea = function() {
+    var width = this.el.clientWidth, height = this.el.clientHeight;
+    return { x: PADDING.left, y: PADDING.top, width: width - PADDING.left - PADDING.right,
+             height: height - PADDING.top - PADDING.bottom, cssWidth: width, cssHeight: height };
+  };
+
+  Chart.prototype.draw = function() {
+    var area = this.plotArea();
+    if (area.cssWidth === 0 || area.cssHeight === 0) {
+      return; // Hidden; drawn again when the observer sees it resized
+    }
+    var ratio = window.devicePixelRatio || 1;
+    this.canvas.width = area.cssWidth * ratio;
+    this.canvas.height = area.cssHeight * ratio;
+    this.canvas.style.width = area.cssWidth + 'px';
+    this.canvas.style.height = area.cssHeight + 'px';
+    var ctx = this.canvas.getContext('2d');
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, area.cssWidth, area.cssHeight);
+    var style = getComputedStyle(this.el);
+    var text = style.color;
+    ctx.font = '12px ' + style.fontFamily;
+    ctx.fillStyle = text;
+    if (!this.data || this.data.message) {
+      ctx.textAlign = 'center';
+      ctx.fillText(this.data ? this.data.message : '', area.cssWidth / 2, area.cssHeight / 2);
+      return;
+    }
+    var data = this.data, view = this.view, yr = this.yRange();
+    this.yr = yr;
+    var sx = function(v) { return area.x + (v - view.lo) / (view.hi - view.lo) * area.width; };
+    var sy = function(v) { return area.y + area.height - (v - yr.lo) / (yr.hi - yr.lo) * area.height; };
+
+    // Title, grid and axes
+    ctx.textAlign = 'center';
+    ctx.font = 'bold 14px ' + style.fontFamily;
+    ctx.fillText(data.title, area.cssWidth / 2, 20);
+    ctx.font = '12px ' + style.fontFamily;
+    ctx.strokeStyle = text;
+    ctx.globalAlpha = 0.15;
+    ctx.beginPath();
+    var xTicks = ticks(view.lo, view.hi, Math.max(area.width / 110, 2), data.xKind);
+    var yTicks = ticks(yr.lo, yr.hi, Math.max(area.height / 50, 2), 'linear');
+    xTicks.forEach(function(t) { ctx.moveTo(sx(t), area.y); ctx.lineTo(sx(t), area.y + area.height); });
+    yTicks.forEach(function(t) { ctx.moveTo(area.x, sy(t)); ctx.lineTo(area.x + area.width, sy(t)); });
+    ctx.stroke();
+    ctx.globalAlpha = 1;
+    xTicks.forEach(function(t) {
+      ctx.fillText(formatValue(t, data.xKind, view.hi - view.lo), sx(t), area.y + area.height + 16);
+    });
+    ctx.fillText(data.xLabel, area.x + area.width / 2, area.y + area.height + 36);
+    ctx.textAlign = 'right';
+    yTicks.forEach(function(t) { ctx.fillText(formatValue(t, 'linear'), area.x - 6, sy(t) + 4); });
+    ctx.save();
+    ctx.translate(14, area.y + area.height / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.textAlign = 'center';
+    ctx.fillText(data.yLabel, 0, 0);
+    ctx.restore();
+
+    // Series, clipped to the plot area
+    ctx.save();
+    ctx.beginPath();
+    ctx.rect(area.x, area.y, area.width, area.height);
+    ctx.clip();
+    data.bands.forEach(function(s) {
+      ctx.fillStyle = s.color;
+      ctx.globalAlpha = 0.2;
+      ctx.beginPath();
+      for (var i = 0; i < s.x.length; i++) {
+        ctx.lineTo(sx(s.x[i]), sy(s.upper[i]));
+      }
+      for (var j = s.x.length - 1; j >= 0; j--) {
+        ctx.lineTo(sx(s.x[j]), sy(s.lower[j]));
+      }
+      ctx.fill();
+      ctx.globalAlpha = 1;
+    });
+    data.lines.forEach(function(s) {
+      var start = Math.max(lowerBound(s.x, view.lo) - 1, 0);
+      var stop = Math.min(lowerBound(s.x, view.hi) + 1, s.x.length);
+      ctx.strokeStyle = s.color;
+      ctx.lineWidth = 2;
+      ctx.setLineDash(s.dash ? [6, 4] : []);
+      ctx.beginPath();
+      for (var i = start; i < stop; i++) {
+        if (s.markers) {
+          // Cross markers only, no connecting line
+          var px = sx(s.x[i]), py = sy(s.y[i]);
+          ctx.moveTo(px - 4, py - 4);
+          ctx.lineTo(px + 4, py + 4);
+          ctx.moveTo(px + 4, py - 4);
+          ctx.lineTo(px - 4, py + 4);
+        } else {
+          ctx.lineTo(sx(s.x[i]), sy(s.y[i]));
+        }
+      }
+      ctx.stroke();
+    });
+    ctx.setLineDash([]);
+    if (this.hover) {
+      ctx.strokeStyle = text;
+      ctx.globalAlpha = 0.4;
+      ctx.beginPath();
+      ctx.moveTo(sx(this.hover.x), area.y);
+      ctx.lineTo(sx(this.hover.x), area.y + area.height);
+      ctx.stroke();
+      ctx.globalAlpha = 1;
+      this.hover.points.forEach(function(p) {
+        ctx.fillStyle = p.color;
+        ctx.beginPath();
+        ctx.arc(sx(p.x), sy(p.y), 4, 0, 2 * Math.PI);
+        ctx.fill();
+      });
+    }
+    ctx.restore();
+    this.drawLegend(ctx, area);
+  };
+
+  Chart.prototype.drawLegend = function(ctx, area) {
+    var entries = this.data.lines.concat(this.data.bands);
+    ctx.textAlign = 'left';
+    var y = area.y + 14;
+    entries.forEach(function(s) {
+      ctx.fillStyle = s.color;
+      ctx.globalAlpha = s.lower ? 0.3 : 1;
+      ctx.fillRect(area.x + area.width - 150, y - 8, 14, s.lower ? 10 : 3);
+      ctx.globalAlpha = 1;
+      ctx.fillStyle = getComputedStyle(ctx.canvas.parentNode).color;
+      ctx.fillText(s.name, area.x + area.width - 130, y);
+      y += 16;
+    });
+  };
+
+  // ----- Interaction -----
+  Chart.prototype.toData = function(event) {
+    var rect = this.canvas.getBoundingClientRect(), area = this.plotArea();
+    var px = event.clientX - rect.left;
+    return { px: px, inside: px >= area.x && px <= area.x + area.width,
+             x: this.view.lo + (px - area.x) / area.width * (this.view.hi - this.view.lo) };
+  };
+
+  Chart.prototype.updateHover = function(event) {
+    var pos = this.toData(event), data = this.data;
+    if (!pos.inside) {
+      this.hover = null;
+      this.tooltip.style.display = 'none';
+      return;
+    }
+    var points = [];
+    data.lines.forEach(function(s) {
+      var i = lowerBound(s.x, pos.x);
+      if (i > 0 && (i === s.x.length || pos.x - s.x[i - 1] < s.x[i] - pos.x)) {
+        i -= 1;
+      }
+      if (i < s.x.length) {
+        points.push({ name: s.name, color: s.color, x: s.x[i], y: s.y[i] });
+      }
+    });
+    var span = this.view.hi - this.view.lo;
+    var within = points.filter(function(p) { return Math.abs(p.x - pos.x) < span / 20; });
+    if (!within.length) {
+      this.hover = null;
+      this.tooltip.style.display = 'none';
+      return;
+    }
+    this.hover = { x: within[0].x, points: within };
+    this.tooltip.innerHTML = '<strong>' + formatValue(within[0].x, data.xKind, 0) + '</strong>' +
+      within.map(function(p) {
+        return '<br><span style="color:' + p.color + '">&#9679;</span> ' + p.name + ': ' +
+          formatValue(p.y, 'linear');
+      }).join('');
+    this.tooltip.style.display = 'block';
+    this.tooltip.style.left = Math.min(pos.px + 12, this.el.clientWidth - 180) + 'px';
+    this.tooltip.style.top = PADDING.top + 'px';
+  };
+
+  Chart.prototype.bindEvents = function() {
+    var self = this, canvas = this.canvas;
+    canvas.addEventListener('wheel', function(event) {
+      if (!self.data || self.data.message) {
+        return;
+      }
+      event.preventDefault();
+      var pos = self.toData(event);
+      var factor = event.deltaY < 0 ? 0.8 : 1.25;
+      var full = self.fullRange();
+      var lo = pos.x - (pos.x - self.view.lo) * factor;
+      var hi = pos.x + (self.view.hi - pos.x) * factor;
+      self.view = { lo: Math.max(lo, full.lo), hi: Math.min(hi, full.hi) };
+      self.draw();
+    }, { passive: false });
+    canvas.addEventListener('mousedown', function(event) {
+      if (self.data && !self.data.message) {
+        self.drag = { px: event.clientX, view: self.view };
+      }
+    });
+    window.addEventListener('mouseup', function() { self.drag = null; });
+    canvas.addEventListener('mousemove', function(event) {
+      if (!self.data || self.data.message) {
+        return;
+      }
+      if (self.drag) {
+        var area = self.plotArea();
+        var span = self.drag.view.hi - self.drag.view.lo;
+        var shift = -(event.clientX - self.drag.px) / area.width * span;
+        self.view = { lo: self.drag.view.lo + shift, hi: self.drag.view.hi + shift };
+      }
+      self.updateHover(event);
+      self.draw();
+    });
+    canvas.addEventListener('mouseleave', function() {
+      self.hover = null;
+      self.tooltip.style.display = 'none';
+      self.draw();
+    });
+    canvas.addEventListener('dblclick', function() {
+      if (self.data && !self.data.message) {
+        self.view = self.fullRange();
+        self.draw();
+      }
+    });
+  };
+
+  // ----- Shiny message handler -----
+  function chartFor(id) {
+    var el = document.getElementById(id);
+    if (!el) {
+      return null;
+    }
+    if (!charts[id] || charts[id].el !== el) {
+      charts[id] = new Chart(el);
+    }
+    return charts[id];
+  }
+
+  $(function() {
+    Shiny.addCustomMessageHandler('chart-data', function(msg) {
+      var chart = chartFor(msg.id);
+      if (chart) {
+        chart.setData(decodePayload(msg));
+      }
+    });
+  });
+
+  // Redraw on light/dark mode changes; colours come from the page's CSS
+  new MutationObserver(function() {
+    Object.keys(charts).forEach(function(id) { charts[id].draw(); });
+  }).observe(document.documentElement, { attributes: true, attributeFilter: ['data-bs-theme'] });
+})();
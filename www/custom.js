@@ -1,5 +1,29 @@
 // ===== Custom JavaScript for AI Forecasting App =====
 
+// ----- Persistent client id -----
+// Background jobs belong to this id rather than the Shiny session, so they are
+// still listed after a reconnect or a page reload in the same browser.
+function getClientId() {
+  var key = 'forecast_client_id';
+  var id = null;
+  try {
+    id = window.localStorage.getItem(key);
+  } catch (e) {}
+  if (!id) {
+    id = window.crypto && window.crypto.randomUUID
+      ? window.crypto.randomUUID()
+      : Date.now().toString(16) + Math.random().toString(16).slice(2);
+    try {
+      window.localStorage.setItem(key, id);
+    } catch (e) {}
+  }
+  return id;
+}
+
+$(document).on('shiny:connected', function() {
+  Shiny.setInputValue('client_id', getClientId());
+});
+
 $(document).ready(function() {
   // ----- Add icons to the navigation items -----
   // Home icon